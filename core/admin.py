@@ -1,12 +1,20 @@
 from django.contrib import admin
 from django.db import models
+from django.core.cache import cache
 from django.db.models import Sum, Count
 from django.utils.html import format_html, mark_safe
 from django.urls import reverse
+from django.http import StreamingHttpResponse
 from django.utils.http import urlencode
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.admin import UserAdmin, GroupAdmin
-from .models import Service, Order, UserProfile, CartItem, PricingConfig, Location, PublicHoliday, Coupon, PopupOffer, MaintenanceSettings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Service, Order, DocumentPreflight, UserProfile, CartItem, PricingConfig, Location, PublicHoliday, Coupon, PopupOffer, MaintenanceSettings, DailyOrderRollup, DealerLedgerEntry, DealerBalance, DealerSettlement
+from .signed_media import signed_url
+from .admin_pagination import EstimatedCountPaginator, COUNT_CACHE_TIMEOUT, queryset_cache_key
+from .order_export import EXPORT_FORMATS, export_filename
+from .rollups import rollup_totals, rollups_enabled, local_day
 
 # --- 🛠️ 1. CUSTOM ADMIN SITE SETUP ---
 class FastCopyAdminSite(admin.AdminSite):
@@ -57,6 +65,13 @@ class UserProfileAdmin(admin.ModelAdmin):
     readonly_fields = ('display_fc_id', 'user_type', 'date_joined', 'action_buttons')
     ordering = ('-id',)
     filter_horizontal = ('dealer_locations',)
+    # Every column reads obj.user; dealer badges list their locations
+    list_select_related = ('user',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('dealer_locations')
 
     fieldsets = (
         ('ID & Security Actions', {'fields': ('display_fc_id', 'user_type', 'action_buttons')}),
@@ -88,7 +103,8 @@ class UserProfileAdmin(admin.ModelAdmin):
     def user_type(self, obj): return "Admin User" if obj.user.is_staff else "Normal User"
     def dealer_status(self, obj): 
         if obj.is_dealer:
-            return format_html('<span style="background:#15803d; color:white; padding:3px 10px; border-radius:12px; font-size:10px; font-weight:bold;">DEALER</span>')
+            locations = ", ".join(location.name for location in obj.dealer_locations.all())
+            return format_html('<span style="background:#15803d; color:white; padding:3px 10px; border-radius:12px; font-size:10px; font-weight:bold;" title="{}">DEALER</span>', locations or "No locations assigned")
         if obj.is_delivery_boy:
             return format_html('<span style="background:#f97316; color:white; padding:3px 10px; border-radius:12px; font-size:10px; font-weight:bold;">DELIVERY</span>')
         return format_html('<span style="color:#64748b;">Customer</span>')
@@ -101,6 +117,10 @@ class UserProfileAdmin(admin.ModelAdmin):
 @admin.register(Order, site=admin_site)
 class OrderAdmin(admin.ModelAdmin):
     change_form_template = 'admin/core/order/change_form.html'
+    list_select_related = ('user', 'preflight', 'location')
+    # Large table: no unfiltered COUNT(*) per page load, estimated/cached counts instead
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
     list_display = (
         'order_id_link', 'user_name', 'mobile_number', 'service_name', 
@@ -110,6 +130,7 @@ class OrderAdmin(admin.ModelAdmin):
     
     list_filter = ('status', 'payment_status', ServiceTypeFilter, 'location', ('created_at', admin.DateFieldListFilter))
     search_fields = ('order_id', 'transaction_id', 'user__first_name', 'user__username')
+    actions = ['export_orders_csv', 'export_orders_xlsx']
     
     readonly_fields = (
         'order_id', 'created_at', 'user_name', 'user_email', 
@@ -129,19 +150,38 @@ class OrderAdmin(admin.ModelAdmin):
         url = reverse('fastcopy_admin:core_order_change', args=[obj.id])
         return format_html('<a href="{}" style="font-weight:bold;color:#2563eb">{}</a>', url, obj.order_id or f"ORD-{obj.id}")
 
+    def _get_preflight(self, obj):
+        try:
+            preflight = obj.preflight
+        except DocumentPreflight.DoesNotExist:
+            return None
+        return preflight if preflight.status == 'Done' else None
+
     def display_file_thumbnail(self, obj):
         if obj.image_upload:
-            return format_html('<a href="{}" target="_blank"><img src="{}" style="width:35px;height:35px;object-fit:cover;border-radius:4px;"/></a>', obj.image_upload.url, obj.image_upload.url)
+            return format_html('<a href="{}" target="_blank"><img src="{}" style="width:35px;height:35px;object-fit:cover;border-radius:4px;"/></a>', signed_url(obj.image_upload), signed_url(obj.image_upload))
         elif obj.document:
-            return format_html('<a href="{}" target="_blank" style="background:#2563eb;color:#fff;padding:2px 8px;border-radius:4px;font-size:10px;text-decoration:none">📂 PDF</a>', obj.document.url)
+            preflight = self._get_preflight(obj)
+            if preflight and preflight.thumbnail:
+                return format_html('<a href="{}" target="_blank"><img src="{}" style="width:35px;height:45px;object-fit:cover;object-position:top;border-radius:4px;border:1px solid var(--border-color);"/></a>', signed_url(obj.document), signed_url(preflight.thumbnail))
+            return format_html('<a href="{}" target="_blank" style="background:#2563eb;color:#fff;padding:2px 8px;border-radius:4px;font-size:10px;text-decoration:none">📂 PDF</a>', signed_url(obj.document))
         return mark_safe('<span style="color:var(--body-quiet-color)">No File</span>')
 
     def display_full_file_preview(self, obj):
         html = ""
         if obj.image_upload:
-            html += format_html('<div style="margin-bottom:10px;"><img src="{}" style="max-width:300px;border-radius:8px;border:1px solid var(--border-color);"/></div>', obj.image_upload.url)
+            html += format_html('<div style="margin-bottom:10px;"><img src="{}" style="max-width:300px;border-radius:8px;border:1px solid var(--border-color);"/></div>', signed_url(obj.image_upload))
+        preflight = self._get_preflight(obj) if obj.document else None
+        if preflight:
+            if preflight.thumbnail:
+                html += format_html('<div style="margin-bottom:10px;"><img src="{}" style="max-width:160px;border-radius:8px;border:1px solid var(--border-color);"/></div>', signed_url(preflight.thumbnail))
+            sizes = ", ".join(f"{label} × {count}" for label, count in preflight.page_sizes.items())
+            html += format_html(
+                '<div style="margin-bottom:10px;font-size:12px;">Pages: <b>{}</b> | Sizes: <b>{}</b> | Colour pages: <b>{}</b></div>',
+                preflight.page_count, sizes or "N/A", preflight.color_pages or "None"
+            )
         if obj.document:
-            html += format_html('<a href="{}" target="_blank" style="background:#1e293b;color:#fff;padding:8px 15px;border-radius:5px;text-decoration:none;display:inline-block;">👁️ View Full Document</a>', obj.document.url)
+            html += format_html('<a href="{}" target="_blank" style="background:#1e293b;color:#fff;padding:8px 15px;border-radius:5px;text-decoration:none;display:inline-block;">👁️ View Full Document</a>', signed_url(obj.document))
         return mark_safe(html) if html else "No file uploaded"
 
     def printing_type_display(self, obj):
@@ -154,6 +194,9 @@ class OrderAdmin(admin.ModelAdmin):
     def user_name(self, obj): return obj.user.first_name if obj.user else "N/A"
     def user_email(self, obj): return obj.user.email if obj.user else "N/A"
     def mobile_number(self, obj): return obj.user.username if obj.user else "N/A"
+    user_name.admin_order_field = 'user__first_name'
+    user_email.admin_order_field = 'user__email'
+    mobile_number.admin_order_field = 'user__username'
 
     def price_display(self, obj): 
         return mark_safe(f'<b style="color:#2563eb">₹{float(obj.total_price or 0):,.2f}</b>')
@@ -185,14 +228,124 @@ class OrderAdmin(admin.ModelAdmin):
         color = colors.get(obj.status, '#000000')
         return format_html('<span style="background:{}; color:white; padding:3px 10px; border-radius:12px; font-size:10px; font-weight:bold;">{}</span>', color, obj.status)
 
+    # --- 📤 EXPORT ACTIONS ---
+    # "Select all" on the changelist exports every row matching the current filters/search.
+    def _export_response(self, queryset, fmt):
+        generator, content_type = EXPORT_FORMATS[fmt]
+        response = StreamingHttpResponse(generator(queryset), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt)}"'
+        return response
+
+    def export_orders_csv(self, request, queryset):
+        return self._export_response(queryset, 'csv')
+    export_orders_csv.short_description = '📤 Export selected orders (CSV)'
+
+    def export_orders_xlsx(self, request, queryset):
+        return self._export_response(queryset, 'xlsx')
+    export_orders_xlsx.short_description = '📤 Export selected orders (XLSX)'
+
+    # Changelist params that map onto DailyOrderRollup columns
+    ROLLUP_PARAMS = {
+        'status__exact': 'status',
+        'payment_status__exact': 'payment_status',
+        'location__id__exact': 'location_id',
+        'service_name': 'service_name',
+    }
+
+    def _rollup_filters(self, request):
+        """
+        DailyOrderRollup filters equivalent to the changelist's, or None when a
+        search or a filter the rollups cannot answer is active.
+        """
+        filters = {}
+        for param, value in request.GET.items():
+            if param in ('o', 'p', 'e', 'all'):
+                continue
+            if param in self.ROLLUP_PARAMS:
+                filters[self.ROLLUP_PARAMS[param]] = value
+            elif param in ('created_at__gte', 'created_at__lt'):
+                # DateFieldListFilter bounds are local midnights
+                moment = parse_datetime(value)
+                if moment is None:
+                    return None
+                if timezone.is_naive(moment):
+                    moment = timezone.make_aware(moment)
+                if timezone.localtime(moment).time() != moment.min.time():
+                    return None
+                filters['day__gte' if param.endswith('gte') else 'day__lt'] = local_day(moment)
+            else:
+                return None
+        return filters
+
     def changelist_view(self, request, extra_context=None):
         res = super().changelist_view(request, extra_context)
         try:
-            qs = res.context_data['cl'].get_queryset(request).aggregate(total=Sum('total_price'), cnt=Count('id'))
-            res.context_data.update({'summary_total': float(qs['total'] or 0), 'summary_count': qs['cnt']})
+            cl = res.context_data['cl']
+            # Count comes from the paginator; the sum is read from the daily rollups when
+            # the filters allow, otherwise from order_summary_idx (cached)
+            rollup_filters = self._rollup_filters(request) if rollups_enabled() else None
+            if rollup_filters is not None:
+                res.context_data.update({
+                    'summary_total': float(rollup_totals(**rollup_filters)['revenue']),
+                    'summary_count': cl.result_count,
+                })
+                return res
+            queryset = cl.queryset.order_by()
+            key = queryset_cache_key(queryset, 'admin_order_summary')
+            total = cache.get(key) if key else None
+            if total is None:
+                total = float(queryset.aggregate(total=Sum('total_price'))['total'] or 0)
+                if key:
+                    cache.set(key, total, COUNT_CACHE_TIMEOUT)
+            res.context_data.update({'summary_total': total, 'summary_count': cl.result_count})
         except: pass
         return res
 
+# --- 📈 6A. DAILY ORDER ROLLUP ADMIN (read-only reporting) ---
+@admin.register(DailyOrderRollup, site=admin_site)
+class DailyOrderRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'location', 'service_name', 'status', 'payment_status', 'orders', 'pages',
+                    'copies', 'revenue', 'discounts', 'dealer_payout')
+    list_filter = ('status', 'payment_status', 'service_name', 'location', 'day')
+    list_select_related = ('location',)
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request): return False
+    def has_change_permission(self, request, obj=None): return False
+
+# --- 📒 6B. DEALER LEDGER ADMIN (append-only, written by core/dealer_ledger.py) ---
+@admin.register(DealerLedgerEntry, site=admin_site)
+class DealerLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'dealer', 'entry_type', 'amount', 'balance_after', 'order', 'transaction_id', 'description')
+    list_filter = ('entry_type', 'dealer')
+    list_select_related = ('dealer', 'order')
+    search_fields = ('order__order_id', 'transaction_id', 'dealer__username')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request): return False
+    def has_change_permission(self, request, obj=None): return False
+    def has_delete_permission(self, request, obj=None): return False
+
+@admin.register(DealerBalance, site=admin_site)
+class DealerBalanceAdmin(admin.ModelAdmin):
+    list_display = ('dealer', 'balance', 'total_earned', 'total_paid', 'updated_at')
+    list_select_related = ('dealer',)
+
+    def has_add_permission(self, request): return False
+    def has_change_permission(self, request, obj=None): return False
+    def has_delete_permission(self, request, obj=None): return False
+
+@admin.register(DealerSettlement, site=admin_site)
+class DealerSettlementAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'dealer', 'period_end', 'entry_count', 'earnings', 'delivery_fees', 'adjustments', 'amount', 'statement_path')
+    list_filter = ('dealer',)
+    list_select_related = ('dealer',)
+
+    def has_add_permission(self, request): return False
+    def has_change_permission(self, request, obj=None): return False
+    def has_delete_permission(self, request, obj=None): return False
+
 # --- 💰 7. PRICING CONFIGURATION ADMIN ---
 @admin.register(PricingConfig, site=admin_site)
 class PricingConfigAdmin(admin.ModelAdmin):
@@ -0,0 +1,85 @@
+"""
+Admin Pagination for Large Tables
+Django's changelist runs COUNT(*) over the filtered queryset on every page
+load (and over the whole table too, unless show_full_result_count = False).
+EstimatedCountPaginator avoids both on big tables:
+
+- unfiltered lists use the database's own row estimate
+  (MySQL information_schema.TABLES / PostgreSQL pg_class.reltuples)
+- filtered counts are cached for COUNT_CACHE_TIMEOUT seconds
+
+Tables below ESTIMATE_THRESHOLD rows (and SQLite) are counted exactly.
+"""
+
+import hashlib
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+import logging
+
+logger = logging.getLogger(__name__)
+
+ESTIMATE_THRESHOLD = 10000
+COUNT_CACHE_TIMEOUT = 60  # seconds
+
+
+def estimate_table_rows(model, using='default'):
+    """
+    Approximate row count from table statistics.
+
+    Returns:
+        int or None: estimate, or None if the backend has no cheap estimate
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(
+                    "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                    [table],
+                )
+            elif connection.vendor == 'postgresql':
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            else:
+                return None
+            row = cursor.fetchone()
+    except Exception as e:
+        logger.warning(f"Row estimate failed for {table}: {e}")
+        return None
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+def queryset_cache_key(queryset, prefix):
+    """Cache key for a queryset's SQL (None if it can't be compiled)."""
+    try:
+        sql = str(queryset.query)
+    except Exception:
+        return None
+    return f"{prefix}:{queryset.db}:{hashlib.md5(sql.encode()).hexdigest()}"
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator with estimated (unfiltered) or cached (filtered) counts; see module docstring."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        if not queryset.query.where:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+
+        key = queryset_cache_key(queryset.order_by(), 'admin_count')
+        if key is None:
+            return super().count
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
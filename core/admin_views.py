@@ -9,7 +9,7 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.admin.views.decorators import staff_member_required
 from django.utils import timezone
 from .cleanup import FileCleanupManager, format_bytes
-from .models import Order
+from .order_stats import get_order_stats
 import json
 
 
@@ -28,48 +28,23 @@ def cleanup_dashboard(request):
     total_eligible = eligible_orders.count()
     
     # Calculate potential savings
-    potential_savings = 0
-    for order in eligible_orders:
-        if order.document:
-            try:
-                potential_savings += order.document.size
-            except:
-                pass
-        if order.image_upload:
-            try:
-                potential_savings += order.image_upload.size
-            except:
-                pass
+    potential_savings = cleanup_manager.get_potential_savings()
     
-    # Order statistics
-    total_orders = Order.objects.count()
-    orders_with_files = Order.objects.exclude(document='').exclude(document__isnull=True).count()
-    orders_without_files = total_orders - orders_with_files
-    
-    # Breakdown by status
-    status_breakdown = []
-    statuses = ['Pending', 'Confirmed', 'Ready', 'Delivered', 'Rejected', 'Cancelled']
-    for status in statuses:
-        count = Order.objects.filter(status=status).count()
-        with_files = Order.objects.filter(status=status).exclude(document='').exclude(document__isnull=True).count()
-        status_breakdown.append({
-            'status': status,
-            'total': count,
-            'with_files': with_files,
-            'without_files': count - with_files
-        })
+    # Order statistics + breakdown by status (one query, cached briefly)
+    order_stats = get_order_stats()
     
     context = {
         'storage_stats': storage_stats,
         'total_eligible': total_eligible,
         'potential_savings': potential_savings,
         'potential_savings_mb': round(potential_savings / (1024 * 1024), 2),
-        'total_orders': total_orders,
-        'orders_with_files': orders_with_files,
-        'orders_without_files': orders_without_files,
-        'status_breakdown': status_breakdown,
+        'total_orders': order_stats['total_orders'],
+        'orders_with_files': order_stats['orders_with_files'],
+        'orders_without_files': order_stats['orders_without_files'],
+        'status_breakdown': order_stats['status_breakdown'],
         'retention_policies': {
             'delivered': FileCleanupManager.RETENTION_DELIVERED,
+            'cold': FileCleanupManager.RETENTION_COLD if cleanup_manager.cold_storage_enabled else None,
             'cancelled': FileCleanupManager.RETENTION_CANCELLED,
             'failed': FileCleanupManager.RETENTION_FAILED,
             'temp': FileCleanupManager.RETENTION_TEMP,
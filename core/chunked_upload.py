@@ -0,0 +1,304 @@
+"""
+Resumable Chunked Uploads for FastCopy
+tus-like protocol for large documents on flaky networks:
+
+    1. init      -> server creates temp/uploads/<upload_id>/ and returns the chunk size
+    2. chunk     -> client POSTs each chunk by index (idempotent, any order),
+                    optionally with its SHA-256 in the X-Chunk-SHA256 header
+    3. status    -> client asks which chunks the server already has (used to resume)
+    4. finalize  -> server assembles the file into temp/, verifies the final
+                    checksum and hands the path to the page counter
+
+Final checksum: either the whole-file SHA-256 given at init, or (for browsers,
+which can't hash a 150 MB file incrementally) a "chunk checksum" sent at
+finalize: SHA-256 of the concatenated hex SHA-256 digests of every chunk.
+
+A retry after a dropped connection only re-sends the missing chunks.
+
+Chunk files are recorded in the storage ledger (temp_files) as they are
+written and removed, and the assembled file is moved into temp/ rather
+than copied. An owner keeps at most MAX_OPEN_SESSIONS sessions; starting
+another one discards their oldest.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from django.conf import settings
+from .storage_ledger import record_change, record_removed
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = 'temp/uploads'
+CHUNK_SIZE = 2 * 1024 * 1024            # 2 MB, small enough to retry cheaply on mobile
+MAX_UPLOAD_SIZE = 300 * 1024 * 1024     # 300 MB
+READ_BLOCK_SIZE = 64 * 1024
+MAX_OPEN_SESSIONS = 3                   # per user / anonymous session
+UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ChunkedUploadError(ValueError):
+    """Raised for invalid upload sessions, chunks or checksums."""
+
+
+class ChunkedUpload:
+    """
+    One upload session on disk: a manifest plus one file per received chunk.
+
+    Usage:
+        upload = ChunkedUpload.create(owner, filename, size, sha256)
+        upload.write_chunk(index, stream)
+        temp_path = upload.finalize(default_storage)
+    """
+
+    def __init__(self, upload_id, manifest):
+        self.upload_id = upload_id
+        self.manifest = manifest
+
+    # --- Paths ---
+
+    @staticmethod
+    def _session_dir(upload_id):
+        return os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR, upload_id)
+
+    @property
+    def session_dir(self):
+        return self._session_dir(self.upload_id)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.session_dir, 'manifest.json')
+
+    def _chunk_path(self, index):
+        return os.path.join(self.session_dir, f'{index:06d}.part')
+
+    @staticmethod
+    def _record(path, size_delta, count_delta):
+        record_change(os.path.relpath(path, settings.MEDIA_ROOT), size_delta, count_delta)
+
+    # --- Session lifecycle ---
+
+    @classmethod
+    def create(cls, owner, filename, size, sha256=''):
+        """
+        Start a new upload session.
+
+        Args:
+            owner: user id allowed to use the session
+            filename: original file name (used for the final temp file)
+            size: total size in bytes
+            sha256: optional hex digest of the whole file, verified on finalize
+
+        Raises:
+            ChunkedUploadError: invalid size or checksum format
+        """
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            raise ChunkedUploadError("Invalid file size")
+        if size <= 0 or size > MAX_UPLOAD_SIZE:
+            raise ChunkedUploadError(f"File size must be between 1 byte and {MAX_UPLOAD_SIZE // (1024 * 1024)} MB")
+
+        sha256 = (sha256 or '').lower()
+        if sha256 and not re.match(r'^[0-9a-f]{64}$', sha256):
+            raise ChunkedUploadError("Invalid checksum")
+
+        cls._discard_oldest_sessions(owner, keep=MAX_OPEN_SESSIONS - 1)
+        upload = cls(uuid.uuid4().hex, {
+            'owner': owner,
+            'filename': os.path.basename(filename or 'document.pdf')[:150],
+            'size': size,
+            'sha256': sha256,
+            'chunk_size': CHUNK_SIZE,
+            'total_chunks': -(-size // CHUNK_SIZE),
+            'created_at': time.time(),
+        })
+        os.makedirs(upload.session_dir, exist_ok=True)
+        upload._save_manifest()
+        cls._record(upload.manifest_path, os.path.getsize(upload.manifest_path), 1)
+        return upload
+
+    @classmethod
+    def _discard_oldest_sessions(cls, owner, keep):
+        """Delete the owner's oldest open sessions so at most `keep` remain."""
+        uploads_root = os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR)
+        try:
+            upload_ids = [name for name in os.listdir(uploads_root) if UPLOAD_ID_RE.match(name)]
+        except FileNotFoundError:
+            return
+        sessions = []
+        for upload_id in upload_ids:
+            try:
+                sessions.append(cls.load(upload_id, owner))
+            except ChunkedUploadError:
+                continue
+        sessions.sort(key=lambda upload: upload.manifest['created_at'])
+        for upload in sessions[:max(0, len(sessions) - keep)]:
+            logger.info(f"Discarding chunked upload {upload.upload_id}: too many open sessions for {owner}")
+            upload.delete()
+
+    @classmethod
+    def load(cls, upload_id, owner):
+        """
+        Load an existing session owned by `owner`.
+
+        Raises:
+            ChunkedUploadError: unknown, expired or foreign session
+        """
+        if not UPLOAD_ID_RE.match(upload_id or ''):
+            raise ChunkedUploadError("Upload not found")
+        try:
+            with open(os.path.join(cls._session_dir(upload_id), 'manifest.json')) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            raise ChunkedUploadError("Upload not found")
+        if manifest.get('owner') != owner:
+            raise ChunkedUploadError("Upload not found")
+        return cls(upload_id, manifest)
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def delete(self):
+        size = count = 0
+        try:
+            for entry in os.scandir(self.session_dir):
+                size += entry.stat().st_size
+                count += 1
+        except FileNotFoundError:
+            return
+        shutil.rmtree(self.session_dir, ignore_errors=True)
+        record_removed(self.session_dir, size, count)
+
+    # --- Chunks ---
+
+    def expected_chunk_size(self, index):
+        if index == self.manifest['total_chunks'] - 1:
+            return self.manifest['size'] - index * self.manifest['chunk_size']
+        return self.manifest['chunk_size']
+
+    def received_chunks(self):
+        """Indexes of chunks fully stored on disk."""
+        received = []
+        for index in range(self.manifest['total_chunks']):
+            try:
+                if os.path.getsize(self._chunk_path(index)) == self.expected_chunk_size(index):
+                    received.append(index)
+            except OSError:
+                continue
+        return received
+
+    def write_chunk(self, index, stream, sha256=''):
+        """
+        Store one chunk, reading the request body in small blocks.
+        Writing the same chunk twice is harmless (the last complete write wins).
+
+        Args:
+            index: 0-based chunk number
+            stream: file-like object (e.g. the HttpRequest)
+            sha256: optional hex digest of the chunk
+
+        Raises:
+            ChunkedUploadError: bad index, wrong chunk length or checksum
+        """
+        if not 0 <= index < self.manifest['total_chunks']:
+            raise ChunkedUploadError("Invalid chunk index")
+
+        expected = self.expected_chunk_size(index)
+        tmp_path = f"{self._chunk_path(index)}.{uuid.uuid4().hex[:8]}.tmp"
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                while written <= expected:
+                    block = stream.read(READ_BLOCK_SIZE)
+                    if not block:
+                        break
+                    f.write(block)
+                    digest.update(block)
+                    written += len(block)
+            if written != expected:
+                raise ChunkedUploadError(f"Chunk {index} should be {expected} bytes, got {written}")
+            if sha256 and digest.hexdigest() != sha256.lower():
+                raise ChunkedUploadError(f"Chunk {index} checksum mismatch")
+            try:
+                replaced = os.path.getsize(self._chunk_path(index))
+            except OSError:
+                replaced = None
+            os.replace(tmp_path, self._chunk_path(index))
+            if replaced is None:
+                self._record(self._chunk_path(index), written, 1)
+            else:
+                self._record(self._chunk_path(index), written - replaced, 0)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # Touch the manifest so cleanup sees the session as active
+        os.utime(self.manifest_path)
+
+    # --- Finalize ---
+
+    def finalize(self, storage, chunk_checksum=''):
+        """
+        Assemble all chunks into a temp file and verify the checksum.
+
+        Args:
+            storage: file system storage to move the assembled file into (temp/ prefix)
+            chunk_checksum: optional SHA-256 over the chunk digests (see module docstring)
+
+        Returns:
+            str: storage path of the assembled file (temp/pre_<uuid>_<name>)
+
+        Raises:
+            ChunkedUploadError: missing chunks or checksum mismatch
+        """
+        missing = self.manifest['total_chunks'] - len(self.received_chunks())
+        if missing:
+            raise ChunkedUploadError(f"{missing} chunk(s) missing")
+
+        assembled_path = os.path.join(self.session_dir, 'assembled')
+        digest = hashlib.sha256()
+        chunk_digests = hashlib.sha256()
+        with open(assembled_path, 'wb') as out:
+            for index in range(self.manifest['total_chunks']):
+                chunk_digest = hashlib.sha256()
+                with open(self._chunk_path(index), 'rb') as part:
+                    for block in iter(lambda: part.read(READ_BLOCK_SIZE * 16), b''):
+                        digest.update(block)
+                        chunk_digest.update(block)
+                        out.write(block)
+                chunk_digests.update(chunk_digest.hexdigest().encode())
+
+        if (self.manifest['sha256'] and digest.hexdigest() != self.manifest['sha256']) or \
+                (chunk_checksum and chunk_digests.hexdigest() != chunk_checksum.lower()):
+            os.remove(assembled_path)
+            # Chunks are corrupt somewhere; the client has to start over
+            self.delete()
+            raise ChunkedUploadError("Checksum mismatch, please upload the file again")
+
+        # Same file system: move the assembled file into place instead of copying it
+        temp_path = storage.get_available_name(f"temp/pre_{uuid.uuid4()}_{self.manifest['filename']}")
+        os.makedirs(os.path.dirname(storage.path(temp_path)), exist_ok=True)
+        os.replace(assembled_path, storage.path(temp_path))
+        record_change(temp_path, self.manifest['size'], 1)
+
+        self.delete()
+        logger.info(f"Chunked upload {self.upload_id} assembled: {self.manifest['size']} bytes -> {temp_path}")
+        return temp_path
+
+    def status(self):
+        return {
+            'upload_id': self.upload_id,
+            'chunk_size': self.manifest['chunk_size'],
+            'total_chunks': self.manifest['total_chunks'],
+            'received': self.received_chunks(),
+        }
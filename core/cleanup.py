@@ -1,13 +1,35 @@
 """
 File Cleanup Utility for FastCopy
 Automatically deletes old order files while preserving database records.
+
+Lifecycle of delivered orders (when COLD_STORAGE_ENABLED):
+    hot (media)  --RETENTION_DELIVERED-->  cold (compressed archive)  --RETENTION_COLD-->  deleted
+Cancelled, rejected and failed orders are deleted straight from the hot tier.
+A custom `days` replaces the hot retention periods only; archived files are
+always kept for RETENTION_COLD, and a run never deletes what it just archived.
+Print bundle builds (print_jobs/) and N-up outputs (orders/imposed/) are
+rebuilt on demand, so they are simply deleted after RETENTION_PRINT_JOBS days
+and RETENTION_IMPOSED days without use.
+
+Eligible orders are processed in keyset-paginated chunks: each chunk's files
+are unlinked through a small thread pool, then the chunk's file fields are
+cleared with a single UPDATE (updated_at is left alone, so retention ages
+stay intact). Every deleted file is written to a CSV report on disk; only
+counters and a short sample are kept in memory.
 """
 
+import csv
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from django.db.models import Sum
 from django.utils import timezone
 from django.conf import settings
+from .cold_storage import archive_path, compress_file
 from .models import Order
+from .pdf_optimizer import PRINTED_STATUSES, discard_original
+from .storage_ledger import record_removed, usage
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,24 +41,46 @@ class FileCleanupManager:
     """
     
     # Retention periods (in days)
-    RETENTION_DELIVERED = 30  # Keep delivered order files for 30 days
+    RETENTION_DELIVERED = 30  # Keep delivered order files hot for 30 days (then archive, or delete)
+    RETENTION_COLD = 365      # Keep archived delivered order files for 1 year
     RETENTION_CANCELLED = 7   # Keep cancelled/rejected order files for 7 days
     RETENTION_FAILED = 3      # Keep failed payment order files for 3 days
     RETENTION_TEMP = 1        # Keep temp files for 1 day
+    RETENTION_PRINT_JOBS = 2  # Keep print bundle builds for 2 days
+    RETENTION_IMPOSED = 7     # Keep N-up imposed PDFs for 7 days after their last use
+
+    # Bulk cleanup
+    CHUNK_SIZE = 500          # Orders per keyset page (and per UPDATE)
+    UNLINK_WORKERS = 8        # Parallel file deletions
+    REPORT_SAMPLE_SIZE = 100  # Deleted/failed entries kept in memory for display
     
     def __init__(self, dry_run=False):
         self.dry_run = dry_run
-        self.deleted_files = []
-        self.failed_deletions = []
+        self.deleted_files = []      # First REPORT_SAMPLE_SIZE entries; full list is in the report file
+        self.failed_deletions = []   # First REPORT_SAMPLE_SIZE entries
+        self.files_deleted = 0
+        self.failed_count = 0
+        self.by_file_type = {}       # file_type -> {'count', 'size'}
+        self.by_status = {}          # order status -> {'count', 'size'}
         self.total_size_freed = 0
-        
+        self.orders_archived = 0
+        self.archive_bytes_in = 0    # Hot bytes moved to the cold tier
+        self.archive_bytes_out = 0   # Compressed size of those files
+        self.report_path = None
+        self._report_file = None
+        self._report_writer = None
+        
+    @property
+    def cold_storage_enabled(self):
+        return getattr(settings, 'COLD_STORAGE_ENABLED', True)
+
     def get_cleanup_eligible_orders(self, status=None, days=None):
         """
         Get orders eligible for file cleanup based on status and age.
         
         Args:
             status: Specific status to filter (optional)
-            days: Custom retention days (optional)
+            days: Custom retention days (optional; never shortens the cold tier's RETENTION_COLD)
         
         Returns:
             QuerySet of eligible orders
@@ -44,9 +88,12 @@ class FileCleanupManager:
         now = timezone.now()
         eligible_orders = Order.objects.none()
         
-        # Delivered orders older than retention period
+        # Delivered orders older than retention period (the cold tier's, if archiving)
         if not status or status == 'Delivered':
-            retention_days = days if days else self.RETENTION_DELIVERED
+            if self.cold_storage_enabled:
+                retention_days = self.RETENTION_COLD
+            else:
+                retention_days = days if days else self.RETENTION_DELIVERED
             cutoff_date = now - timedelta(days=retention_days)
             delivered_orders = Order.objects.filter(
                 status='Delivered',
@@ -87,91 +134,301 @@ class FileCleanupManager:
             eligible_orders = eligible_orders | failed_orders
         
         return eligible_orders.distinct()
-    
-    def delete_order_files(self, order):
+
+    def get_archive_eligible_orders(self, days=None):
         """
-        Delete files associated with an order.
+        Get delivered orders whose files should move from the hot to the cold tier.
         
         Args:
-            order: Order instance
+            days: Custom hot retention days (optional)
         
         Returns:
-            tuple: (success, files_deleted, size_freed)
+            QuerySet of eligible orders
         """
-        files_deleted = 0
-        size_freed = 0
+        cutoff_date = timezone.now() - timedelta(days=days if days else self.RETENTION_DELIVERED)
+        return Order.objects.filter(
+            status='Delivered',
+            storage_tier='hot',
+            updated_at__lt=cutoff_date
+        ).exclude(
+            document='', image_upload=''
+        ).exclude(
+            document__isnull=True, image_upload__isnull=True
+        )
+
+    def get_potential_savings(self, status=None, days=None):
+        """
+        Bytes that cleanup would free, from the stored Order.file_size (one query, no disk access).
         
-        # Delete document file
-        if order.document:
-            file_path = order.document.path
-            if os.path.exists(file_path):
-                try:
-                    file_size = os.path.getsize(file_path)
-                    
-                    if not self.dry_run:
-                        os.remove(file_path)
-                        order.document = None
-                        logger.info(f"Deleted document: {file_path} (Order: {order.order_id})")
-                    else:
-                        logger.info(f"[DRY RUN] Would delete: {file_path} (Order: {order.order_id})")
-                    
-                    files_deleted += 1
-                    size_freed += file_size
-                    self.deleted_files.append({
-                        'order_id': order.order_id,
-                        'file_path': file_path,
-                        'file_type': 'document',
-                        'size': file_size,
-                        'status': order.status,
-                        'age_days': (timezone.now() - order.updated_at).days
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Failed to delete document {file_path}: {str(e)}")
-                    self.failed_deletions.append({
-                        'order_id': order.order_id,
-                        'file_path': file_path,
-                        'error': str(e)
-                    })
+        Args:
+            status: Specific status to filter (optional)
+            days: Custom retention days (optional)
         
-        # Delete image file
-        if order.image_upload:
-            file_path = order.image_upload.path
-            if os.path.exists(file_path):
+        Returns:
+            int: Total size in bytes
+        """
+        eligible_orders = self.get_cleanup_eligible_orders(status, days)
+        return eligible_orders.aggregate(total=Sum('file_size'))['total'] or 0
+    
+    # --- Report ---
+
+    def _open_report(self):
+        """Start the CSV report for this run (settings.CLEANUP_REPORT_DIR)."""
+        report_dir = getattr(settings, 'CLEANUP_REPORT_DIR', os.path.join(settings.BASE_DIR, 'cleanup_reports'))
+        os.makedirs(report_dir, exist_ok=True)
+        prefix = 'dry_run_' if self.dry_run else ''
+        self.report_path = os.path.join(report_dir, f"{prefix}cleanup_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        self._report_file = open(self.report_path, 'w', newline='', encoding='utf-8')
+        self._report_writer = csv.writer(self._report_file)
+        self._report_writer.writerow(['result', 'order_id', 'file_type', 'status', 'size', 'age_days', 'file_path', 'error'])
+
+    def _close_report(self):
+        if self._report_file:
+            self._report_file.close()
+            self._report_file = self._report_writer = None
+
+    def _record_deleted(self, entry):
+        """Count a deleted file, keep it in the sample and append it to the report."""
+        self.files_deleted += 1
+        for key, breakdown in ((entry['file_type'], self.by_file_type), (entry['status'], self.by_status)):
+            bucket = breakdown.setdefault(key, {'count': 0, 'size': 0})
+            bucket['count'] += 1
+            bucket['size'] += entry['size']
+        if len(self.deleted_files) < self.REPORT_SAMPLE_SIZE:
+            self.deleted_files.append(entry)
+        if self._report_writer:
+            self._report_writer.writerow([
+                'deleted', entry['order_id'], entry['file_type'], entry['status'],
+                entry['size'], round(entry['age_days'], 1), entry['file_path'], '',
+            ])
+
+    def _record_failed(self, entry):
+        self.failed_count += 1
+        if len(self.failed_deletions) < self.REPORT_SAMPLE_SIZE:
+            self.failed_deletions.append(entry)
+        if self._report_writer:
+            self._report_writer.writerow(['failed', entry['order_id'], '', '', '', '', entry['file_path'], entry['error']])
+
+    # --- Order files ---
+
+    def _iter_chunks(self, queryset):
+        """Yield lists of up to CHUNK_SIZE orders, paged by primary key (keyset pagination)."""
+        queryset = queryset.order_by('pk')
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:self.CHUNK_SIZE])
+            if not chunk:
+                return
+            last_pk = chunk[-1].pk
+            yield chunk
+
+    def _unlink(self, file_path):
+        """
+        Delete one file (runs in the unlink pool).
+
+        Returns:
+            tuple: ('deleted', size), ('missing', 0) or ('failed', error message)
+        """
+        try:
+            size = os.path.getsize(file_path)
+            if not self.dry_run:
+                os.remove(file_path)
+            return 'deleted', size
+        except FileNotFoundError:
+            return 'missing', 0
+        except Exception as e:
+            return 'failed', str(e)
+
+    def _cleanup_chunk(self, orders, executor=None):
+        """
+        Delete the files of a chunk of orders and clear their file fields in one UPDATE.
+        An order's fields are only cleared if none of its files failed to delete;
+        files that are already missing count as deleted.
+        
+        Args:
+            orders: list of Order instances
+            executor: ThreadPoolExecutor for parallel unlinks (optional)
+        
+        Returns:
+            tuple: (orders_processed, files_deleted, size_freed)
+        """
+        tasks = []
+        for order in orders:
+            for file_type, field_file in (('document', order.document), ('image', order.image_upload),
+                                          ('original', order.original_document)):
+                if not field_file:
+                    continue
+                tasks.append((order, file_type, field_file.path))
+                cold_path = archive_path(field_file.name) if order.archived_at else None
+                if cold_path:
+                    tasks.append((order, 'archive', cold_path))
+
+        paths = [path for _, _, path in tasks]
+        results = executor.map(self._unlink, paths) if executor else map(self._unlink, paths)
+
+        now = timezone.now()
+        deleted_by_order, failed_orders = {}, set()
+        files_deleted = size_freed = 0
+        for (order, file_type, file_path), (result, value) in zip(tasks, results):
+            if result == 'failed':
+                logger.error(f"Failed to delete {file_type} {file_path}: {value}")
+                failed_orders.add(order.pk)
+                self._record_failed({'order_id': order.order_id, 'file_path': file_path, 'error': value})
+                continue
+            if result == 'missing':
+                continue
+
+            if self.dry_run:
+                logger.info(f"[DRY RUN] Would delete: {file_path} (Order: {order.order_id})")
+            else:
+                record_removed(file_path, value)
+                logger.info(f"Deleted {file_type}: {file_path} (Order: {order.order_id})")
+            deleted_by_order[order.pk] = deleted_by_order.get(order.pk, 0) + 1
+            files_deleted += 1
+            size_freed += value
+            self._record_deleted({
+                'order_id': order.order_id,
+                'file_path': file_path,
+                'file_type': file_type,
+                'size': value,
+                'status': order.status,
+                'age_days': (now - order.updated_at).days
+            })
+
+        if not self.dry_run:
+            cleared_ids = [order.pk for order in orders if order.pk not in failed_orders]
+            if cleared_ids:
+                # QuerySet.update() skips auto_now, so updated_at keeps the order's real age
+                Order.objects.filter(pk__in=cleared_ids).update(
+                    document=None, image_upload=None, original_document=None, file_size=0,
+                    storage_tier='hot', archived_at=None
+                )
+
+        return len(deleted_by_order), files_deleted, size_freed
+
+    def _archive(self, file_path, name):
+        """
+        Move one hot file into the cold tier (runs in the worker pool).
+        A file restored earlier still has its archive, so only the hot copy is dropped.
+
+        Returns:
+            tuple: ('archived', size, archive size), ('missing', 0, 0) or ('failed', error message, 0)
+        """
+        try:
+            size = os.path.getsize(file_path)
+            if self.dry_run:
+                return 'archived', size, 0
+            existing = archive_path(name)
+            if existing:
+                archived_size = os.path.getsize(existing)
+            else:
+                _, archived_size = compress_file(file_path, name)
+            os.remove(file_path)
+            return 'archived', size, archived_size
+        except FileNotFoundError:
+            return 'missing', 0, 0
+        except Exception as e:
+            return 'failed', str(e), 0
+
+    def _archive_chunk(self, orders, executor=None):
+        """
+        Compress the files of a chunk of delivered orders into the cold tier
+        and mark the orders cold in one UPDATE.
+        
+        Returns:
+            int: Orders archived
+        """
+        tasks = []
+        for order in orders:
+            for file_type, field_file in (('document', order.document), ('image', order.image_upload)):
+                if field_file:
+                    tasks.append((order, file_type, field_file.path, field_file.name))
+
+        def archive(task):
+            return self._archive(task[2], task[3])
+        results = executor.map(archive, tasks) if executor else map(archive, tasks)
+
+        archived_orders, failed_orders = set(), set()
+        for (order, file_type, file_path, name), (result, value, archived_size) in zip(tasks, results):
+            if result == 'failed':
+                logger.error(f"Failed to archive {file_type} {file_path}: {value}")
+                failed_orders.add(order.pk)
+                self._record_failed({'order_id': order.order_id, 'file_path': file_path, 'error': value})
+                continue
+            if result == 'missing':
+                continue
+
+            if self.dry_run:
+                logger.info(f"[DRY RUN] Would archive: {file_path} (Order: {order.order_id})")
+            else:
+                record_removed(file_path, value)
+                logger.info(f"Archived {file_type}: {file_path} ({value} -> {archived_size} bytes, Order: {order.order_id})")
+            archived_orders.add(order.pk)
+            self.archive_bytes_in += value
+            self.archive_bytes_out += archived_size
+            if self._report_writer:
+                self._report_writer.writerow(['archived', order.order_id, file_type, order.status, value, '', file_path, ''])
+
+        if not self.dry_run:
+            cold_ids = [pk for pk in archived_orders if pk not in failed_orders]
+            if cold_ids:
+                Order.objects.filter(pk__in=cold_ids).update(storage_tier='cold', archived_at=timezone.now())
+
+        self.orders_archived += len(archived_orders - failed_orders)
+        return len(archived_orders - failed_orders)
+
+    def discard_printed_originals(self):
+        """
+        Delete the kept uploads of optimised orders that have been printed
+        (normally done on the status change; this catches admin edits).
+        """
+        printed_orders = Order.objects.filter(status__in=PRINTED_STATUSES).exclude(
+            original_document=''
+        ).exclude(
+            original_document__isnull=True
+        ).only('id', 'order_id', 'original_document', 'file_size', 'status', 'updated_at')
+
+        now = timezone.now()
+        for chunk in self._iter_chunks(printed_orders):
+            for order in chunk:
+                file_path = order.original_document.path
                 try:
-                    file_size = os.path.getsize(file_path)
-                    
-                    if not self.dry_run:
-                        os.remove(file_path)
-                        order.image_upload = None
-                        logger.info(f"Deleted image: {file_path} (Order: {order.order_id})")
+                    if self.dry_run:
+                        size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+                        logger.info(f"[DRY RUN] Would delete original: {file_path} (Order: {order.order_id})")
                     else:
-                        logger.info(f"[DRY RUN] Would delete: {file_path} (Order: {order.order_id})")
-                    
-                    files_deleted += 1
-                    size_freed += file_size
-                    self.deleted_files.append({
-                        'order_id': order.order_id,
-                        'file_path': file_path,
-                        'file_type': 'image',
-                        'size': file_size,
-                        'status': order.status,
-                        'age_days': (timezone.now() - order.updated_at).days
-                    })
-                    
+                        size = discard_original(order)
                 except Exception as e:
-                    logger.error(f"Failed to delete image {file_path}: {str(e)}")
-                    self.failed_deletions.append({
-                        'order_id': order.order_id,
-                        'file_path': file_path,
-                        'error': str(e)
-                    })
+                    logger.error(f"Failed to delete original {file_path}: {str(e)}")
+                    self._record_failed({'order_id': order.order_id, 'file_path': file_path, 'error': str(e)})
+                    continue
+                self.total_size_freed += size
+                self._record_deleted({
+                    'order_id': order.order_id,
+                    'file_path': file_path,
+                    'file_type': 'original',
+                    'size': size,
+                    'status': order.status,
+                    'age_days': (now - order.updated_at).days
+                })
+
+    def delete_order_files(self, order):
+        """
+        Delete files associated with an order.
         
-        # Save order if files were deleted
-        if files_deleted > 0 and not self.dry_run:
-            order.save()
+        Args:
+            order: Order instance
         
-        return files_deleted > 0, files_deleted, size_freed
+        Returns:
+            tuple: (success, files_deleted, size_freed)
+        """
+        orders_processed, files_deleted, size_freed = self._cleanup_chunk([order])
+        if files_deleted and not self.dry_run:
+            order.document = None
+            order.image_upload = None
+            order.original_document = None
+            order.file_size = 0
+        return orders_processed > 0, files_deleted, size_freed
     
     def cleanup_temp_files(self):
         """
@@ -201,11 +458,12 @@ class FileCleanupManager:
                             
                             if not self.dry_run:
                                 os.remove(file_path)
+                                record_removed(file_path, file_size)
                                 logger.info(f"Deleted temp file: {file_path}")
                             else:
                                 logger.info(f"[DRY RUN] Would delete temp file: {file_path}")
                             
-                            self.deleted_files.append({
+                            self._record_deleted({
                                 'order_id': 'N/A',
                                 'file_path': file_path,
                                 'file_type': 'temp',
@@ -217,50 +475,203 @@ class FileCleanupManager:
                             
                         except Exception as e:
                             logger.error(f"Failed to delete temp file {file_path}: {str(e)}")
+
+        self.cleanup_upload_sessions(cutoff_timestamp)
+
+    def cleanup_upload_sessions(self, cutoff_timestamp):
+        """
+        Remove abandoned resumable upload sessions (temp/uploads/<id>/).
+        A session's manifest is touched on every chunk, so its mtime is the last activity.
+        """
+        from .chunked_upload import UPLOAD_DIR
+
+        uploads_root = os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR)
+        if not os.path.isdir(uploads_root):
+            return
+
+        for session_id in os.listdir(uploads_root):
+            session_dir = os.path.join(uploads_root, session_id)
+            manifest_path = os.path.join(session_dir, 'manifest.json')
+            try:
+                last_activity = os.path.getmtime(manifest_path if os.path.exists(manifest_path) else session_dir)
+                if last_activity >= cutoff_timestamp:
+                    continue
+
+                session_files = os.listdir(session_dir)
+                session_size = sum(os.path.getsize(os.path.join(session_dir, name)) for name in session_files)
+                if not self.dry_run:
+                    shutil.rmtree(session_dir)
+                    record_removed(session_dir, session_size, len(session_files))
+                    logger.info(f"Deleted upload session: {session_dir}")
+                else:
+                    logger.info(f"[DRY RUN] Would delete upload session: {session_dir}")
+
+                self._record_deleted({
+                    'order_id': 'N/A',
+                    'file_path': session_dir,
+                    'file_type': 'temp',
+                    'size': session_size,
+                    'status': 'temp',
+                    'age_days': (timezone.now().timestamp() - last_activity) / 86400
+                })
+                self.total_size_freed += session_size
+
+            except Exception as e:
+                logger.error(f"Failed to delete upload session {session_dir}: {str(e)}")
     
-    def run_cleanup(self, status=None, days=None, include_temp=True):
+    def cleanup_print_jobs(self):
+        """
+        Delete print bundle builds (print_jobs/<dealer>/<signature>/) older than
+        RETENTION_PRINT_JOBS, including builds left half-written by a crash.
+        """
+        from .print_jobs import PRINT_JOBS_DIR, folder_usage
+
+        jobs_root = os.path.join(settings.MEDIA_ROOT, PRINT_JOBS_DIR)
+        if not os.path.isdir(jobs_root):
+            return
+
+        cutoff_timestamp = (timezone.now() - timedelta(days=self.RETENTION_PRINT_JOBS)).timestamp()
+        for dealer_id in os.listdir(jobs_root):
+            dealer_dir = os.path.join(jobs_root, dealer_id)
+            if not os.path.isdir(dealer_dir):
+                continue
+            for build in os.listdir(dealer_dir):
+                build_dir = os.path.join(dealer_dir, build)
+                try:
+                    built_at = os.path.getmtime(build_dir)
+                    if built_at >= cutoff_timestamp:
+                        continue
+
+                    build_size, build_files = folder_usage(build_dir)
+                    if not self.dry_run:
+                        shutil.rmtree(build_dir)
+                        record_removed(build_dir, build_size, build_files)
+                        logger.info(f"Deleted print bundle build: {build_dir}")
+                    else:
+                        logger.info(f"[DRY RUN] Would delete print bundle build: {build_dir}")
+
+                    self._record_deleted({
+                        'order_id': 'N/A',
+                        'file_path': build_dir,
+                        'file_type': 'print_job',
+                        'size': build_size,
+                        'status': 'print_job',
+                        'age_days': (timezone.now().timestamp() - built_at) / 86400
+                    })
+                    self.total_size_freed += build_size
+
+                except Exception as e:
+                    logger.error(f"Failed to delete print bundle build {build_dir}: {str(e)}")
+
+    def cleanup_imposed_files(self):
+        """
+        Delete imposed PDFs (orders/imposed/) not used for RETENTION_IMPOSED days.
+        impose_file() touches a cached output on every reuse.
+        """
+        from .imposition import IMPOSED_DIR
+
+        imposed_root = os.path.join(settings.MEDIA_ROOT, *IMPOSED_DIR.split('/'))
+        if not os.path.isdir(imposed_root):
+            return
+
+        cutoff_timestamp = (timezone.now() - timedelta(days=self.RETENTION_IMPOSED)).timestamp()
+        for filename in os.listdir(imposed_root):
+            file_path = os.path.join(imposed_root, filename)
+            try:
+                last_used = os.path.getmtime(file_path)
+                if last_used >= cutoff_timestamp or not os.path.isfile(file_path):
+                    continue
+
+                file_size = os.path.getsize(file_path)
+                if not self.dry_run:
+                    os.remove(file_path)
+                    record_removed(file_path, file_size)
+                    logger.info(f"Deleted imposed file: {file_path}")
+                else:
+                    logger.info(f"[DRY RUN] Would delete imposed file: {file_path}")
+
+                self._record_deleted({
+                    'order_id': 'N/A',
+                    'file_path': file_path,
+                    'file_type': 'imposed',
+                    'size': file_size,
+                    'status': 'imposed',
+                    'age_days': (timezone.now().timestamp() - last_used) / 86400
+                })
+                self.total_size_freed += file_size
+
+            except Exception as e:
+                logger.error(f"Failed to delete imposed file {file_path}: {str(e)}")
+
+    def run_cleanup(self, status=None, days=None, include_temp=True, include_archive=True):
         """
         Run the complete cleanup process.
         
         Args:
             status: Filter by specific order status
             days: Custom retention days
-            include_temp: Whether to clean temp files
+            include_temp: Whether to clean temp files (and old print bundles / imposed PDFs)
+            include_archive: Whether to move delivered orders to the cold tier
         
         Returns:
             dict: Cleanup statistics
         """
         logger.info(f"{'[DRY RUN] ' if self.dry_run else ''}Starting file cleanup...")
-        
-        # Get eligible orders
-        eligible_orders = self.get_cleanup_eligible_orders(status, days)
+        started_at = timezone.now()
+        
+        # Get eligible orders, walked in primary-key order (keyset pagination);
+        # orders archived by this run are not deleted by it
+        fields = ('id', 'order_id', 'document', 'image_upload', 'original_document', 'status', 'updated_at',
+                  'file_size', 'archived_at')
+        eligible_orders = self.get_cleanup_eligible_orders(status, days).exclude(
+            archived_at__gte=started_at
+        ).only(*fields)
         total_orders = eligible_orders.count()
         
         logger.info(f"Found {total_orders} orders eligible for cleanup")
         
-        # Process each order
-        orders_processed = 0
-        for order in eligible_orders:
-            success, files_deleted, size_freed = self.delete_order_files(order)
-            if success:
-                orders_processed += 1
-                self.total_size_freed += size_freed
-        
-        # Clean temp files
-        if include_temp:
-            self.cleanup_temp_files()
+        self._open_report()
+        try:
+            # Process chunk by chunk
+            orders_processed = 0
+            self.discard_printed_originals()
+
+            with ThreadPoolExecutor(max_workers=self.UNLINK_WORKERS) as executor:
+                # Hot -> cold for delivered orders
+                if include_archive and self.cold_storage_enabled and status in (None, 'Delivered'):
+                    for chunk in self._iter_chunks(self.get_archive_eligible_orders(days).only(*fields)):
+                        self._archive_chunk(chunk, executor)
+
+                for chunk in self._iter_chunks(eligible_orders):
+                    processed, files_deleted, size_freed = self._cleanup_chunk(chunk, executor)
+                    orders_processed += processed
+                    self.total_size_freed += size_freed
+            
+            # Clean temp files
+            if include_temp:
+                self.cleanup_temp_files()
+                self.cleanup_print_jobs()
+                self.cleanup_imposed_files()
+        finally:
+            self._close_report()
         
         # Generate statistics
         stats = {
             'dry_run': self.dry_run,
             'total_orders_eligible': total_orders,
             'orders_processed': orders_processed,
-            'total_files_deleted': len(self.deleted_files),
+            'total_files_deleted': self.files_deleted,
             'total_size_freed': self.total_size_freed,
             'total_size_freed_mb': round(self.total_size_freed / (1024 * 1024), 2),
-            'failed_deletions': len(self.failed_deletions),
+            'failed_deletions': self.failed_count,
             'deleted_files': self.deleted_files,
             'failed_files': self.failed_deletions,
+            'by_file_type': self.by_file_type,
+            'by_status': self.by_status,
+            'orders_archived': self.orders_archived,
+            'archive_bytes_in': self.archive_bytes_in,
+            'archive_bytes_out': self.archive_bytes_out,
+            'report_path': self.report_path,
             'timestamp': timezone.now()
         }
         
@@ -272,46 +683,23 @@ class FileCleanupManager:
     def get_storage_stats(self):
         """
         Get current storage usage statistics.
+        Read from the storage ledger (one query); see core/storage_ledger.py.
         
         Returns:
             dict: Storage statistics
         """
-        media_root = settings.MEDIA_ROOT
+        ledger = usage()
         stats = {
-            'orders_pdfs': 0,
-            'orders_images': 0,
-            'temp_files': 0,
-            'offers': 0,
+            'orders_pdfs': ledger.get('orders_pdfs', 0),
+            'orders_images': ledger.get('orders_images', 0),
+            'temp_files': ledger.get('temp_files', 0),
+            'offers': ledger.get('offers', 0),
+            'print_files': ledger.get('print_files', 0),
             'total': 0
         }
         
-        # Calculate orders/pdfs size
-        pdfs_path = os.path.join(media_root, 'orders', 'pdfs')
-        if os.path.exists(pdfs_path):
-            for root, dirs, files in os.walk(pdfs_path):
-                stats['orders_pdfs'] += sum(os.path.getsize(os.path.join(root, f)) for f in files)
-        
-        # Calculate orders/images size
-        images_path = os.path.join(media_root, 'orders', 'images')
-        if os.path.exists(images_path):
-            for root, dirs, files in os.walk(images_path):
-                stats['orders_images'] += sum(os.path.getsize(os.path.join(root, f)) for f in files)
-        
-        # Calculate temp files size
-        for temp_dir in ['temp', 'temp_img']:
-            temp_path = os.path.join(media_root, temp_dir)
-            if os.path.exists(temp_path):
-                for root, dirs, files in os.walk(temp_path):
-                    stats['temp_files'] += sum(os.path.getsize(os.path.join(root, f)) for f in files)
-        
-        # Calculate offers size
-        offers_path = os.path.join(media_root, 'offers')
-        if os.path.exists(offers_path):
-            for root, dirs, files in os.walk(offers_path):
-                stats['offers'] += sum(os.path.getsize(os.path.join(root, f)) for f in files)
-        
         stats['total'] = sum([stats['orders_pdfs'], stats['orders_images'], 
-                             stats['temp_files'], stats['offers']])
+                             stats['temp_files'], stats['offers'], stats['print_files']])
         
         # Convert to MB (create list of keys first to avoid RuntimeError)
         keys_to_convert = list(stats.keys())
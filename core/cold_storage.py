@@ -0,0 +1,172 @@
+"""
+Cold Storage Tier for FastCopy
+Delivered orders are not deleted when they leave the hot tier; their files
+are compressed into an archive directory outside MEDIA_ROOT instead:
+
+    media/orders/pdfs/thesis.pdf  ->  cold_storage/orders/pdfs/thesis.pdf.zst
+
+zstd is used when the optional `zstandard` package is installed, gzip
+otherwise; the extension records the codec, so both can coexist.
+
+Reads are transparent: ensure_hot() decompresses an order's files back into
+media before they are served, and iter_file_blocks() streams a file from
+whichever tier holds it (used by the dealer ZIP download). A restored order
+keeps its archive, so moving it back to cold later only drops the hot copy.
+
+The lifecycle itself (hot -> cold -> deleted) is driven by FileCleanupManager
+(see core/cleanup.py).
+"""
+
+import gzip
+import os
+import shutil
+import uuid
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+COPY_BLOCK_SIZE = 1024 * 1024
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+CODEC_EXTENSIONS = ('.zst', '.gz')
+
+
+def cold_root():
+    return getattr(settings, 'COLD_STORAGE_DIR', os.path.join(settings.BASE_DIR, 'cold_storage'))
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def archive_path(name):
+    """Path of the existing archive for a storage name, or None."""
+    base = os.path.join(cold_root(), *name.replace('\\', '/').split('/'))
+    for ext in CODEC_EXTENSIONS:
+        if os.path.exists(base + ext):
+            return base + ext
+    return None
+
+
+def _open_archive(path):
+    if path.endswith('.zst'):
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return gzip.open(path, 'rb')
+
+
+def compress_file(source_path, name):
+    """
+    Compress a hot file into the cold tier (atomic: temp file + rename).
+
+    Args:
+        source_path: absolute path of the hot file
+        name: storage name (path relative to MEDIA_ROOT), mirrored under the cold root
+
+    Returns:
+        tuple: (archive path, archive size in bytes)
+    """
+    zstandard = _zstd()
+    ext = '.zst' if zstandard else '.gz'
+    dest = os.path.join(cold_root(), *name.replace('\\', '/').split('/')) + ext
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+
+    try:
+        with open(source_path, 'rb') as src:
+            if zstandard:
+                with open(tmp_path, 'wb') as raw:
+                    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1)
+                    compressor.copy_stream(src, raw, read_size=COPY_BLOCK_SIZE)
+            else:
+                with gzip.open(tmp_path, 'wb', compresslevel=GZIP_LEVEL) as dst:
+                    shutil.copyfileobj(src, dst, COPY_BLOCK_SIZE)
+        os.replace(tmp_path, dest)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return dest, os.path.getsize(dest)
+
+
+def restore_file(field_file):
+    """
+    Decompress an archived file back to its hot path (no-op if it is already there).
+
+    Returns:
+        bool: True if the file was restored from the cold tier
+    """
+    from .storage_ledger import record_change
+
+    if not field_file or not field_file.name:
+        return False
+    hot_path = field_file.path
+    if os.path.exists(hot_path):
+        return False
+    source = archive_path(field_file.name)
+    if not source:
+        return False
+
+    os.makedirs(os.path.dirname(hot_path), exist_ok=True)
+    tmp_path = f"{hot_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with _open_archive(source) as src, open(tmp_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, COPY_BLOCK_SIZE)
+        os.replace(tmp_path, hot_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    record_change(field_file.name, os.path.getsize(hot_path), 1)
+    logger.info(f"Restored {field_file.name} from cold storage")
+    return True
+
+
+def ensure_hot(order):
+    """
+    Make sure a cold order's files are back on the hot tier before they are read.
+
+    Returns:
+        bool: True if anything was restored
+    """
+    if order.storage_tier != 'cold':
+        return False
+    from .models import Order
+
+    restored = False
+    for field_file in (order.document, order.image_upload):
+        restored = restore_file(field_file) or restored
+    # Archive stays; the next lifecycle run just drops the hot copy again
+    Order.objects.filter(pk=order.pk).update(storage_tier='hot')
+    order.storage_tier = 'hot'
+    return restored
+
+
+def iter_file_blocks(field_file):
+    """
+    Stream a file's bytes from whichever tier holds it, without restoring it.
+
+    Raises:
+        FileNotFoundError: neither a hot copy nor an archive exists
+    """
+    hot_path = field_file.path
+    if os.path.exists(hot_path):
+        opener = lambda: open(hot_path, 'rb')
+    else:
+        source = archive_path(field_file.name)
+        if not source:
+            raise FileNotFoundError(field_file.name)
+        opener = lambda: _open_archive(source)
+
+    def blocks():
+        with opener() as f:
+            for block in iter(lambda: f.read(COPY_BLOCK_SIZE), b''):
+                yield block
+    return blocks()
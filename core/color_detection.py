@@ -0,0 +1,139 @@
+"""
+Colour Page Detection for FastCopy
+Classifies every page of a PDF as colour or greyscale so the "Custom Split"
+colour page field can be pre-filled and verified instead of trusted.
+
+Pages are rendered at low DPI in the PDF worker pool (rendering is CPU-bound
+and would otherwise hold the request thread / GIL). Results are cached by file
+hash, so re-uploading the same document is instant - across all workers only
+when a shared cache is configured (CACHE_DIR, settings section 20); with the
+default per-process cache a re-upload is only instant on the same worker.
+"""
+
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLOR_DETECTION_DPI = 20    # Low DPI is plenty to tell colour from greyscale
+COLOR_CHROMA_THRESHOLD = 24 # max(R,G,B) - min(R,G,B) above this counts as a colour pixel
+COLOR_PIXEL_RATIO = 0.001   # Fraction of colour pixels needed to call a page colour
+PAGES_PER_JOB = 25          # Pages rendered per worker job
+CACHE_TIMEOUT = 60 * 60 * 24 * 30  # 30 days
+CACHE_VERSION = 1           # Bump when the classifier changes
+
+
+def page_has_color(page):
+    """
+    Render a page at low DPI and check whether it contains colour pixels.
+
+    Args:
+        page: fitz.Page
+
+    Returns:
+        bool: True if the page should be printed in colour
+    """
+    import fitz
+    from PIL import Image, ImageChops
+
+    pix = page.get_pixmap(dpi=COLOR_DETECTION_DPI, colorspace=fitz.csRGB, alpha=False)
+    if not pix.width or not pix.height:
+        return False
+    img = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+    r, g, b = img.split()
+    chroma = ImageChops.difference(
+        ImageChops.lighter(ImageChops.lighter(r, g), b),
+        ImageChops.darker(ImageChops.darker(r, g), b),
+    )
+    color_pixels = sum(chroma.histogram()[COLOR_CHROMA_THRESHOLD:])
+    return color_pixels / (pix.width * pix.height) > COLOR_PIXEL_RATIO
+
+
+def classify_page_range(file_path, start, stop):
+    """
+    Worker job: return the 1-based numbers of colour pages in [start, stop).
+    The module imports Django lazily, so this runs in a bare worker process.
+    """
+    import fitz
+
+    with fitz.open(file_path) as doc:
+        return [index + 1 for index in range(start, min(stop, doc.page_count)) if page_has_color(doc[index])]
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Stream a file through SHA-256 and return the hex digest."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detect_color_pages(file_path, file_hash=None):
+    """
+    Detect colour pages in a PDF.
+
+    Args:
+        file_path: absolute path to the PDF
+        file_hash: optional precomputed SHA-256 of the file
+
+    Returns:
+        dict: {'page_count': int, 'color_pages': "1,3,5-7", 'color_count': int, 'cached': bool}
+
+    Raises:
+        ValueError: encrypted or invalid PDF
+        PdfWorkerError: pool busy, job timed out or worker crashed
+    """
+    from django.core.cache import cache
+    from .pdf_workers import get_pool, count_pages_job
+    from .utils import format_page_ranges
+
+    file_hash = file_hash or file_sha256(file_path)
+    cache_key = f"color_pages:{CACHE_VERSION}:{file_hash}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return dict(cached, cached=True)
+
+    pool = get_pool()
+    counted = pool.run(count_pages_job, file_path)
+    if 'error' in counted:
+        raise ValueError(counted['error'])
+    page_count = counted['pages']
+
+    # Split large documents into chunks so several workers render in parallel
+    chunks = pool.run_many(
+        classify_page_range,
+        [(file_path, start, start + PAGES_PER_JOB) for start in range(0, page_count, PAGES_PER_JOB)],
+    )
+    color_pages = [page for chunk in chunks for page in chunk]
+
+    result = {
+        'page_count': page_count,
+        'color_pages': format_page_ranges(color_pages),
+        'color_count': len(color_pages),
+    }
+    cache.set(cache_key, result, CACHE_TIMEOUT)
+    logger.info(f"Colour detection: {page_count} pages, colour: {result['color_pages'] or 'none'}")
+    return dict(result, cached=False)
+
+
+def verify_color_pages(declared, detected, total_pages):
+    """
+    Compare customer-declared colour pages with detected ones.
+
+    Args:
+        declared: range string entered by the customer
+        detected: range string from detect_color_pages
+        total_pages: page count of the document
+
+    Returns:
+        dict: {'undeclared': "2,9", 'undeclared_count': int, 'ok': bool}
+    """
+    from .utils import parse_page_ranges, format_page_ranges
+
+    undeclared = parse_page_ranges(detected, total_pages) - parse_page_ranges(declared, total_pages)
+    return {
+        'undeclared': format_page_ranges(undeclared),
+        'undeclared_count': len(undeclared),
+        'ok': not undeclared,
+    }
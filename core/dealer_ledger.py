@@ -0,0 +1,302 @@
+"""
+Dealer Ledger for FastCopy
+Append-only record of dealer earnings and payouts, with running balances:
+
+- When an order reaches Delivered (any path: dealer, delivery staff, admin),
+  the dealer of its location is credited the dealer amount, plus the dealer
+  delivery charge once per transaction (the same rule as the dashboard).
+- Every entry updates DealerBalance in the same transaction, under a row
+  lock, and stores the resulting balance on the entry.
+- `python manage.py settle_dealers` closes a period per dealer: it sums the
+  entries created before the period end that no earlier settlement covered
+  into a DealerSettlement, appends a negative 'payout' entry and writes a
+  CSV statement.
+- Backfilled credits are dated at the order's delivery, so they can land
+  in an earlier period than their id suggests; settlements therefore go by
+  created_at and never assume ids and dates run in the same order.
+
+Entries carry an idempotency key (`reference`), so re-saving a delivered
+order or re-running a backfill never credits it twice. Corrections are new
+'adjustment' entries; nothing is edited.
+
+A location is expected to have one dealer; if several are assigned, the
+earning goes to the one with the lowest profile id (see core/location_map.py).
+"""
+
+import csv
+import os
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q, Sum
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+CREDIT_TYPES = ('earning', 'delivery', 'adjustment')
+
+
+def _money(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def dealer_for_location(location_id):
+    """Dealer user assigned to a location, or None."""
+    from django.contrib.auth.models import User
+    from .location_map import dealer_user_ids
+
+    dealer_ids = dealer_user_ids(location_id)
+    return User.objects.filter(pk=dealer_ids[0]).first() if dealer_ids else None
+
+
+# --- ENTRIES ---
+
+def append_entry(dealer, entry_type, amount, order=None, transaction_id=None, reference=None,
+                 description='', settlement=None, created_at=None):
+    """
+    Append a ledger entry and move the dealer's running balance.
+
+    Args:
+        dealer: User
+        entry_type: 'earning', 'delivery', 'adjustment' or 'payout'
+        amount: positive = owed to dealer, negative = paid out
+        reference: optional idempotency key; an existing key makes this a no-op
+        created_at: optional date of the entry (backfills), default now
+
+    Returns:
+        DealerLedgerEntry or None if the reference was already recorded
+    """
+    from .models import DealerBalance, DealerLedgerEntry
+
+    amount = _money(amount)
+    if reference and DealerLedgerEntry.objects.filter(reference=reference).exists():
+        return None
+    try:
+        with transaction.atomic():
+            DealerBalance.objects.get_or_create(dealer=dealer)
+            balance = DealerBalance.objects.select_for_update().get(dealer=dealer)
+            balance.balance += amount
+            if entry_type == 'payout':
+                balance.total_paid -= amount
+            else:
+                balance.total_earned += amount
+            entry = DealerLedgerEntry.objects.create(
+                dealer=dealer, entry_type=entry_type, amount=amount, balance_after=balance.balance,
+                order=order, transaction_id=transaction_id, reference=reference,
+                description=description[:255], settlement=settlement,
+            )
+            if created_at is not None:
+                # auto_now_add ignores a value passed to create()
+                DealerLedgerEntry.objects.filter(pk=entry.pk).update(created_at=created_at)
+                entry.created_at = created_at
+            balance.save(update_fields=['balance', 'total_earned', 'total_paid', 'updated_at'])
+    except IntegrityError:
+        # Same reference recorded concurrently
+        return None
+    return entry
+
+
+def record_delivery(order, dealer_pricing=None, created_at=None):
+    """
+    Credit the dealer for a delivered, paid order (idempotent).
+
+    Args:
+        order: Order (status must be Delivered)
+        dealer_pricing: optional dict from pricing_for(True), for batch use
+        created_at: optional date of the entries (backfills), default now
+
+    Returns:
+        Decimal: amount credited (0 if nothing was recorded)
+    """
+    from .models import DealerLedgerEntry
+    from .utils import calculate_dealer_price, pricing_for
+
+    if order.status != 'Delivered' or order.payment_status != 'Success':
+        return Decimal('0')
+    if DealerLedgerEntry.objects.filter(reference=f"earning:{order.pk}").exists():
+        return Decimal('0')
+    dealer = dealer_for_location(order.location_id)
+    if dealer is None:
+        logger.warning(f"No dealer for location {order.location_id}, order {order.order_id} not credited")
+        return Decimal('0')
+
+    pricing = dealer_pricing or pricing_for(True)
+    credited = Decimal('0')
+    with transaction.atomic():
+        entry = append_entry(dealer, 'earning', calculate_dealer_price(order, pricing), order=order,
+                             transaction_id=order.transaction_id, reference=f"earning:{order.pk}",
+                             description=f"Order {order.order_id}", created_at=created_at)
+        if entry:
+            credited += entry.amount
+        if entry and order.transaction_id:
+            fee = append_entry(dealer, 'delivery', pricing['delivery_charge'], order=order,
+                               transaction_id=order.transaction_id,
+                               reference=f"delivery:{dealer.pk}:{order.transaction_id}",
+                               description=f"Delivery {order.transaction_id}", created_at=created_at)
+            if fee:
+                credited += fee.amount
+    return credited
+
+
+def record_delivered_orders(queryset, dated_before=None):
+    """
+    Credit every delivered order in a queryset that has no earning yet (backfill).
+
+    Args:
+        queryset: Order queryset
+        dated_before: optional aware datetime; the entries are dated at the
+            order's delivery (its last update), but no later than just before
+            this, so a settlement up to it includes them
+
+    Returns:
+        tuple: (orders credited, total amount)
+    """
+    from .models import DealerLedgerEntry
+    from .utils import pricing_for
+
+    credited_ids = DealerLedgerEntry.objects.filter(entry_type='earning', order__isnull=False).values('order_id')
+    orders = queryset.filter(status='Delivered', payment_status='Success').exclude(pk__in=credited_ids)
+    pricing = pricing_for(True)
+    count, total = 0, Decimal('0')
+    for order in orders.order_by('pk').iterator(chunk_size=500):
+        created_at = None
+        if dated_before is not None:
+            created_at = min(order.updated_at, dated_before - timedelta(microseconds=1))
+        amount = record_delivery(order, pricing, created_at=created_at)
+        if amount:
+            count += 1
+            total += amount
+    return count, total
+
+
+# --- SETTLEMENT ---
+
+def _settled(settlements):
+    """Exists() over the settlements that cover the outer ledger entry."""
+    return Exists(settlements.filter(
+        dealer_id=OuterRef('dealer_id'), first_entry_id__lte=OuterRef('id'),
+        last_entry_id__gte=OuterRef('id'), period_end__gt=OuterRef('created_at'),
+    ))
+
+
+def settle_dealer(dealer, period_end, dry_run=False):
+    """
+    Close the dealer's open entries created before period_end.
+
+    An entry is settled by the settlement whose id range holds it and whose
+    period_end is after it. An entry created after the previous period_end
+    can have a lower id than a backfilled entry that was dated into that
+    period, so it is still open even though it is below last_entry_id.
+
+    Args:
+        dealer: User
+        period_end: aware datetime (exclusive)
+        dry_run: compute the totals without writing anything
+
+    Returns:
+        DealerSettlement (unsaved when dry_run) or None if there is nothing to settle
+    """
+    from .models import DealerBalance, DealerLedgerEntry, DealerSettlement
+
+    with transaction.atomic():
+        # Lock the balance row so two settlement runs cannot overlap
+        DealerBalance.objects.select_for_update().filter(dealer=dealer).first()
+        previous = DealerSettlement.objects.filter(dealer=dealer).order_by('-last_entry_id').first()
+        open_entries = DealerLedgerEntry.objects.filter(
+            dealer=dealer, entry_type__in=CREDIT_TYPES, created_at__lt=period_end,
+        )
+        if previous:
+            open_entries = open_entries.filter(
+                Q(id__gt=previous.last_entry_id) | Q(created_at__gte=previous.period_end)
+            ).exclude(_settled(DealerSettlement.objects.all()))
+        span = open_entries.aggregate(first=Min('id'), last=Max('id'))
+        if span['last'] is None:
+            return None
+
+        sums = {row['entry_type']: row for row in
+                open_entries.order_by().values('entry_type').annotate(total=Sum('amount'), count=Count('id'))}
+        total_of = lambda kind: _money(sums[kind]['total'] if kind in sums else 0)
+        settlement = DealerSettlement(
+            dealer=dealer, period_end=period_end,
+            first_entry_id=span['first'], last_entry_id=span['last'],
+            entry_count=sum(row['count'] for row in sums.values()),
+            earnings=total_of('earning'), delivery_fees=total_of('delivery'), adjustments=total_of('adjustment'),
+        )
+        settlement.amount = settlement.earnings + settlement.delivery_fees + settlement.adjustments
+        if dry_run:
+            return settlement
+
+        settlement.save()
+        append_entry(dealer, 'payout', -settlement.amount, settlement=settlement,
+                     reference=f"payout:{settlement.pk}", description=f"Settlement {settlement.pk}")
+
+    try:
+        settlement.statement_path = write_statement(settlement)
+        settlement.save(update_fields=['statement_path'])
+    except Exception as e:
+        logger.error(f"Could not write statement for settlement {settlement.pk}: {e}")
+    return settlement
+
+
+def write_statement(settlement):
+    """
+    Write the payout statement CSV of a settlement.
+
+    Returns:
+        str: path of the statement
+    """
+    from .models import DealerLedgerEntry, DealerSettlement
+
+    directory = os.path.join(
+        getattr(settings, 'DEALER_STATEMENT_DIR', os.path.join(settings.BASE_DIR, 'dealer_statements')),
+        str(settlement.dealer_id),
+    )
+    os.makedirs(directory, exist_ok=True)
+    period_end = timezone.localtime(settlement.period_end)
+    path = os.path.join(directory, f"statement_{period_end:%Y%m%d}_{settlement.pk}.csv")
+
+    entries = DealerLedgerEntry.objects.filter(
+        dealer_id=settlement.dealer_id, entry_type__in=CREDIT_TYPES,
+        id__gte=settlement.first_entry_id, id__lte=settlement.last_entry_id, created_at__lt=settlement.period_end,
+    ).exclude(_settled(DealerSettlement.objects.filter(pk__lt=settlement.pk))).select_related('order').order_by('id')
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Dealer', settlement.dealer.get_full_name() or settlement.dealer.username])
+        writer.writerow(['Settlement', settlement.pk, 'Period end', f"{period_end:%Y-%m-%d %H:%M}"])
+        writer.writerow([])
+        writer.writerow(['Date', 'Type', 'Order ID', 'Transaction ID', 'Description', 'Amount'])
+        for entry in entries.iterator(chunk_size=1000):
+            writer.writerow([
+                f"{timezone.localtime(entry.created_at):%Y-%m-%d %H:%M}", entry.get_entry_type_display(),
+                entry.order.order_id if entry.order else '', entry.transaction_id or '',
+                entry.description, entry.amount,
+            ])
+        writer.writerow([])
+        writer.writerow(['Earnings', settlement.earnings])
+        writer.writerow(['Delivery fees', settlement.delivery_fees])
+        writer.writerow(['Adjustments', settlement.adjustments])
+        writer.writerow(['Total payout', settlement.amount])
+    return path
+
+
+# --- READS ---
+
+def dealer_summary(dealer):
+    """
+    Running totals of a dealer (one indexed row).
+
+    Returns:
+        dict: balance, total_earned, total_paid, last_settlement (or None)
+    """
+    from .models import DealerBalance, DealerSettlement
+
+    balance = DealerBalance.objects.filter(dealer=dealer).first()
+    return {
+        'balance': balance.balance if balance else Decimal('0'),
+        'total_earned': balance.total_earned if balance else Decimal('0'),
+        'total_paid': balance.total_paid if balance else Decimal('0'),
+        'last_settlement': DealerSettlement.objects.filter(dealer=dealer).order_by('-last_entry_id').first(),
+    }
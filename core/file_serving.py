@@ -0,0 +1,164 @@
+"""
+File Serving for FastCopy
+Serves order files after the view has done its permission check, with:
+- HTTP Range requests (206 / 416), so PDF viewers can load pages lazily
+- ETag / Last-Modified and conditional requests (304 / 412)
+- Optional hand-off of the byte transfer to the front proxy, so the
+  waitress thread is released as soon as the permission check is done
+
+Backends (settings.FILE_SERVING_BACKEND):
+    'python'    stream from Django (default, works everywhere)
+    'nginx'     X-Accel-Redirect to FILE_SERVING_ACCEL_PREFIX + path relative to MEDIA_ROOT
+    'sendfile'  X-Sendfile with the absolute path (Apache mod_xsendfile, lighttpd, Caddy)
+
+Example nginx location for the 'nginx' backend:
+
+    location /protected-media/ {
+        internal;
+        alias /path/to/fastcopy/media/;
+    }
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+import logging
+
+logger = logging.getLogger(__name__)
+
+STREAM_BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(stat_result):
+    """Strong ETag derived from size + modification time (files are never edited in place)."""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header.
+
+    Args:
+        header: value of the Range header (e.g. "bytes=0-1023", "bytes=-500")
+        size: file size in bytes
+
+    Returns:
+        (start, end) inclusive byte positions, None if the header should be
+        ignored (missing, malformed or multi-range), or False if unsatisfiable
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or not size:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    if end < start:
+        return None
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    """If-Range: only honour the Range header if the validator still matches."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def _stream_range(file_path, start, length):
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def serve_file(request, file_path, filename=None, as_attachment=False):
+    """
+    Build a response for a file on disk. Call only after permission checks.
+
+    Args:
+        request: HttpRequest (Range / If-* headers are read from it)
+        file_path: absolute path inside MEDIA_ROOT
+        filename: download name for Content-Disposition (default: basename)
+        as_attachment: force download instead of inline display
+
+    Returns:
+        HttpResponse (200, 206, 304, 412 or 416)
+
+    Raises:
+        FileNotFoundError: if the file does not exist
+    """
+    stat_result = os.stat(file_path)
+    size = stat_result.st_size
+    etag = file_etag(stat_result)
+    last_modified = stat_result.st_mtime
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if conditional is not None:
+        return conditional
+
+    filename = filename or os.path.basename(file_path)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    backend = getattr(settings, 'FILE_SERVING_BACKEND', 'python')
+
+    if backend in ('nginx', 'sendfile'):
+        # The proxy handles Range and the transfer itself
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            relative_path = os.path.relpath(file_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+            prefix = getattr(settings, 'FILE_SERVING_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative_path)
+        else:
+            response['X-Sendfile'] = file_path
+    else:
+        byte_range = None
+        if request.method in ('GET', 'HEAD') and _if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers.get('Range'), size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416, content_type=content_type)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(_stream_range(file_path, start, length), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(length)
+        else:
+            # FileResponse uses the server's wsgi.file_wrapper when available
+            response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    # Permission-gated: only the browser may cache, and it must revalidate (cheap 304)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
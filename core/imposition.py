@@ -0,0 +1,160 @@
+"""
+N-up Imposition for FastCopy
+Lays out "Custom Printing" documents as 1/4, 1/8 or 1/9 sheets server-side:
+
+    1/4  ->  2 x 2 on A4 portrait
+    1/8  ->  4 x 2 on A4 landscape (cells stay portrait)
+    1/9  ->  3 x 3 on A4 portrait
+
+Source pages are placed one at a time (show_pdf_page references each page
+as a form XObject, nothing is rasterised), sheet by sheet, in the PDF worker
+pool. Output is cached by file hash + layout, so re-imposing the same upload
+(or re-building a print bundle) is free. Every reuse touches the cached file,
+so cleanup_order_files can drop outputs unused for
+FileCleanupManager.RETENTION_IMPOSED days; they are recorded in the storage
+ledger (print_files).
+"""
+
+import os
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPOSED_DIR = 'orders/imposed'
+IMPOSITION_VERSION = 1      # Bump when the sheet geometry changes
+A4 = (595, 842)             # points, portrait
+SHEET_MARGIN = 12           # points around the sheet
+CELL_GAP = 6                # points between cells
+
+# layout -> (columns, rows, landscape sheet)
+LAYOUTS = {
+    '1/4': (2, 2, False),
+    '1/8': (4, 2, True),
+    '1/9': (3, 3, False),
+}
+
+
+def order_layout(order):
+    """Layout key ('1/4', '1/8', '1/9') of a Custom Printing order, defaulting to 1/4."""
+    mode = str(order.print_mode or '')
+    for layout in ('1/9', '1/8', '1/4'):
+        if layout in mode:
+            return layout
+    return '1/4'
+
+
+def sheet_count(pages, layout):
+    """Exact number of imposed sheets (one side each) for a page count."""
+    per_sheet = LAYOUTS[layout][0] * LAYOUTS[layout][1]
+    return -(-pages // per_sheet)
+
+
+def _cell_rects(layout):
+    import fitz
+
+    columns, rows, landscape = LAYOUTS[layout]
+    width, height = (A4[1], A4[0]) if landscape else A4
+    cell_w = (width - 2 * SHEET_MARGIN - (columns - 1) * CELL_GAP) / columns
+    cell_h = (height - 2 * SHEET_MARGIN - (rows - 1) * CELL_GAP) / rows
+    cells = []
+    for row in range(rows):
+        for column in range(columns):
+            x0 = SHEET_MARGIN + column * (cell_w + CELL_GAP)
+            y0 = SHEET_MARGIN + row * (cell_h + CELL_GAP)
+            cells.append(fitz.Rect(x0, y0, x0 + cell_w, y0 + cell_h))
+    return (width, height), cells
+
+
+def impose_job(source_path, output_path, layout):
+    """
+    Worker job: write the N-up version of source_path to output_path.
+
+    Returns:
+        dict: {'pages': source page count, 'sheets': imposed sheet count}
+    """
+    import fitz
+
+    (width, height), cells = _cell_rects(layout)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+
+    with fitz.open(source_path) as src:
+        if not src.is_pdf:
+            src_pdf = fitz.open("pdf", src.convert_to_pdf())
+        else:
+            src_pdf = src
+        out = fitz.open()
+        sheet = None
+        for index in range(src_pdf.page_count):
+            slot = index % len(cells)
+            if slot == 0:
+                sheet = out.new_page(width=width, height=height)
+            page_rect = src_pdf[index].rect
+            cell = cells[slot]
+            # Turn landscape pages in portrait cells (and vice versa) to use the space
+            rotate = 90 if (page_rect.width > page_rect.height) != (cell.width > cell.height) else 0
+            sheet.show_pdf_page(cell, src_pdf, index, rotate=rotate)
+
+        pages, sheets = src_pdf.page_count, out.page_count
+        out.save(tmp_path, garbage=3, deflate=True)
+        out.close()
+        if src_pdf is not src:
+            src_pdf.close()
+
+    os.replace(tmp_path, output_path)
+    return {'pages': pages, 'sheets': sheets}
+
+
+def imposed_path(file_hash, layout):
+    name = f"{file_hash}_{layout.replace('/', '-')}_v{IMPOSITION_VERSION}.pdf"
+    return os.path.join(settings.MEDIA_ROOT, IMPOSED_DIR, name)
+
+
+def impose_file(source_path, layout, file_hash=None):
+    """
+    N-up a document, reusing the cached output when the same file was imposed before.
+
+    Args:
+        source_path: absolute path of the PDF (or image)
+        layout: '1/4', '1/8' or '1/9'
+        file_hash: optional precomputed SHA-256 of the source
+
+    Returns:
+        str: absolute path of the imposed PDF
+
+    Raises:
+        ValueError: unknown layout
+        PdfWorkerError: pool busy, job timed out or worker crashed
+    """
+    from .color_detection import file_sha256
+    from .pdf_workers import run_job
+    from .storage_ledger import record_change
+
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+
+    output_path = imposed_path(file_hash or file_sha256(source_path), layout)
+    try:
+        os.utime(output_path)  # mtime = last use, for cleanup
+        return output_path
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    result = run_job(impose_job, source_path, output_path, layout)
+    record_change(os.path.relpath(output_path, settings.MEDIA_ROOT), os.path.getsize(output_path), 1)
+    logger.info(f"Imposed {result['pages']} pages as {layout}: {result['sheets']} sheets -> {output_path}")
+    return output_path
+
+
+def impose_order(order):
+    """
+    N-up the document of a Custom Printing order.
+
+    Returns:
+        str or None: absolute path of the imposed PDF (None if the order has no file)
+    """
+    file_field = order.document if order.document else order.image_upload
+    if not file_field:
+        return None
+    return impose_file(file_field.path, order_layout(order))
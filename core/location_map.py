@@ -0,0 +1,135 @@
+"""
+Location Lookups for FastCopy
+Order.location is a foreign key to Location; this module holds the lookups
+around it:
+
+- resolve_locations(): checkout location names -> Location rows, one query per batch
+- dealer_location_map(): {location id: [dealer user ids]}, read from the
+  UserProfile.dealer_locations join table once and cached, so notifications
+  and the dealer ledger find a location's dealers without querying
+- user_assignments(): one user's role flags and location ids, cached per
+  user and filled at login, so the dealer/delivery decorators, dashboards
+  and pricing need no profile queries
+
+Both are invalidated by core/signals.py whenever dealer assignments,
+profiles or locations change. That invalidation only reaches the cache of
+the process that made the change, so with a per-process cache (the default
+LocMemCache) other workers would keep the old values until the timeout.
+The location map tolerates that; user assignments decide access, so they
+are only cached across requests when the cache is shared (CACHE_DIR in
+settings, or Redis/Memcached); otherwise they are read once per request.
+"""
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'dealer_location_map:v1'
+CACHE_TIMEOUT = 600  # seconds; changes invalidate it immediately
+ASSIGNMENTS_KEY = 'user_assignments:v1:{}'
+ASSIGNMENTS_TIMEOUT = 600
+
+NO_ASSIGNMENTS = {'has_profile': False, 'is_dealer': False, 'is_delivery_boy': False, 'location_ids': []}
+
+
+def resolve_locations(names):
+    """
+    Map location names (as posted by the services form) to Location rows.
+
+    Returns:
+        dict: {name: Location}; unknown names are left out
+    """
+    from .models import Location
+
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    return {location.name: location for location in Location.objects.filter(name__in=names)}
+
+
+def build_dealer_location_map():
+    """Read the dealer assignments: {location id: [dealer user ids, by profile id]}."""
+    from .models import UserProfile
+
+    through = UserProfile.dealer_locations.through
+    rows = through.objects.filter(userprofile__is_dealer=True).order_by('userprofile_id').values_list(
+        'location_id', 'userprofile__user_id'
+    )
+    mapping = {}
+    for location_id, user_id in rows:
+        mapping.setdefault(location_id, []).append(user_id)
+    return mapping
+
+
+def dealer_location_map():
+    mapping = cache.get(CACHE_KEY)
+    if mapping is None:
+        mapping = build_dealer_location_map()
+        cache.set(CACHE_KEY, mapping, CACHE_TIMEOUT)
+    return mapping
+
+
+def dealer_user_ids(location_id):
+    """User ids of the dealers assigned to a location (empty list if none)."""
+    if not location_id:
+        return []
+    return dealer_location_map().get(location_id, [])
+
+
+def invalidate_dealer_location_map():
+    cache.delete(CACHE_KEY)
+
+
+# --- PER-USER ASSIGNMENTS ---
+
+def assignments_cache_enabled():
+    """True when the default cache is shared by every worker, so invalidation reaches them all."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def load_user_assignments(user_id):
+    """
+    Read a user's role flags and assigned location ids and cache them (shared cache only).
+
+    Returns:
+        dict: has_profile, is_dealer, is_delivery_boy, location_ids
+    """
+    from .models import UserProfile
+
+    profile = UserProfile.objects.filter(user_id=user_id).values('pk', 'is_dealer', 'is_delivery_boy').first()
+    if profile is None:
+        assignments = dict(NO_ASSIGNMENTS)
+    else:
+        through = UserProfile.dealer_locations.through
+        assignments = {
+            'has_profile': True,
+            'is_dealer': profile['is_dealer'],
+            'is_delivery_boy': profile['is_delivery_boy'],
+            'location_ids': sorted(through.objects.filter(userprofile_id=profile['pk']).values_list('location_id', flat=True)),
+        }
+    if assignments_cache_enabled():
+        cache.set(ASSIGNMENTS_KEY.format(user_id), assignments, ASSIGNMENTS_TIMEOUT)
+    return assignments
+
+
+def user_assignments(user):
+    """
+    Role flags and location ids of a user (shared cache, then database).
+    Memoised on the user object for the rest of the request.
+    """
+    if not user or not user.is_authenticated:
+        return NO_ASSIGNMENTS
+    assignments = getattr(user, '_fastcopy_assignments', None)
+    if assignments is None:
+        assignments = cache.get(ASSIGNMENTS_KEY.format(user.pk)) if assignments_cache_enabled() else None
+        if assignments is None:
+            assignments = load_user_assignments(user.pk)
+        user._fastcopy_assignments = assignments
+    return assignments
+
+
+def invalidate_user_assignments(*user_ids):
+    cache.delete_many([ASSIGNMENTS_KEY.format(user_id) for user_id in user_ids])
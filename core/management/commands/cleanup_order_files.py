@@ -7,12 +7,14 @@ Usage:
     python manage.py cleanup_order_files --status=delivered
     python manage.py cleanup_order_files --days=30
     python manage.py cleanup_order_files --no-temp
+    python manage.py cleanup_order_files --no-archive
 """
 
 from django.core.management.base import BaseCommand
 from django.core.mail import send_mail
 from django.conf import settings
 from core.cleanup import FileCleanupManager, format_bytes
+from core.order_events import prune_events
 from datetime import datetime
 
 
@@ -40,6 +42,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Skip cleaning temporary files',
         )
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Skip moving delivered order files to cold storage',
+        )
         parser.add_argument(
             '--send-email',
             action='store_true',
@@ -51,6 +58,7 @@ class Command(BaseCommand):
         status = options['status']
         days = options['days']
         include_temp = not options['no_temp']
+        include_archive = not options['no_archive']
         send_email = options['send_email']
 
         # Display header
@@ -66,11 +74,19 @@ class Command(BaseCommand):
         self.stdout.write(self.style.HTTP_INFO('Configuration:'))
         if status:
             self.stdout.write(f'  Status filter: {status}')
+        cold_storage = getattr(settings, 'COLD_STORAGE_ENABLED', True)
         if days:
-            self.stdout.write(f'  Retention days: {days}')
+            self.stdout.write(f'  Retention days: {days}' + (' (archived files keep their cold retention)' if cold_storage else ''))
         else:
-            self.stdout.write(f'  Retention days: Default (Delivered: 30, Cancelled: 7, Failed: 3)')
+            self.stdout.write(f'  Retention days: Default (Delivered: {FileCleanupManager.RETENTION_DELIVERED}, '
+                              f'Cancelled: {FileCleanupManager.RETENTION_CANCELLED}, Failed: {FileCleanupManager.RETENTION_FAILED})')
         self.stdout.write(f'  Include temp files: {include_temp}')
+        if include_temp:
+            self.stdout.write(f'  Print bundles: deleted after {FileCleanupManager.RETENTION_PRINT_JOBS} days, '
+                              f'imposed PDFs after {FileCleanupManager.RETENTION_IMPOSED} days unused')
+        if include_archive and cold_storage:
+            self.stdout.write(f'  Cold storage: Delivered files archived after {days or FileCleanupManager.RETENTION_DELIVERED} days, '
+                              f'deleted {FileCleanupManager.RETENTION_COLD} days after delivery')
         self.stdout.write('')
 
         # Get storage stats before cleanup
@@ -82,6 +98,7 @@ class Command(BaseCommand):
         self.stdout.write(f'  Orders (Images): {storage_stats["orders_images_mb"]} MB')
         self.stdout.write(f'  Temp files: {storage_stats["temp_files_mb"]} MB')
         self.stdout.write(f'  Offers: {storage_stats["offers_mb"]} MB')
+        self.stdout.write(f'  Print files: {storage_stats["print_files_mb"]} MB')
         self.stdout.write(f'  Total: {storage_stats["total_mb"]} MB')
         self.stdout.write('')
 
@@ -90,7 +107,8 @@ class Command(BaseCommand):
         stats = cleanup_manager.run_cleanup(
             status=status,
             days=days,
-            include_temp=include_temp
+            include_temp=include_temp,
+            include_archive=include_archive
         )
 
         # Display results
@@ -106,36 +124,23 @@ class Command(BaseCommand):
         self.stdout.write(f'  Files deleted: {stats["total_files_deleted"]}')
         self.stdout.write(f'  Storage freed: {stats["total_size_freed_mb"]} MB ({format_bytes(stats["total_size_freed"])})')
         self.stdout.write(f'  Failed deletions: {stats["failed_deletions"]}')
+        if stats['orders_archived']:
+            self.stdout.write(f'  Orders moved to cold storage: {stats["orders_archived"]} '
+                              f'({format_bytes(stats["archive_bytes_in"])} -> {format_bytes(stats["archive_bytes_out"])})')
         self.stdout.write('')
 
         # Show breakdown by file type
-        if stats['deleted_files']:
-            file_types = {}
-            for file_info in stats['deleted_files']:
-                file_type = file_info['file_type']
-                if file_type not in file_types:
-                    file_types[file_type] = {'count': 0, 'size': 0}
-                file_types[file_type]['count'] += 1
-                file_types[file_type]['size'] += file_info['size']
-
+        if stats['by_file_type']:
             self.stdout.write(self.style.HTTP_INFO('📁 Breakdown by File Type:'))
-            for file_type, data in file_types.items():
+            for file_type, data in stats['by_file_type'].items():
                 size_mb = round(data['size'] / (1024 * 1024), 2)
                 self.stdout.write(f'  {file_type.capitalize()}: {data["count"]} files, {size_mb} MB')
             self.stdout.write('')
 
         # Show breakdown by order status
-        if stats['deleted_files']:
-            status_breakdown = {}
-            for file_info in stats['deleted_files']:
-                order_status = file_info['status']
-                if order_status not in status_breakdown:
-                    status_breakdown[order_status] = {'count': 0, 'size': 0}
-                status_breakdown[order_status]['count'] += 1
-                status_breakdown[order_status]['size'] += file_info['size']
-
+        if stats['by_status']:
             self.stdout.write(self.style.HTTP_INFO('📊 Breakdown by Order Status:'))
-            for order_status, data in status_breakdown.items():
+            for order_status, data in stats['by_status'].items():
                 size_mb = round(data['size'] / (1024 * 1024), 2)
                 self.stdout.write(f'  {order_status}: {data["count"]} files, {size_mb} MB')
             self.stdout.write('')
@@ -145,10 +150,13 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR('❌ Failed Deletions:'))
             for failed in stats['failed_files'][:10]:  # Show first 10
                 self.stdout.write(f'  Order: {failed["order_id"]} - {failed["error"]}')
-            if len(stats['failed_files']) > 10:
-                self.stdout.write(f'  ... and {len(stats["failed_files"]) - 10} more')
+            if stats['failed_deletions'] > 10:
+                self.stdout.write(f'  ... and {stats["failed_deletions"] - 10} more')
             self.stdout.write('')
 
+        self.stdout.write(f'📄 Full report: {stats["report_path"]}')
+        self.stdout.write('')
+
         # Get storage stats after cleanup
         if not dry_run:
             self.stdout.write(self.style.HTTP_INFO('📊 Storage After Cleanup:'))
@@ -159,6 +167,12 @@ class Command(BaseCommand):
             self.stdout.write(f'  Total: {storage_stats_after["total_mb"]} MB')
             self.stdout.write('')
 
+            # Live dashboard events are only needed for a couple of days
+            pruned = prune_events()
+            if pruned:
+                self.stdout.write(f'🧹 Pruned {pruned} live order events')
+                self.stdout.write('')
+
         # Send email report
         if send_email and not dry_run:
             self.send_email_report(stats, storage_stats)
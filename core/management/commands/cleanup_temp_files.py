@@ -11,7 +11,7 @@ from core.cleanup import FileCleanupManager, format_bytes
 
 
 class Command(BaseCommand):
-    help = 'Cleanup temporary files (temp and temp_img directories)'
+    help = 'Cleanup temporary files (temp and temp_img directories, abandoned chunked uploads)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -41,7 +41,7 @@ class Command(BaseCommand):
         self.stdout.write('')
         self.stdout.write(self.style.SUCCESS('✅ Temp Cleanup Completed'))
         self.stdout.write('')
-        self.stdout.write(f'  Files deleted: {len(cleanup_manager.deleted_files)}')
+        self.stdout.write(f'  Files deleted: {cleanup_manager.files_deleted}')
         self.stdout.write(f'  Storage freed: {format_bytes(cleanup_manager.total_size_freed)}')
         self.stdout.write('')
 
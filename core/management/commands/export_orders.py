@@ -0,0 +1,71 @@
+"""
+Django management command to export orders for accounting (CSV or XLSX).
+
+Usage:
+    python manage.py export_orders --output=orders.csv
+    python manage.py export_orders --format=xlsx --from=2025-04-01 --to=2026-03-31 --output=fy.xlsx
+    python manage.py export_orders --status=Delivered --location="Main Campus" --output=delivered.csv
+"""
+
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.cleanup import format_bytes
+from core.models import Order
+from core.order_export import EXPORT_FORMATS
+
+
+class Command(BaseCommand):
+    help = 'Stream orders (with coupon, discount, dealer amount and location) to a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            required=True,
+            help='File to write',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(EXPORT_FORMATS),
+            help='Export format (default: from the output file extension, else csv)',
+        )
+        parser.add_argument('--status', type=str, help='Only orders with this status')
+        parser.add_argument('--payment-status', type=str, help='Only orders with this payment status')
+        parser.add_argument('--location', type=str, help='Only orders for this location')
+        parser.add_argument('--from', dest='date_from', type=str, help='Created on or after (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=str, help='Created on or before (YYYY-MM-DD)')
+
+    def _day_start(self, value, option):
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'{option} must be YYYY-MM-DD, got "{value}"')
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or ('xlsx' if output.lower().endswith('.xlsx') else 'csv')
+
+        orders = Order.objects.all()
+        if options['status']:
+            orders = orders.filter(status=options['status'])
+        if options['payment_status']:
+            orders = orders.filter(payment_status=options['payment_status'])
+        if options['location']:
+            orders = orders.filter(location__name=options['location'])
+        if options['date_from']:
+            orders = orders.filter(created_at__gte=self._day_start(options['date_from'], '--from'))
+        if options['date_to']:
+            orders = orders.filter(created_at__lt=self._day_start(options['date_to'], '--to') + timedelta(days=1))
+
+        self.stdout.write(self.style.HTTP_INFO(f'📤 Exporting orders to {output} ({fmt.upper()})...'))
+
+        generator, _ = EXPORT_FORMATS[fmt]
+        written = 0
+        with open(output, 'wb') as f:
+            for chunk in generator(orders):
+                f.write(chunk)
+                written += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Export completed: {format_bytes(written)} written to {output}'))
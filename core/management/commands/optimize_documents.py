@@ -0,0 +1,51 @@
+"""
+Django management command to optimise stored order PDFs (downsample images, drop unused objects).
+
+Usage:
+    python manage.py optimize_documents
+    python manage.py optimize_documents --order=FC_ORDER_0000000123
+"""
+
+from django.core.management.base import BaseCommand
+from core.cleanup import format_bytes
+from core.models import Order
+from core.pdf_optimizer import PRINTED_STATUSES, optimize_order_document
+
+
+class Command(BaseCommand):
+    help = 'Optimise order PDFs that have not been optimised yet (unprinted orders only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--order',
+            type=str,
+            help='Optimise a single order ID',
+        )
+
+    def handle(self, *args, **options):
+        orders = Order.objects.exclude(document='').exclude(document__isnull=True).filter(
+            optimized_at__isnull=True
+        ).exclude(status__in=PRINTED_STATUSES)
+
+        if options['order']:
+            orders = orders.filter(order_id=options['order'])
+
+        order_ids = list(orders.values_list('id', flat=True))
+        self.stdout.write(self.style.HTTP_INFO(f'🗜️  Optimising {len(order_ids)} documents...'))
+
+        optimised = failed = 0
+        saved = 0
+        for order_id in order_ids:
+            try:
+                result = optimize_order_document(order_id)
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'  ❌ Order {order_id}: {e}'))
+                continue
+            if result:
+                optimised += 1
+                saved += result
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Optimisation completed: {optimised} optimised, {failed} failed, {format_bytes(saved)} saved'
+        ))
@@ -0,0 +1,54 @@
+"""
+Django management command to run PDF preflight (thumbnails, colour pages, page sizes).
+
+Usage:
+    python manage.py preflight_documents
+    python manage.py preflight_documents --retry-failed
+    python manage.py preflight_documents --order=FC_ORDER_0000000123
+"""
+
+from django.core.management.base import BaseCommand
+from core.models import Order
+from core.preflight import run_preflight
+
+
+class Command(BaseCommand):
+    help = 'Run preflight for order documents that have not been analysed yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also re-run documents whose previous preflight failed',
+        )
+        parser.add_argument(
+            '--order',
+            type=str,
+            help='Run preflight for a single order ID',
+        )
+
+    def handle(self, *args, **options):
+        orders = Order.objects.exclude(document='').exclude(document__isnull=True)
+
+        if options['order']:
+            orders = orders.filter(order_id=options['order'])
+        elif options['retry_failed']:
+            orders = orders.exclude(preflight__status='Done')
+        else:
+            orders = orders.filter(preflight__isnull=True)
+
+        order_ids = list(orders.values_list('id', flat=True))
+        self.stdout.write(self.style.HTTP_INFO(f'🔍 Running preflight for {len(order_ids)} documents...'))
+
+        done = failed = 0
+        for order_id in order_ids:
+            preflight = run_preflight(order_id)
+            if preflight is None:
+                continue
+            if preflight.status == 'Done':
+                done += 1
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'  ❌ {preflight.order.order_id}: {preflight.error}'))
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Preflight completed: {done} done, {failed} failed'))
@@ -0,0 +1,47 @@
+"""
+Django management command to rebuild the daily order rollups.
+Run nightly (after midnight) to repair anything the incremental updates missed.
+
+Usage:
+    python manage.py rebuild_rollups              # last 35 days
+    python manage.py rebuild_rollups --days=7
+    python manage.py rebuild_rollups --all        # every day since the first order
+"""
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+from core.models import DailyOrderRollup, Order
+from core.rollups import local_day, rebuild_range
+
+
+class Command(BaseCommand):
+    help = 'Recompute DailyOrderRollup rows from the orders table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=35,
+            help='Number of days to rebuild, ending today (default: 35)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild every day since the first order (and drop rollups before it)',
+        )
+
+    def handle(self, *args, **options):
+        today = local_day(timezone.now())
+
+        if options['all']:
+            first = Order.objects.aggregate(first=Min('created_at'))['first']
+            first_day = local_day(first) if first else today
+            DailyOrderRollup.objects.filter(day__lt=first_day).delete()
+        else:
+            first_day = today - timedelta(days=max(1, options['days']) - 1)
+
+        self.stdout.write(self.style.HTTP_INFO(f'📈 Rebuilding order rollups from {first_day} to {today}...'))
+        days, rows = rebuild_range(first_day, today)
+        self.stdout.write(self.style.SUCCESS(f'✅ Rollups rebuilt: {days} days, {rows} rows'))
@@ -0,0 +1,52 @@
+"""
+Django management command to recount media storage and correct the storage ledger.
+
+Usage:
+    python manage.py reconcile_storage
+    python manage.py reconcile_storage --dry-run
+
+Schedule it (e.g. nightly) next to cleanup_order_files to correct drift from
+files written or removed outside the storage API.
+"""
+
+from django.core.management.base import BaseCommand
+from core.cleanup import format_bytes
+from core.storage_ledger import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount media storage from disk and correct the storage ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the drift without updating the ledger',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(f'🧮 STORAGE LEDGER RECONCILE{" (DRY RUN)" if dry_run else ""}'))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write('')
+
+        report = reconcile(dry_run=dry_run)
+
+        for category, result in report.items():
+            drift = result['drift_bytes']
+            line = f'  {category}: {format_bytes(result["bytes"])} in {result["files"]} files'
+            if drift or result['drift_files']:
+                sign = '+' if drift >= 0 else '-'
+                self.stdout.write(self.style.WARNING(
+                    f'{line} (drift {sign}{format_bytes(abs(drift))}, {result["drift_files"]:+d} files)'
+                ))
+            else:
+                self.stdout.write(f'{line} (no drift)')
+
+        self.stdout.write('')
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️  Dry run - ledger not updated'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Storage ledger updated'))
@@ -0,0 +1,71 @@
+"""
+Django management command to close dealer payout periods.
+
+Settles every ledger entry created before --until (default: today 00:00, i.e.
+everything up to the end of yesterday) and writes one CSV statement per dealer.
+Delivered orders missing from the ledger (a credit that failed when the order
+was delivered) are credited first. Those credits are dated at the order's
+delivery, capped just before the period end, so they are paid out in this
+same run rather than the next one.
+
+Usage:
+    python manage.py settle_dealers
+    python manage.py settle_dealers --until=2026-10-01 --dealer=9876543210
+    python manage.py settle_dealers --dry-run
+    python manage.py settle_dealers --no-backfill  # settle without crediting missing delivered orders
+"""
+
+from datetime import datetime, time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.dealer_ledger import record_delivered_orders, settle_dealer
+from core.models import DealerLedgerEntry, Order
+
+
+class Command(BaseCommand):
+    help = 'Settle dealer ledger balances into payout statements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', type=str, help='Period end date, exclusive (YYYY-MM-DD, default: today)')
+        parser.add_argument('--dealer', type=str, help='Only settle this dealer (username)')
+        parser.add_argument('--dry-run', action='store_true', help='Show the payouts without settling')
+        parser.add_argument('--no-backfill', action='store_true',
+                            help='Skip crediting delivered orders that have no ledger entry before settling')
+
+    def handle(self, *args, **options):
+        if options['until']:
+            try:
+                day = datetime.strptime(options['until'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f'--until must be YYYY-MM-DD, got "{options["until"]}"')
+        else:
+            day = timezone.localdate()
+        period_end = timezone.make_aware(datetime.combine(day, time.min))
+
+        if not options['no_backfill'] and not options['dry_run']:
+            count, total = record_delivered_orders(Order.objects.filter(created_at__lt=period_end),
+                                                   dated_before=period_end)
+            self.stdout.write(self.style.HTTP_INFO(f'📒 Backfilled {count} delivered orders (₹{total:,.2f})'))
+
+        dealers = User.objects.filter(pk__in=DealerLedgerEntry.objects.values('dealer_id')).order_by('username')
+        if options['dealer']:
+            dealers = dealers.filter(username=options['dealer'])
+
+        mode = ' (DRY RUN)' if options['dry_run'] else ''
+        self.stdout.write(self.style.HTTP_INFO(f'💸 Settling dealer ledgers up to {period_end:%Y-%m-%d %H:%M}{mode}...'))
+
+        settled, paid = 0, 0
+        for dealer in dealers:
+            settlement = settle_dealer(dealer, period_end, dry_run=options['dry_run'])
+            if settlement is None:
+                continue
+            settled += 1
+            paid += settlement.amount
+            self.stdout.write(
+                f'  {dealer.get_full_name() or dealer.username}: {settlement.entry_count} entries, '
+                f'₹{settlement.amount:,.2f}'
+                + (f' -> {settlement.statement_path}' if settlement.statement_path else '')
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Settlement completed: {settled} dealers, ₹{paid:,.2f} total{mode}'))
@@ -8,6 +8,8 @@ Usage:
 from django.core.management.base import BaseCommand
 from core.cleanup import FileCleanupManager, format_bytes
 from core.models import Order
+from core.order_stats import get_order_stats
+from django.db.models import Sum
 
 
 class Command(BaseCommand):
@@ -30,7 +32,10 @@ class Command(BaseCommand):
         self.stdout.write(f'  Orders (Images): {storage_stats["orders_images_mb"]} MB ({format_bytes(storage_stats["orders_images"])})')
         self.stdout.write(f'  Temp files: {storage_stats["temp_files_mb"]} MB ({format_bytes(storage_stats["temp_files"])})')
         self.stdout.write(f'  Offers: {storage_stats["offers_mb"]} MB ({format_bytes(storage_stats["offers"])})')
+        self.stdout.write(f'  Print files: {storage_stats["print_files_mb"]} MB ({format_bytes(storage_stats["print_files"])})')
         self.stdout.write(self.style.SUCCESS(f'  TOTAL: {storage_stats["total_mb"]} MB ({format_bytes(storage_stats["total"])})'))
+        optimized_saved = Order.objects.aggregate(total=Sum('optimized_bytes_saved'))['total'] or 0
+        self.stdout.write(f'  Saved by PDF optimisation: {format_bytes(optimized_saved)}')
         self.stdout.write('')
 
         # Get cleanup potential
@@ -38,42 +43,27 @@ class Command(BaseCommand):
         total_eligible = eligible_orders.count()
         
         # Calculate potential savings
-        potential_savings = 0
-        for order in eligible_orders:
-            if order.document:
-                try:
-                    potential_savings += order.document.size
-                except:
-                    pass
-            if order.image_upload:
-                try:
-                    potential_savings += order.image_upload.size
-                except:
-                    pass
+        potential_savings = cleanup_manager.get_potential_savings()
 
         self.stdout.write(self.style.HTTP_INFO('🗑️  Cleanup Potential:'))
         self.stdout.write(f'  Orders eligible for cleanup: {total_eligible}')
         self.stdout.write(f'  Estimated storage to free: {format_bytes(potential_savings)}')
         self.stdout.write('')
 
-        # Order statistics
-        total_orders = Order.objects.count()
-        orders_with_files = Order.objects.exclude(document='').exclude(document__isnull=True).count()
-        orders_without_files = total_orders - orders_with_files
+        # Order statistics (one query, always fresh here)
+        order_stats = get_order_stats(use_cache=False)
 
         self.stdout.write(self.style.HTTP_INFO('📦 Order Statistics:'))
-        self.stdout.write(f'  Total orders: {total_orders}')
-        self.stdout.write(f'  Orders with files: {orders_with_files}')
-        self.stdout.write(f'  Orders without files: {orders_without_files}')
+        self.stdout.write(f'  Total orders: {order_stats["total_orders"]}')
+        self.stdout.write(f'  Orders with files: {order_stats["orders_with_files"]}')
+        self.stdout.write(f'  Orders without files: {order_stats["orders_without_files"]}')
+        self.stdout.write(f'  Orders with images: {order_stats["orders_with_images"]}')
         self.stdout.write('')
 
         # Breakdown by status
         self.stdout.write(self.style.HTTP_INFO('📊 Orders by Status:'))
-        statuses = ['Pending', 'Confirmed', 'Ready', 'Delivered', 'Rejected', 'Cancelled']
-        for status in statuses:
-            count = Order.objects.filter(status=status).count()
-            with_files = Order.objects.filter(status=status).exclude(document='').exclude(document__isnull=True).count()
-            self.stdout.write(f'  {status}: {count} orders ({with_files} with files)')
+        for row in order_stats['status_breakdown']:
+            self.stdout.write(f'  {row["status"]}: {row["total"]} orders ({row["with_files"]} with files)')
         self.stdout.write('')
 
         # Recommendations
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_cartitem_customer_name_cartitem_mobile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPreflight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Processing', 'Processing'), ('Done', 'Done'), ('Failed', 'Failed')], default='Pending', max_length=20)),
+                ('page_count', models.IntegerField(blank=True, null=True)),
+                ('color_pages', models.TextField(blank=True, default='', help_text='Detected colour pages, e.g. 1,3,5-7')),
+                ('page_sizes', models.JSONField(blank=True, default=dict, help_text='Page size label -> number of pages')),
+                ('thumbnail', models.ImageField(blank=True, null=True, upload_to='orders/thumbs/')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='preflight', to='core.order')),
+            ],
+            options={
+                'verbose_name': 'Document Preflight',
+                'verbose_name_plural': 'Document Preflights',
+            },
+        ),
+    ]
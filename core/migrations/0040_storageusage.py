@@ -0,0 +1,27 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_documentpreflight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=30, unique=True)),
+                ('total_bytes', models.BigIntegerField(default=0)),
+                ('file_count', models.BigIntegerField(default=0)),
+                ('reconciled_at', models.DateTimeField(blank=True, help_text='Last time the totals were recounted from disk', null=True)),
+            ],
+            options={
+                'verbose_name': 'Storage Usage',
+                'verbose_name_plural': 'Storage Usage',
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:05
+
+import os
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_file_size(apps, schema_editor):
+    """Record the current on-disk size of every order's files."""
+    Order = apps.get_model('core', 'Order')
+    batch = []
+    orders = (
+        Order.objects.exclude(document='', image_upload='')
+        .only('id', 'document', 'image_upload')
+        .iterator(chunk_size=2000)
+    )
+    for order in orders:
+        size = 0
+        for name in (order.document.name, order.image_upload.name):
+            if name:
+                try:
+                    size += os.path.getsize(os.path.join(settings.MEDIA_ROOT, name))
+                except OSError:
+                    pass
+        if size:
+            order.file_size = size
+            batch.append(order)
+        if len(batch) >= 2000:
+            Order.objects.bulk_update(batch, ['file_size'])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ['file_size'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_storageusage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='file_size',
+            field=models.BigIntegerField(default=0, help_text='Bytes stored for document + image, set when files are attached'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'updated_at'], name='order_status_updated_idx'),
+        ),
+        migrations.RunPython(backfill_file_size, migrations.RunPython.noop),
+    ]
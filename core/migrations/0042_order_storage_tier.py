@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_order_file_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='storage_tier',
+            field=models.CharField(choices=[('hot', 'Hot (media)'), ('cold', 'Cold (compressed archive)')], default='hot', help_text="Where the order's files live; see core/cold_storage.py", max_length=10),
+        ),
+    ]
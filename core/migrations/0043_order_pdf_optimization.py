@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_order_storage_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='optimized_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='optimized_bytes_saved',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='original_document',
+            field=models.FileField(blank=True, max_length=500, null=True, upload_to='orders/originals/'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_order_pdf_optimization'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'status', 'payment_status', 'total_price'], name='order_summary_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_order_summary_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('location', models.CharField(blank=True, default='', max_length=100)),
+                ('service_name', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=20)),
+                ('payment_status', models.CharField(max_length=20)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('pages', models.BigIntegerField(default=0)),
+                ('copies', models.BigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Sum of total_price', max_digits=12)),
+                ('discounts', models.DecimalField(decimal_places=2, default=0, help_text='Sum of discount_amount', max_digits=12)),
+                ('dealer_payout', models.DecimalField(decimal_places=2, default=0, help_text='Dealer amount at current dealer rates', max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Order Rollup',
+                'verbose_name_plural': 'Daily Order Rollups',
+                'ordering': ['-day', 'location', 'service_name'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'location', 'service_name', 'status', 'payment_status'), name='unique_daily_order_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_daily_order_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DealerBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, default=0, help_text='Owed to the dealer, not yet settled', max_digits=12)),
+                ('total_earned', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dealer', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='dealer_balance', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DealerSettlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_end', models.DateTimeField(help_text='Entries created before this time are included')),
+                ('first_entry_id', models.BigIntegerField()),
+                ('last_entry_id', models.BigIntegerField()),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('earnings', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('delivery_fees', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('adjustments', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, help_text='Total paid out', max_digits=12)),
+                ('statement_path', models.CharField(blank=True, default='', max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dealer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='dealer_settlements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DealerLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('earning', 'Order Earning'), ('delivery', 'Delivery Fee'), ('adjustment', 'Adjustment'), ('payout', 'Payout')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Positive = owed to dealer, negative = paid', max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=2, help_text='Running balance including this entry', max_digits=12)),
+                ('transaction_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('reference', models.CharField(blank=True, help_text='Idempotency key, e.g. earning:<order pk>', max_length=100, null=True, unique=True)),
+                ('description', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dealer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='dealer_ledger_entries', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='dealer_ledger_entries', to='core.order')),
+                ('settlement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='payout_entries', to='core.dealersettlement')),
+            ],
+            options={
+                'verbose_name_plural': 'Dealer Ledger Entries',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dealersettlement',
+            index=models.Index(fields=['dealer', 'last_entry_id'], name='settlement_dealer_last_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dealerledgerentry',
+            index=models.Index(fields=['dealer', 'created_at'], name='ledger_dealer_created_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def names_to_locations(apps, schema_editor):
+    """
+    Point Order/DailyOrderRollup.location at Location rows, matched by name.
+    Names with no Location (free text from before locations were managed) get one,
+    so no order loses its location.
+    """
+    Location = apps.get_model('core', 'Location')
+    locations = {location.name: location for location in Location.objects.all()}
+
+    for model_name in ('Order', 'DailyOrderRollup'):
+        Model = apps.get_model('core', model_name)
+        names = Model.objects.exclude(location_name__isnull=True).exclude(location_name='') \
+            .order_by().values_list('location_name', flat=True).distinct()
+        for name in list(names):
+            key = name.strip()[:100]
+            if not key:
+                continue
+            if key not in locations:
+                locations[key] = Location.objects.create(name=key)
+            # One UPDATE per distinct name
+            Model.objects.filter(location_name=name).update(location=locations[key])
+
+
+def locations_to_names(apps, schema_editor):
+    Location = apps.get_model('core', 'Location')
+    for model_name in ('Order', 'DailyOrderRollup'):
+        Model = apps.get_model('core', model_name)
+        for location in Location.objects.all():
+            Model.objects.filter(location=location).update(location_name=location.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_dealer_ledger'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dailyorderrollup',
+            name='unique_daily_order_rollup',
+        ),
+        migrations.RenameField(
+            model_name='order',
+            old_name='location',
+            new_name='location_name',
+        ),
+        migrations.RenameField(
+            model_name='dailyorderrollup',
+            old_name='location',
+            new_name='location_name',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='core.location'),
+        ),
+        migrations.AddField(
+            model_name='dailyorderrollup',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.location'),
+        ),
+        migrations.RunPython(names_to_locations, locations_to_names),
+        migrations.RemoveField(
+            model_name='order',
+            name='location_name',
+        ),
+        migrations.RemoveField(
+            model_name='dailyorderrollup',
+            name='location_name',
+        ),
+        migrations.AddConstraint(
+            model_name='dailyorderrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'location', 'service_name', 'status', 'payment_status'), name='unique_daily_order_rollup'),
+        ),
+    ]
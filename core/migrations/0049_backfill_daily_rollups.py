@@ -0,0 +1,130 @@
+# Generated by Django 5.2.10 on 2026-10-19 21:40
+
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.db import migrations
+
+# Frozen copy of the rollup grouping and dealer pricing as they were when this
+# migration was written (core/rollups.py, core/utils.py); later changes to
+# those modules must not change what this migration does.
+ROLLUP_FIELDS = (
+    'created_at', 'location', 'service_name', 'status', 'payment_status', 'pages', 'copies',
+    'print_mode', 'side_type', 'custom_color_pages', 'total_price', 'discount_amount',
+)
+MEASURES = ('orders', 'pages', 'copies', 'revenue', 'discounts', 'dealer_payout')
+
+
+def dealer_pricing(config):
+    return {
+        'price_per_page': float(config.dealer_price_per_page),
+        'price_per_page_double': float(config.dealer_price_per_page_double),
+        'soft_binding': float(config.soft_binding_price_dealer),
+        'color_addition': float(config.color_price_addition_dealer),
+        'color_addition_double': float(config.color_price_addition_dealer_double),
+        'spiral_tier1_limit': config.spiral_tier1_limit,
+        'spiral_tier2_limit': config.spiral_tier2_limit,
+        'spiral_tier3_limit': config.spiral_tier3_limit,
+        'spiral_tier1_price': float(config.spiral_tier1_price_dealer),
+        'spiral_tier2_price': float(config.spiral_tier2_price_dealer),
+        'spiral_tier3_price': float(config.spiral_tier3_price_dealer),
+        'spiral_extra_price': float(config.spiral_extra_price_dealer),
+        'custom_1_4_price': float(config.custom_1_4_price_dealer),
+        'custom_1_8_price': float(config.custom_1_8_price_dealer),
+        'custom_1_9_price': float(config.custom_1_9_price_dealer),
+    }
+
+
+def count_color_pages(page_range_string, total_pages):
+    pages = set()
+    for part in (page_range_string or '').replace(' ', '').split(','):
+        try:
+            if '-' in part:
+                start, end = part.split('-')
+                pages.update(i for i in range(int(start), int(end) + 1) if 1 <= i <= total_pages)
+            elif part and 1 <= int(part) <= total_pages:
+                pages.add(int(part))
+        except ValueError:
+            continue
+    return len(pages)
+
+
+def dealer_price(order, pricing):
+    pages, copies = order.pages, order.copies
+    if order.service_name == "Custom Printing":
+        layout = order.print_mode or ""
+        divisor, rate = 4, pricing['custom_1_4_price']
+        if "1/8" in layout: divisor, rate = 8, pricing['custom_1_8_price']
+        elif "1/9" in layout: divisor, rate = 9, pricing['custom_1_9_price']
+        cost = -(-pages // divisor) * rate * copies
+    else:
+        is_double_sided = order.side_type == 'double'
+        bw_rate = pricing['price_per_page_double'] if is_double_sided else pricing['price_per_page']
+        color_rate = pricing['color_addition_double'] if is_double_sided else pricing['color_addition']
+        if 'custom' in str(order.print_mode).lower() and 'split' in str(order.print_mode).lower():
+            color_page_count = count_color_pages(order.custom_color_pages, pages)
+            cost = (color_page_count * color_rate + (pages - color_page_count) * bw_rate) * copies
+        elif order.print_mode == 'color':
+            cost = pages * copies * color_rate
+        else:
+            cost = pages * copies * bw_rate
+
+    if "Spiral" in order.service_name:
+        t1, t2, t3 = pricing['spiral_tier1_limit'], pricing['spiral_tier2_limit'], pricing['spiral_tier3_limit']
+        if pages <= t1: binding = pricing['spiral_tier1_price']
+        elif pages <= t2: binding = pricing['spiral_tier2_price']
+        elif pages <= t3: binding = pricing['spiral_tier3_price']
+        else: binding = pricing['spiral_tier3_price'] + ((-(-(pages - t3) // 20)) * pricing['spiral_extra_price'])
+        cost += binding * copies
+    elif "Soft" in order.service_name:
+        cost += pricing['soft_binding'] * copies
+    return cost
+
+
+def local_day(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return value.astimezone(ZoneInfo(settings.TIME_ZONE)).date()
+
+
+def backfill_rollups(apps, schema_editor):
+    """Build the daily rollups for every order placed before they existed."""
+    Order = apps.get_model('core', 'Order')
+    DailyOrderRollup = apps.get_model('core', 'DailyOrderRollup')
+    PricingConfig = apps.get_model('core', 'PricingConfig')
+
+    config, _ = PricingConfig.objects.get_or_create(pk=1)
+    pricing = dealer_pricing(config)
+
+    groups = {}
+    for order in Order.objects.only(*ROLLUP_FIELDS).order_by().iterator(chunk_size=2000):
+        key = (local_day(order.created_at), order.location_id, order.service_name, order.status, order.payment_status)
+        row = groups.get(key)
+        if row is None:
+            row = groups[key] = dict.fromkeys(MEASURES, 0)
+        row['orders'] += 1
+        row['pages'] += order.pages
+        row['copies'] += order.copies
+        row['revenue'] += order.total_price or 0
+        row['discounts'] += order.discount_amount or 0
+        row['dealer_payout'] += Decimal(str(round(dealer_price(order, pricing), 2)))
+
+    rows = [
+        DailyOrderRollup(day=day, location_id=location_id, service_name=service_name, status=status,
+                         payment_status=payment_status, **measures)
+        for (day, location_id, service_name, status, payment_status), measures in groups.items()
+    ]
+    DailyOrderRollup.objects.all().delete()
+    DailyOrderRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_order_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
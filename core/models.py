@@ -104,12 +104,25 @@ class Order(models.Model):
     copies = models.IntegerField(default=1)
     pages = models.IntegerField(default=1)
     custom_color_pages = models.CharField(max_length=255, null=True, blank=True)
-    location = models.CharField(max_length=100, null=True, blank=True)
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
     mobile = models.CharField(max_length=15, null=True, blank=True, help_text="Contact number for this specific order")
     customer_name = models.CharField(max_length=150, null=True, blank=True, help_text="Name for this specific order")
 
     document = models.FileField(upload_to='orders/pdfs/', max_length=500, null=True, blank=True)
     image_upload = models.ImageField(upload_to='orders/images/', null=True, blank=True)
+    file_size = models.BigIntegerField(default=0, help_text="Bytes stored for document + image, set when files are attached")
+    storage_tier = models.CharField(
+        max_length=10,
+        choices=[('hot', 'Hot (media)'), ('cold', 'Cold (compressed archive)')],
+        default='hot',
+        help_text="Where the order's files live; see core/cold_storage.py"
+    )
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    # PDF optimisation (core/pdf_optimizer.py): the upload is kept here until the order is printed
+    original_document = models.FileField(upload_to='orders/originals/', max_length=500, null=True, blank=True)
+    optimized_at = models.DateTimeField(null=True, blank=True)
+    optimized_bytes_saved = models.BigIntegerField(default=0)
 
     # Pricing fields
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -141,11 +154,16 @@ class Order(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     estimated_delivery_date = models.DateField(null=True, blank=True)
 
-    def save(self, *args, **kwargs):
+    def prepare_fields(self, is_new=None):
+        """
+        Normalises derived fields before a write.
+        Shared by save() and the bulk order builder (bulk_create skips save()).
+        """
         from .utils import calculate_delivery_date
         from django.utils import timezone
-        
-        is_new = self._state.adding
+
+        if is_new is None:
+            is_new = self._state.adding
         if is_new and not self.order_id:
             self.order_id = f"TMP_{uuid.uuid4().hex[:10].upper()}"
 
@@ -157,15 +175,48 @@ class Order(models.Model):
                 self.order_source = 'SERVICE'
             elif self.transaction_id.startswith("TXN"):
                 self.order_source = 'CART'
-        
+
         # Calculate estimated delivery date for new orders (if not already set)
         if is_new and not self.estimated_delivery_date:
             self.estimated_delivery_date = calculate_delivery_date(timezone.now())
 
+    @staticmethod
+    def format_order_id(pk):
+        return f"FC_ORDER_{pk:010d}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as loaded, so post_save receivers can tell a transition from a re-save
+        loaded = dict(zip(field_names, values))
+        instance._loaded_status = (loaded.get('status'), loaded.get('payment_status'))
+        return instance
+
+    def stored_file_size(self):
+        """Current on-disk size of the document, image and kept original (0 for missing files)."""
+        size = 0
+        for field_file in (self.document, self.image_upload, self.original_document):
+            if field_file:
+                try:
+                    size += field_file.size
+                except (OSError, ValueError):
+                    pass
+        return size
+
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        self.prepare_fields(is_new)
+        # New uploads (e.g. via admin) are only written to storage during save()
+        files_changed = any(f and not f._committed for f in (self.document, self.image_upload))
+
         super().save(*args, **kwargs)
 
+        if files_changed:
+            self.file_size = self.stored_file_size()
+            Order.objects.filter(pk=self.pk).update(file_size=self.file_size)
+
         if is_new and self.order_id.startswith('TMP_'):
-            formatted_id = f"FC_ORDER_{self.id:010d}"
+            formatted_id = self.format_order_id(self.id)
             Order.objects.filter(pk=self.pk).update(order_id=formatted_id)
             self.order_id = formatted_id
 
@@ -174,6 +225,57 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Cleanup eligibility: status + age
+            models.Index(fields=['status', 'updated_at'], name='order_status_updated_idx'),
+            # Admin changelist summary: SUM(total_price) over date/status filters without touching rows
+            models.Index(fields=['created_at', 'status', 'payment_status', 'total_price'], name='order_summary_idx'),
+        ]
+
+
+# --- 3A. DOCUMENT PREFLIGHT ---
+class DocumentPreflight(models.Model):
+    """
+    Background preflight results for an order's PDF.
+    Stores a low-res first-page thumbnail, detected colour pages and page sizes
+    so dashboards can preview jobs without streaming the whole document.
+    """
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Processing', 'Processing'),
+        ('Done', 'Done'),
+        ('Failed', 'Failed'),
+    ]
+
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='preflight')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    page_count = models.IntegerField(null=True, blank=True)
+    color_pages = models.TextField(blank=True, default="", help_text="Detected colour pages, e.g. 1,3,5-7")
+    page_sizes = models.JSONField(default=dict, blank=True, help_text="Page size label -> number of pages")
+    thumbnail = models.ImageField(upload_to='orders/thumbs/', null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Preflight {self.order.order_id} ({self.status})"
+
+    @property
+    def color_page_count(self):
+        from .utils import count_color_pages
+        return count_color_pages(self.color_pages, self.page_count or 0)
+
+    @property
+    def undeclared_color_pages(self):
+        """Detected colour pages the customer did not pay for (Custom Split orders only)."""
+        if self.status != 'Done' or 'split' not in str(self.order.print_mode).lower():
+            return ""
+        from .color_detection import verify_color_pages
+        return verify_color_pages(self.order.custom_color_pages, self.color_pages, self.page_count or 0)['undeclared']
+
+    class Meta:
+        verbose_name = "Document Preflight"
+        verbose_name_plural = "Document Preflights"
 
 
 # --- 4. CART MODEL ---
@@ -506,3 +608,152 @@ class MaintenanceSettings(models.Model):
     def get_settings(cls):
         obj, created = cls.objects.get_or_create(id=1)
         return obj
+
+
+# --- 8. STORAGE USAGE LEDGER ---
+class StorageUsage(models.Model):
+    """
+    Running size/file totals per media category (orders_pdfs, orders_images,
+    temp_files, offers). Updated by the storage backend on every save/delete
+    (see core/storage_ledger.py) so storage stats are one query, not a disk walk.
+    """
+    category = models.CharField(max_length=30, unique=True)
+    total_bytes = models.BigIntegerField(default=0)
+    file_count = models.BigIntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True, help_text="Last time the totals were recounted from disk")
+
+    class Meta:
+        verbose_name = "Storage Usage"
+        verbose_name_plural = "Storage Usage"
+
+    def __str__(self):
+        return f"{self.category}: {self.total_bytes} bytes in {self.file_count} files"
+
+
+# --- 9. DAILY ORDER ROLLUP ---
+class DailyOrderRollup(models.Model):
+    """
+    Order totals per day (local date of created_at) x location x service x
+    status x payment status. Rebuilt per day when orders change and nightly
+    (see core/rollups.py), so revenue summaries read these rows instead of
+    scanning Order.
+    """
+    day = models.DateField()
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    service_name = models.CharField(max_length=100)
+    status = models.CharField(max_length=20)
+    payment_status = models.CharField(max_length=20)
+
+    orders = models.PositiveIntegerField(default=0)
+    pages = models.BigIntegerField(default=0)
+    copies = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Sum of total_price")
+    discounts = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Sum of discount_amount")
+    dealer_payout = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Dealer amount at current dealer rates")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Daily Order Rollup"
+        verbose_name_plural = "Daily Order Rollups"
+        ordering = ['-day', 'location', 'service_name']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'location', 'service_name', 'status', 'payment_status'],
+                                    name='unique_daily_order_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.location or '-'} {self.service_name} {self.status}/{self.payment_status}: {self.orders}"
+
+
+# --- 10. DEALER LEDGER ---
+class DealerSettlement(models.Model):
+    """
+    A closed payout period for one dealer: the ledger entries between
+    first_entry_id and last_entry_id created before period_end that no
+    earlier settlement covered (see core/dealer_ledger.py).
+    """
+    dealer = models.ForeignKey(User, on_delete=models.PROTECT, related_name='dealer_settlements')
+    period_end = models.DateTimeField(help_text="Entries created before this time are included")
+    first_entry_id = models.BigIntegerField()
+    last_entry_id = models.BigIntegerField()
+    entry_count = models.PositiveIntegerField(default=0)
+    earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    delivery_fees = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    adjustments = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Total paid out")
+    statement_path = models.CharField(max_length=500, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['dealer', 'last_entry_id'], name='settlement_dealer_last_idx')]
+
+    def __str__(self):
+        return f"Settlement {self.pk} - {self.dealer.username}: {self.amount}"
+
+
+class DealerLedgerEntry(models.Model):
+    """
+    Append-only record of what FastCopy owes a dealer. Entries are never
+    edited; corrections are new 'adjustment' entries.
+    """
+    ENTRY_TYPES = [
+        ('earning', 'Order Earning'),
+        ('delivery', 'Delivery Fee'),
+        ('adjustment', 'Adjustment'),
+        ('payout', 'Payout'),
+    ]
+    dealer = models.ForeignKey(User, on_delete=models.PROTECT, related_name='dealer_ledger_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, help_text="Positive = owed to dealer, negative = paid")
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2, help_text="Running balance including this entry")
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='dealer_ledger_entries')
+    transaction_id = models.CharField(max_length=100, null=True, blank=True)
+    settlement = models.ForeignKey(DealerSettlement, on_delete=models.PROTECT, null=True, blank=True, related_name='payout_entries')
+    reference = models.CharField(max_length=100, unique=True, null=True, blank=True, help_text="Idempotency key, e.g. earning:<order pk>")
+    description = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name_plural = "Dealer Ledger Entries"
+        indexes = [models.Index(fields=['dealer', 'created_at'], name='ledger_dealer_created_idx')]
+
+    def __str__(self):
+        return f"{self.dealer.username} {self.entry_type} {self.amount}"
+
+
+class DealerBalance(models.Model):
+    """
+    Running totals per dealer, updated in the same transaction as every
+    ledger entry, so dashboards read one row instead of summing history.
+    """
+    dealer = models.OneToOneField(User, on_delete=models.PROTECT, related_name='dealer_balance')
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Owed to the dealer, not yet settled")
+    total_earned = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.dealer.username}: {self.balance}"
+
+
+
+# --- 11. LIVE ORDER EVENTS ---
+class OrderEvent(models.Model):
+    """
+    Append-only feed of paid-order changes, read by the dashboard event
+    stream (core/order_events.py) with an id keyset, so every worker
+    process sees the same events. Pruned after a couple of days.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='events')
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['location', 'id'], name='order_event_location_idx')]
+
+    def __str__(self):
+        return f"{self.order_id} -> {self.status}"
\ No newline at end of file
@@ -219,35 +219,19 @@ def send_dealer_order_alert(order):
     print(f"DEBUG: Checking dealer notifications for order {order.order_id}")
     print(f"DEBUG: Order location: {order.location}")
     
-    if not order.location:
+    if not order.location_id:
         logger.info(f"Order {order.order_id} has no location, skipping dealer notifications")
         print(f"WARNING: Order {order.order_id} has no location!")
         return 0
     
     try:
-        from core.models import Location
+        from core.location_map import dealer_user_ids
         
-        # Find the location object
-        location = Location.objects.filter(name=order.location).first()
-        print(f"DEBUG: Looking for location '{order.location}' in database...")
+        # Dealers assigned to this location, from the cached location -> dealers map
+        dealer_ids = dealer_user_ids(order.location_id)
+        print(f"DEBUG: Found {len(dealer_ids)} dealer(s) assigned to location '{order.location}'")
         
-        if not location:
-            logger.warning(f"Location '{order.location}' not found in database for order {order.order_id}")
-            print(f"WARNING: Location '{order.location}' NOT FOUND in database!")
-            return 0
-        
-        print(f"DEBUG: Location found: {location}")
-        
-        # Find all dealers assigned to this location
-        dealers = UserProfile.objects.filter(
-            is_dealer=True,
-            dealer_locations=location
-        ).select_related('user')
-        
-        dealer_count = dealers.count()
-        print(f"DEBUG: Found {dealer_count} dealer(s) assigned to location '{order.location}'")
-        
-        if not dealers.exists():
+        if not dealer_ids:
             logger.info(f"No dealers assigned to location '{order.location}' for order {order.order_id}")
             print(f"INFO: No dealers assigned to location '{order.location}'")
             return 0
@@ -259,6 +243,7 @@ def send_dealer_order_alert(order):
         
         emails_sent = 0
         
+        dealers = UserProfile.objects.filter(user_id__in=dealer_ids).select_related('user')
         for dealer_profile in dealers:
             try:
                 dealer_name = dealer_profile.user.first_name or dealer_profile.user.username
@@ -0,0 +1,209 @@
+"""
+Batch Order Builder for FastCopy
+Turns a checkout batch (cart items or a direct item) into Order rows with a
+fixed number of queries, independent of the cart size.
+"""
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from .models import Order
+from .preflight import schedule_preflight
+from .rollups import mark_dirty
+from .location_map import resolve_locations
+from .utils import calculate_delivery_date
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OrderBatchError(ValueError):
+    """Raised when a checkout item cannot be turned into an order."""
+
+
+class OrderBatchBuilder:
+    """
+    Validates a batch of checkout items and writes them as orders.
+
+    Shared fields (delivery date, coupon split) are computed once per batch;
+    contact details stay per item. Orders are inserted with a single bulk_create, and file
+    attachment + final order IDs are written with one follow-up bulk_update.
+    """
+
+    def __init__(self, user, transaction_id, coupon_code=None, discount_amount=0,
+                 estimated_delivery_date=None):
+        self.user = user
+        self.transaction_id = transaction_id
+        self.coupon_code = coupon_code or None
+        self.discount_amount = float(discount_amount or 0)
+        self.estimated_delivery_date = estimated_delivery_date
+        self.attach_errors = []
+
+    def validate_items(self, items):
+        """
+        Validate and normalise raw checkout items.
+
+        Args:
+            items: list of item dicts (session cart / direct item format)
+
+        Returns:
+            list of cleaned item dicts ('location' resolved to a Location)
+
+        Raises:
+            OrderBatchError: if any item is missing or malformed, or names an unknown location
+        """
+        if not items:
+            raise OrderBatchError("No items to order")
+
+        cleaned = []
+        for index, item in enumerate(items):
+            if not item:
+                raise OrderBatchError(f"Item {index + 1} is empty")
+            try:
+                total_price = float(item.get('total_price') or 0)
+            except (TypeError, ValueError):
+                total_price = 0.0
+            try:
+                copies = int(item.get('copies', 1))
+                pages = int(item.get('pages', 1))
+            except (TypeError, ValueError):
+                raise OrderBatchError(f"Item {index + 1} has an invalid page or copy count")
+            if copies < 1 or pages < 1:
+                raise OrderBatchError(f"Item {index + 1} has an invalid page or copy count")
+
+            cleaned.append({
+                'service_name': item.get('service_name') or 'Printing',
+                'total_price': total_price,
+                'copies': copies,
+                'pages': pages,
+                'location': item.get('location', ''),
+                'print_mode': item.get('print_mode', 'bw'),
+                'side_type': item.get('side_type', 'single'),
+                'custom_color_pages': item.get('custom_color_pages', ''),
+                'mobile': item.get('mobile', ''),
+                'customer_name': item.get('customer_name', ''),
+                'document_name': item.get('document_name'),
+                'temp_path': item.get('temp_path'),
+                'temp_image_path': item.get('temp_image_path'),
+            })
+
+        # Checkout posts location names; resolve them in one query
+        locations = resolve_locations(item['location'] for item in cleaned)
+        for index, item in enumerate(cleaned):
+            location = locations.get(item['location'])
+            if location is None:
+                if not item['location']:
+                    raise OrderBatchError(f"Item {index + 1} has no pickup location")
+                raise OrderBatchError(f"Item {index + 1} has an unknown pickup location: {item['location']}")
+            item['location'] = location
+        return cleaned
+
+    def split_discount(self, cleaned_items):
+        """
+        Split the batch discount across items in proportion to their price.
+
+        Returns:
+            list of per-item discount amounts (same order as cleaned_items)
+        """
+        items_total = sum(i['total_price'] for i in cleaned_items)
+        if not self.coupon_code or items_total <= 0 or self.discount_amount <= 0:
+            return [0] * len(cleaned_items)
+        return [round(self.discount_amount * (i['total_price'] / items_total), 2) for i in cleaned_items]
+
+    def build(self, items):
+        """
+        Create all orders for the batch.
+
+        Args:
+            items: list of item dicts
+
+        Returns:
+            list of saved Order instances (with final order IDs and files attached)
+        """
+        cleaned = self.validate_items(items)
+        discounts = self.split_discount(cleaned)
+
+        if self.estimated_delivery_date is None:
+            self.estimated_delivery_date = calculate_delivery_date()
+
+        orders = []
+        for item, item_discount in zip(cleaned, discounts):
+            order = Order(
+                transaction_id=self.transaction_id,
+                user=self.user,
+                service_name=item['service_name'],
+                total_price=item['total_price'],
+                original_price=item['total_price'] if self.coupon_code else None,
+                coupon_code=self.coupon_code,
+                discount_amount=item_discount,
+                location=item['location'],
+                print_mode=item['print_mode'],
+                side_type=item['side_type'],
+                copies=item['copies'],
+                pages=item['pages'],
+                custom_color_pages=item['custom_color_pages'],
+                estimated_delivery_date=self.estimated_delivery_date,
+                mobile=item['mobile'],
+                customer_name=item['customer_name'],
+                payment_status="Pending",
+                status="Pending",
+            )
+            order.prepare_fields(is_new=True)
+            orders.append(order)
+
+        with transaction.atomic():
+            Order.objects.bulk_create(orders)
+            self._resolve_primary_keys(orders)
+
+            for order, item in zip(orders, cleaned):
+                order.order_id = Order.format_order_id(order.pk)
+                self._attach_file(order, item)
+
+            Order.objects.bulk_update(orders, ['order_id', 'document', 'image_upload', 'file_size'])
+
+            # Thumbnails / colour detection run in the background once committed
+            schedule_preflight(o.pk for o in orders if o.document)
+            # bulk_create sends no post_save, so queue the rollup day here
+            mark_dirty(orders[0].created_at if orders else None)
+
+        return orders
+
+    def _resolve_primary_keys(self, orders):
+        """
+        Backends without RETURNING support (e.g. MySQL) leave pk unset after
+        bulk_create, so look the rows up by their temporary order IDs.
+        """
+        missing = [o for o in orders if o.pk is None]
+        if not missing:
+            return
+        pk_map = dict(
+            Order.objects.filter(order_id__in=[o.order_id for o in missing]).values_list('order_id', 'id')
+        )
+        for order in missing:
+            order.pk = pk_map[order.order_id]
+            order._state.adding = False
+            order._state.db = Order.objects.db
+
+    def _attach_file(self, order, item):
+        """
+        Copy the temp upload into the order's upload_to directory.
+        Only sets the field name and file_size; persistence happens in the batch bulk_update.
+        """
+        path = item['temp_path'] or item['temp_image_path']
+        if not path:
+            return
+        try:
+            if not default_storage.exists(path):
+                return
+            if item['temp_path']:
+                field_file, default_name = order.document, 'document.pdf'
+            else:
+                field_file, default_name = order.image_upload, 'image.jpg'
+            filename = field_file.field.generate_filename(order, item['document_name'] or default_name)
+            with default_storage.open(path) as f:
+                field_file.name = field_file.storage.save(filename, File(f), max_length=field_file.field.max_length)
+            order.file_size = field_file.size
+        except Exception as e:
+            # Don't block payment; the order can be fixed manually.
+            logger.error(f"Error attaching file to order {order.order_id}: {e}")
+            self.attach_errors.append({'order_id': order.order_id, 'error': str(e)})
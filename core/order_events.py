@@ -0,0 +1,152 @@
+"""
+Live Order Events for FastCopy
+Pushes new paid orders and status changes to the dealer and delivery
+dashboards over Server-Sent Events, so they no longer have to be reloaded
+to spot new jobs.
+
+- Every save of a paid order appends an OrderEvent row once the
+  transaction commits (core/signals.py); bulk status updates append theirs
+  with record_events().
+- The stream view reads the events after the client's last id, limited to
+  the user's assigned locations: one indexed query per POLL_INTERVAL per
+  open dashboard, instead of a full dashboard render per reload.
+- The table is the channel, so events written by any worker process (web,
+  commands, admin) reach every stream without a message broker.
+
+Under ASGI (fastCopyConfig/asgi.py) a stream stays open for STREAM_LIFETIME
+and then lets the browser reconnect with Last-Event-ID. Under WSGI an open
+stream would hold a worker thread, so the view answers with the pending
+events and a retry hint instead, and EventSource falls back to polling.
+"""
+
+import asyncio
+import json
+import time
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2           # seconds between event queries per stream
+HEARTBEAT_INTERVAL = 20     # keep proxies from closing idle streams
+STREAM_LIFETIME = 300       # seconds before the browser is asked to reconnect
+RETRY_MS = 3000             # EventSource reconnect delay (ASGI)
+POLL_RETRY_MS = 10000       # EventSource reconnect delay when streaming is unavailable (WSGI)
+BATCH_SIZE = 100
+RETENTION = timedelta(days=2)
+
+
+# --- WRITES ---
+
+def record_event(order):
+    """Append an event for a paid order once the current transaction commits."""
+    from .models import OrderEvent
+
+    order_pk, location_id, status = order.pk, order.location_id, order.status
+    transaction.on_commit(
+        lambda: OrderEvent.objects.create(order_id=order_pk, location_id=location_id, status=status)
+    )
+
+
+def record_events(orders):
+    """Bulk version of record_event (for queryset .update() paths)."""
+    from .models import OrderEvent
+
+    events = [OrderEvent(order_id=order.pk, location_id=order.location_id, status=order.status) for order in orders]
+    if events:
+        transaction.on_commit(lambda: OrderEvent.objects.bulk_create(events))
+
+
+def prune_events(older_than=RETENTION):
+    """
+    Delete events older than the retention period.
+
+    Returns:
+        int: number of events deleted
+    """
+    from .models import OrderEvent
+
+    deleted, _ = OrderEvent.objects.filter(created_at__lt=timezone.now() - older_than).delete()
+    return deleted
+
+
+# --- READS ---
+
+def event_locations(assignments):
+    """
+    Locations whose events a user may see (None = all locations).
+    Mirrors the dashboards: dealers see their locations only, delivery
+    partners without locations see every location.
+    """
+    if assignments['is_dealer'] or assignments['location_ids']:
+        return assignments['location_ids']
+    return None
+
+
+def latest_event_id():
+    from .models import OrderEvent
+
+    return OrderEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def events_after(last_id, location_ids=None, limit=BATCH_SIZE):
+    """
+    Events with id > last_id, oldest first.
+
+    Returns:
+        list: dicts with id, order_id (pk), order__order_id, status
+    """
+    from .models import OrderEvent
+
+    if location_ids is not None and not location_ids:
+        return []
+    events = OrderEvent.objects.filter(id__gt=last_id)
+    if location_ids is not None:
+        events = events.filter(location_id__in=location_ids)
+    return list(events.order_by('id').values('id', 'order_id', 'order__order_id', 'status')[:limit])
+
+
+def format_event(event):
+    """One SSE message; the event id lets the browser resume after a reconnect."""
+    data = json.dumps({'id': event['order_id'], 'order_id': event['order__order_id'], 'status': event['status']})
+    return f"id: {event['id']}\nevent: order\ndata: {data}\n\n"
+
+
+def poll_response_body(last_id, location_ids):
+    """Pending events plus a retry hint, for servers that cannot hold a stream open."""
+    events = events_after(last_id, location_ids)
+    return f"retry: {POLL_RETRY_MS}\n\n" + ''.join(format_event(event) for event in events)
+
+
+async def stream_events(last_id, location_ids):
+    """
+    Async SSE body: events as they are recorded, with heartbeats, for STREAM_LIFETIME.
+
+    Yields:
+        str: SSE messages
+    """
+    fetch = sync_to_async(events_after)
+    yield f"retry: {RETRY_MS}\n\n"
+    deadline = time.monotonic() + STREAM_LIFETIME
+    idle = 0
+    try:
+        while time.monotonic() < deadline:
+            events = await fetch(last_id, location_ids)
+            for event in events:
+                last_id = event['id']
+                yield format_event(event)
+            if len(events) == BATCH_SIZE:
+                continue
+            if events:
+                idle = 0
+            else:
+                idle += POLL_INTERVAL
+                if idle >= HEARTBEAT_INTERVAL:
+                    idle = 0
+                    yield ": ping\n\n"
+            await asyncio.sleep(POLL_INTERVAL)
+    finally:
+        await sync_to_async(close_old_connections)()
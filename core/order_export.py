@@ -0,0 +1,217 @@
+"""
+Order Export for FastCopy
+Streams orders to CSV or XLSX for accounting, one row per order with its
+coupon, discount, dealer amount and location.
+
+Rows are generated lazily: the queryset is read in keyset pages of
+EXPORT_CHUNK_SIZE (each page through .iterator()), so memory stays flat for
+a year of orders even on MySQL, where mysqlclient buffers a whole result set
+client-side. Both formats are generators of bytes, used by the admin actions
+(StreamingHttpResponse) and the export_orders command (written to a file).
+
+XLSX is written as the minimal set of SpreadsheetML parts, deflated through
+core/zipstream.py, with inline strings so no shared-string table has to be
+held in memory.
+"""
+
+import csv
+from xml.sax.saxutils import escape
+from django.utils import timezone
+from .utils import calculate_dealer_price, pricing_for
+from .zipstream import stream_zip
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (header, kind) - kind decides the XLSX cell type
+EXPORT_COLUMNS = [
+    ('Order ID', 'str'),
+    ('Created At', 'str'),
+    ('Customer', 'str'),
+    ('Mobile', 'str'),
+    ('Location', 'str'),
+    ('Service', 'str'),
+    ('Print Mode', 'str'),
+    ('Side', 'str'),
+    ('Pages', 'num'),
+    ('Copies', 'num'),
+    ('Original Price', 'num'),
+    ('Coupon', 'str'),
+    ('Discount', 'num'),
+    ('Total Price', 'num'),
+    ('Dealer Amount', 'num'),
+    ('Payment Status', 'str'),
+    ('Status', 'str'),
+    ('Transaction ID', 'str'),
+]
+
+EXPORT_FIELDS = (
+    'order_id', 'created_at', 'customer_name', 'location__name', 'service_name', 'print_mode',
+    'side_type', 'pages', 'copies', 'custom_color_pages', 'original_price', 'coupon_code',
+    'discount_amount', 'total_price', 'payment_status', 'status', 'transaction_id',
+    'user__first_name', 'user__username',
+)
+
+
+# --- ROWS ---
+
+def _iter_orders(queryset):
+    """Orders in primary key order, EXPORT_CHUNK_SIZE per query."""
+    queryset = queryset.select_related(None).select_related('user', 'location').only(*EXPORT_FIELDS).order_by('pk')
+    last_pk = 0
+    while True:
+        count = 0
+        for order in queryset.filter(pk__gt=last_pk)[:EXPORT_CHUNK_SIZE].iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            count += 1
+            last_pk = order.pk
+            yield order
+        if count < EXPORT_CHUNK_SIZE:
+            return
+
+
+def iter_rows(queryset):
+    """
+    Export rows (without the header) for a queryset of orders.
+
+    Yields:
+        list: one value per EXPORT_COLUMNS entry
+    """
+    dealer_pricing = pricing_for(True)
+    for order in _iter_orders(queryset):
+        user = order.user
+        yield [
+            order.order_id or f"ORD-{order.pk}",
+            timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M:%S') if order.created_at else '',
+            order.customer_name or (user.first_name if user else ''),
+            user.username if user else '',
+            order.location.name if order.location else '',
+            order.service_name,
+            order.print_mode,
+            order.side_type,
+            order.pages,
+            order.copies,
+            float(order.original_price or 0),
+            order.coupon_code or '',
+            float(order.discount_amount or 0),
+            float(order.total_price or 0),
+            round(calculate_dealer_price(order, dealer_pricing), 2),
+            order.payment_status,
+            order.status,
+            order.transaction_id or '',
+        ]
+
+
+# --- CSV ---
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    """
+    Generate a CSV export (UTF-8 with BOM so Excel detects the encoding).
+
+    Yields:
+        bytes: one row per chunk
+    """
+    writer = csv.writer(_Echo())
+    yield '\ufeff'.encode('utf-8') + writer.writerow([header for header, _ in EXPORT_COLUMNS]).encode('utf-8')
+    for row in iter_rows(queryset):
+        yield writer.writerow(row).encode('utf-8')
+
+
+# --- XLSX ---
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Orders" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+# Control characters are not allowed in XML 1.0
+_XML_ILLEGAL = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+def _xlsx_cell(value, kind):
+    if kind == 'num' and value is not None:
+        return f'<c t="n"><v>{value}</v></c>'
+    text = escape(str(value if value is not None else '').translate(_XML_ILLEGAL))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_sheet(queryset):
+    """Worksheet XML, one <row> per chunk."""
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetData>'
+    ).encode('utf-8')
+    yield ('<row>' + ''.join(_xlsx_cell(header, 'str') for header, _ in EXPORT_COLUMNS) + '</row>').encode('utf-8')
+    kinds = [kind for _, kind in EXPORT_COLUMNS]
+    for row in iter_rows(queryset):
+        yield ('<row>' + ''.join(_xlsx_cell(value, kind) for value, kind in zip(row, kinds)) + '</row>').encode('utf-8')
+    yield b'</sheetData></worksheet>'
+
+
+def stream_xlsx(queryset):
+    """
+    Generate an XLSX export (single "Orders" sheet).
+
+    Yields:
+        bytes: archive chunks, in order
+    """
+    entries = [
+        ('[Content_Types].xml', [XLSX_CONTENT_TYPES.encode('utf-8')]),
+        ('_rels/.rels', [XLSX_ROOT_RELS.encode('utf-8')]),
+        ('xl/workbook.xml', [XLSX_WORKBOOK.encode('utf-8')]),
+        ('xl/_rels/workbook.xml.rels', [XLSX_WORKBOOK_RELS.encode('utf-8')]),
+        ('xl/worksheets/sheet1.xml', _xlsx_sheet(queryset)),
+    ]
+    return stream_zip(entries, compress=True)
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def export_filename(fmt):
+    return f"fastcopy_orders_{timezone.localtime().strftime('%Y%m%d_%H%M')}.{fmt}"
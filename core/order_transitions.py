@@ -0,0 +1,115 @@
+"""
+Bulk Order Status Transitions for FastCopy
+Moves many orders to a new status in one request (dealer and delivery
+dashboards), instead of one POST, save() and dashboard render per order.
+
+Allowed moves come from TRANSITIONS (per role, current -> next statuses);
+orders that cannot make the move are reported back, not changed. The
+allowed ones are written with a single UPDATE. Because .update() skips the
+Order post_save receivers, bulk_transition() does their work itself:
+
+- rollups: the orders' days are marked dirty (core/rollups.py)
+- live dashboards: one OrderEvent per paid order (core/order_events.py)
+- Delivered: the dealer ledger is credited (core/dealer_ledger.py)
+- Ready/Delivered: kept uploads of optimised PDFs are discarded (core/pdf_optimizer.py)
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from .dealer_ledger import record_delivery
+from .order_events import record_events
+from .pdf_optimizer import PRINTED_STATUSES, discard_original
+from .rollups import local_day, mark_dirty
+from .utils import pricing_for
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_ORDERS = 500
+
+# role -> {current status: statuses it may move to}; anything not listed is final
+TRANSITIONS = {
+    'dealer': {
+        'Pending': ('Ready', 'Delivered'),
+        'Confirmed': ('Ready', 'Delivered'),
+        'Ready': ('Pending', 'Delivered'),
+    },
+    'delivery': {
+        'Pending': ('Ready',),
+        'Confirmed': ('Ready',),
+        'Ready': ('Pending', 'Out for Delivery', 'Delivered'),
+        'Out for Delivery': ('Ready', 'Delivered'),
+    },
+}
+
+
+def target_statuses(role):
+    """Every status a role can move orders to."""
+    return {status for targets in TRANSITIONS[role].values() for status in targets}
+
+
+def bulk_transition(orders, order_ids, new_status, role):
+    """
+    Move the given orders to new_status where the role's transition table allows it.
+
+    Args:
+        orders: queryset of the orders the user may change (scopes order_ids)
+        order_ids: Order primary keys
+        new_status: target status
+        role: 'dealer' or 'delivery'
+
+    Returns:
+        dict: updated (id, order_id, status) and skipped (id, order_id, reason) lists
+    """
+    from .models import Order
+
+    allowed = TRANSITIONS[role]
+    order_ids = list(dict.fromkeys(order_ids))
+    updated, skipped = [], []
+
+    with transaction.atomic():
+        found = {order.pk: order for order in orders.select_for_update().filter(pk__in=order_ids)}
+        for pk in order_ids:
+            order = found.get(pk)
+            if order is None:
+                skipped.append({'id': pk, 'order_id': None, 'reason': 'Order not found'})
+            elif order.status == new_status:
+                skipped.append({'id': pk, 'order_id': order.order_id, 'reason': f"Already {new_status}"})
+            elif new_status not in allowed.get(order.status, ()):
+                skipped.append({'id': pk, 'order_id': order.order_id,
+                                'reason': f"Cannot move from {order.status} to {new_status}"})
+            else:
+                updated.append(order)
+
+        if updated:
+            now = timezone.now()
+            Order.objects.filter(pk__in=[order.pk for order in updated]).update(
+                status=new_status, updated_at=now
+            )
+            for order in updated:
+                order.status, order.updated_at = new_status, now
+
+            # What the Order post_save receivers would have done
+            days = {local_day(order.created_at): order.created_at for order in updated if order.created_at}
+            for created_at in days.values():
+                mark_dirty(created_at)
+            record_events([order for order in updated if order.payment_status == 'Success'])
+
+    if new_status == 'Delivered':
+        dealer_pricing = pricing_for(True)
+        for order in updated:
+            try:
+                record_delivery(order, dealer_pricing)
+            except Exception as e:
+                # `settle_dealers` credits it before the next payout
+                logger.error(f"Dealer ledger entry failed for order {order.order_id}: {e}")
+    if new_status in PRINTED_STATUSES:
+        for order in updated:
+            if order.original_document:
+                discard_original(order)
+
+    logger.info(f"Bulk {role} transition to {new_status}: {len(updated)} updated, {len(skipped)} skipped")
+    return {
+        'updated': [{'id': order.pk, 'order_id': order.order_id, 'status': order.status} for order in updated],
+        'skipped': skipped,
+    }
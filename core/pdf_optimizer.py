@@ -0,0 +1,178 @@
+"""
+PDF Optimisation for FastCopy
+Shrinks uploaded order PDFs once the checkout is paid (background thread,
+scheduled from process_successful_order):
+- images above PRINT_DPI_THRESHOLD are downsampled to PRINT_DPI
+- unused/duplicate objects are dropped and streams deflated (garbage=4)
+- objects are packed into object streams
+
+The rewrite runs in the PDF worker pool and is only kept when it saves at
+least MIN_SAVING of the file. The customer's upload is hard-linked (or
+copied) to Order.original_document and the rewrite then renamed over the
+document in one step, so the document path never goes missing while a
+dealer downloads it. The original is kept until the order is printed (Ready
+or Delivered), then discarded; Order.optimized_bytes_saved records the gain.
+
+Linearisation is not done: MuPDF dropped support for writing linearised
+files in 1.26, which is the version pinned in requirements.txt.
+"""
+
+import os
+import shutil
+import threading
+import uuid
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRINT_DPI = 300             # target resolution for downsampled images
+PRINT_DPI_THRESHOLD = 450   # only images above this are touched
+JPEG_QUALITY = 85
+MIN_SAVING = 0.05           # keep the rewrite only if it is at least 5% smaller
+OPTIMIZE_TIMEOUT = 300      # seconds per document in the worker pool
+PRINTED_STATUSES = ['Ready', 'Delivered']
+
+
+def optimize_pdf_job(source_path, output_path):
+    """
+    Worker job: write an optimised copy of source_path to output_path.
+
+    Returns:
+        dict: {'before': bytes, 'after': bytes} or {'skipped': reason}
+    """
+    import fitz
+
+    with fitz.open(source_path) as doc:
+        if not doc.is_pdf:
+            return {'skipped': 'not a PDF'}
+        if doc.needs_pass:
+            return {'skipped': 'encrypted'}
+
+        if hasattr(doc, 'rewrite_images'):
+            # Bitonal (1-bit) scans are left alone so text stays crisp
+            doc.rewrite_images(dpi_threshold=PRINT_DPI_THRESHOLD, dpi_target=PRINT_DPI,
+                               quality=JPEG_QUALITY, bitonal=False)
+        doc.save(output_path, garbage=4, deflate=True, deflate_images=True,
+                 deflate_fonts=True, clean=True, use_objstms=1)
+
+    return {'before': os.path.getsize(source_path), 'after': os.path.getsize(output_path)}
+
+
+def optimize_order_document(order_id):
+    """
+    Optimise an order's PDF in place, keeping the upload as original_document.
+
+    Args:
+        order_id: Order primary key
+
+    Returns:
+        int: bytes saved (0 if skipped or not worth it), or None if there was nothing to do
+    """
+    from .models import Order
+    from .pdf_workers import run_job
+    from .storage_ledger import record_change
+
+    order = Order.objects.filter(pk=order_id).only(
+        'order_id', 'document', 'original_document', 'optimized_at', 'file_size', 'status', 'payment_status'
+    ).first()
+    if not order or not order.document or order.optimized_at or order.status in PRINTED_STATUSES:
+        return None
+    if order.payment_status != 'Success':
+        return None
+    if not order.document.name.lower().endswith('.pdf'):
+        return None
+
+    document_path = order.document.path
+    tmp_path = f"{document_path}.{uuid.uuid4().hex}.opt.tmp"
+    try:
+        result = run_job(optimize_pdf_job, document_path, tmp_path, timeout=OPTIMIZE_TIMEOUT)
+        before, after = result.get('before', 0), result.get('after', 0)
+        if 'skipped' in result or after > before * (1 - MIN_SAVING):
+            Order.objects.filter(pk=order.pk).update(optimized_at=timezone.now())
+            logger.info(f"PDF optimisation skipped for {order.order_id}: {result.get('skipped', 'no gain')}")
+            return 0
+
+        # Keep the upload until the order is printed, then swap the optimised file in
+        field = order.original_document.field
+        original_name = field.storage.get_available_name(
+            field.generate_filename(order, os.path.basename(order.document.name)), max_length=field.max_length
+        )
+        original_path = field.storage.path(original_name)
+        os.makedirs(os.path.dirname(original_path), exist_ok=True)
+        try:
+            os.link(document_path, original_path)
+        except OSError:
+            # Different filesystem, or no hard links
+            shutil.copy2(document_path, original_path)
+        os.replace(tmp_path, document_path)
+
+        record_change(original_name, before, 1)
+        record_change(order.document.name, after - before, 0)
+        Order.objects.filter(pk=order.pk).update(
+            original_document=original_name,
+            optimized_at=timezone.now(),
+            optimized_bytes_saved=before - after,
+            file_size=order.file_size + after,
+        )
+        logger.info(f"Optimised PDF for {order.order_id}: {before} -> {after} bytes")
+        return before - after
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _optimize_worker(order_ids):
+    close_old_connections()
+    try:
+        for order_id in order_ids:
+            try:
+                optimize_order_document(order_id)
+            except Exception as e:
+                logger.error(f"PDF optimisation failed for order {order_id}: {e}")
+    finally:
+        close_old_connections()
+
+
+def schedule_optimization(order_ids):
+    """
+    Optimise the given (paid) orders' PDFs in a background thread,
+    once the surrounding transaction commits.
+    """
+    order_ids = list(order_ids)
+    if not order_ids or not optimization_enabled():
+        return
+
+    def _start():
+        threading.Thread(target=_optimize_worker, args=(order_ids,), daemon=True).start()
+
+    transaction.on_commit(_start)
+
+
+def discard_original(order):
+    """
+    Delete the kept upload of an optimised order (call once it is printed).
+
+    Returns:
+        int: bytes freed
+    """
+    from .models import Order
+
+    if not order.original_document:
+        return 0
+    try:
+        size = order.original_document.size
+    except OSError:
+        size = 0
+    # Storage delete, so the ledger is updated
+    order.original_document.delete(save=False)
+    Order.objects.filter(pk=order.pk).update(original_document=None, file_size=max(0, order.file_size - size))
+    order.original_document = None
+    order.file_size = max(0, order.file_size - size)
+    return size
+
+
+def optimization_enabled():
+    return getattr(settings, 'PDF_OPTIMIZE_ENABLED', True)
@@ -0,0 +1,275 @@
+"""
+PDF Worker Pool for FastCopy
+Runs CPU-heavy PDF work (page counting, rendering, colour detection) in a
+bounded pool of worker processes instead of on the waitress request threads.
+
+Protection against bad uploads:
+- Bounded queue: callers get PdfWorkerBusy instead of piling up behind the pool
+- Per-job timeouts: a stuck job has its worker processes killed and the pool rebuilt;
+  jobs of other callers lost with the old pool are retried once on the new one
+- Memory limits: each worker runs under an address-space limit (POSIX only)
+- Worker recycling: workers are replaced after a fixed number of jobs
+
+Settings (all optional):
+    PDF_WORKERS             number of worker processes (default: min(4, CPUs))
+    PDF_JOB_TIMEOUT         seconds a job may run (default: 30)
+    PDF_WORKER_MEMORY_MB    address-space limit per worker, 0 disables (default: 1024)
+    PDF_WORKER_MAX_TASKS    jobs per worker before it is replaced (default: 50)
+    PDF_MAX_PENDING_JOBS    jobs queued or running before callers are refused (default: 4 x workers)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+BROKEN_POOL_RETRIES = 1     # retries for jobs lost when another job broke the pool
+_MISSING = object()
+
+
+class PdfWorkerError(Exception):
+    """Base class for worker pool failures."""
+
+
+class PdfWorkerBusy(PdfWorkerError):
+    """All job slots are taken; the caller should retry later."""
+
+
+class PdfJobTimeout(PdfWorkerError):
+    """The job exceeded its time limit and its worker was killed."""
+
+
+class PdfJobFailed(PdfWorkerError):
+    """The worker process died (crash or memory limit) while running the job."""
+
+
+def _init_worker(memory_limit_bytes):
+    """Runs once in every new worker process."""
+    if memory_limit_bytes:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+        except (ImportError, ValueError, OSError):
+            pass  # Not supported on this platform (e.g. Windows)
+
+    # Let jobs defined in Django modules be unpickled in the worker
+    if os.environ.get('DJANGO_SETTINGS_MODULE'):
+        import django
+        from django.apps import apps
+        if not apps.ready:
+            django.setup()
+
+
+class PdfWorkerPool:
+    """
+    A ProcessPoolExecutor with a bounded queue, per-job timeouts and
+    automatic rebuild when a worker hangs or dies.
+    """
+
+    def __init__(self, workers, timeout=30, memory_mb=1024, max_tasks=50, max_pending=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit_bytes = memory_mb * 1024 * 1024 if memory_mb else 0
+        self.max_tasks = max_tasks
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 4)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing
+                # 'spawn' avoids forking a multi-threaded server process
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.memory_limit_bytes,),
+                    max_tasks_per_child=self.max_tasks,
+                )
+            return self._executor
+
+    def _rebuild(self, executor, reason):
+        """Kill the workers of a broken/stuck executor and start fresh on next use."""
+        with self._lock:
+            if self._executor is not executor:
+                return  # Another thread already rebuilt it
+            self._executor = None
+
+        logger.warning(f"Rebuilding PDF worker pool: {reason}")
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            try:
+                process.kill()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, executor, fn, args, deadline):
+        wait = max(0, deadline - time.monotonic())
+        if not self._slots.acquire(timeout=wait):
+            raise PdfWorkerBusy("PDF workers are busy")
+        try:
+            future = executor.submit(fn, *args)
+        except RuntimeError as e:
+            # Shut down by another thread's rebuild between _get_executor() and here
+            self._slots.release()
+            raise BrokenProcessPool(str(e))
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run_batch(self, executor, fn, jobs, results, timeout):
+        """
+        Run (index, args) jobs, at most one per worker at a time, each with its own
+        timeout counted from submission. Results are stored in results[index].
+        """
+        jobs = iter(jobs)
+        pending = {}  # future -> (index, deadline)
+
+        def fill():
+            while len(pending) < self.workers:
+                job = next(jobs, None)
+                if job is None:
+                    return
+                deadline = time.monotonic() + timeout
+                pending[self._submit(executor, fn, job[1], deadline)] = (job[0], deadline)
+
+        try:
+            fill()
+            while pending:
+                nearest = min(deadline for _, deadline in pending.values())
+                done, _ = wait(pending, timeout=max(0, nearest - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    raise FutureTimeoutError()
+                for future in done:
+                    index, _ = pending.pop(future)
+                    if future.cancelled():
+                        # Cancelled by another thread's rebuild
+                        raise BrokenProcessPool("executor was shut down")
+                    results[index] = future.result()
+                fill()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def run_many(self, fn, arg_list, timeout=None):
+        """
+        Run fn(*args) for every args tuple in arg_list and return the results in order.
+
+        A worker that hangs or dies takes the whole executor with it, failing the
+        jobs of other callers too; those are not at fault, so the jobs still
+        missing a result are retried once on the rebuilt pool.
+
+        Args:
+            fn: module-level (picklable) function
+            arg_list: list of argument tuples
+            timeout: seconds per job (default: PDF_JOB_TIMEOUT)
+
+        Raises:
+            PdfWorkerBusy, PdfJobTimeout, PdfJobFailed, or the job's own exception
+        """
+        timeout = timeout or self.timeout
+        results = [_MISSING] * len(arg_list)
+        for attempt in range(1 + BROKEN_POOL_RETRIES):
+            executor = self._get_executor()
+            jobs = [(index, args) for index, args in enumerate(arg_list) if results[index] is _MISSING]
+            try:
+                self._run_batch(executor, fn, jobs, results, timeout)
+                return results
+            except FutureTimeoutError:
+                self._rebuild(executor, f"{fn.__name__} timed out")
+                raise PdfJobTimeout(f"{fn.__name__} timed out")
+            except BrokenProcessPool:
+                self._rebuild(executor, f"worker died in {fn.__name__}")
+                if attempt == BROKEN_POOL_RETRIES:
+                    raise PdfJobFailed(f"Worker died while running {fn.__name__}")
+                logger.info(f"Retrying {len(jobs)} {fn.__name__} job(s) on a rebuilt PDF worker pool")
+
+    def run(self, fn, *args, timeout=None):
+        """Run a single job and return its result. See run_many()."""
+        return self.run_many(fn, [args], timeout=timeout)[0]
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide PDF worker pool, creating it from settings on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(getattr(settings, 'PDF_WORKERS', 0) or min(4, os.cpu_count() or 1))
+            _pool = PdfWorkerPool(
+                workers=workers,
+                timeout=getattr(settings, 'PDF_JOB_TIMEOUT', 30),
+                memory_mb=getattr(settings, 'PDF_WORKER_MEMORY_MB', 1024),
+                max_tasks=getattr(settings, 'PDF_WORKER_MAX_TASKS', 50),
+                max_pending=getattr(settings, 'PDF_MAX_PENDING_JOBS', None),
+            )
+        return _pool
+
+
+def run_job(fn, *args, timeout=None):
+    """Shortcut for get_pool().run(...)."""
+    return get_pool().run(fn, *args, timeout=timeout)
+
+
+# --- JOBS (executed inside worker processes) ---
+
+def count_pages_job(file_path):
+    """
+    Count pages of a PDF on disk.
+    1. PyMuPDF (fitz) - fast C parser
+    2. PyPDF2 - pure-Python fallback (safe here: it only holds this worker's GIL)
+
+    Returns:
+        dict: {'pages': int} or {'error': str} for encrypted/invalid files
+    """
+    try:
+        import fitz
+        with fitz.open(file_path) as doc:
+            if doc.needs_pass:
+                return {'error': 'File is encrypted'}
+            return {'pages': doc.page_count}
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.warning(f"PyMuPDF Error: {e}")
+
+    try:
+        import PyPDF2
+        with open(file_path, 'rb') as f:
+            pdf_reader = PyPDF2.PdfReader(f)
+            if pdf_reader.is_encrypted:
+                return {'error': 'File is encrypted'}
+            return {'pages': len(pdf_reader.pages)}
+    except Exception as e:
+        logger.warning(f"PyPDF2 Error: {e}")
+        return {'error': 'Invalid PDF file'}
+
+
+def count_pdf_pages(file_path, timeout=None):
+    """
+    Count pages of a PDF in the worker pool.
+
+    Returns:
+        dict: {'pages': int} or {'error': str}
+
+    Raises:
+        PdfWorkerError: pool busy, job timed out or worker crashed
+    """
+    return run_job(count_pages_job, file_path, timeout=timeout)
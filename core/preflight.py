@@ -0,0 +1,142 @@
+"""
+PDF Preflight for FastCopy
+Runs after upload (in a background thread) and records, per order document:
+- a low-res first-page thumbnail
+- which pages contain colour
+- page count and page sizes
+Dealers and admins read these results instead of opening the full PDF.
+The stored PDF is optimised separately, once the order is paid (core/pdf_optimizer.py).
+"""
+
+import threading
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from .models import Order, DocumentPreflight
+from .color_detection import detect_color_pages
+from .pdf_workers import run_job
+import logging
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTH = 160       # px, enough for a list-row preview
+
+# Common paper sizes in points (1/72 inch), portrait
+PAPER_SIZES = {
+    'A3': (842, 1191),
+    'A4': (595, 842),
+    'A5': (420, 595),
+    'Letter': (612, 792),
+    'Legal': (612, 1008),
+}
+PAPER_SIZE_TOLERANCE = 6  # points
+
+
+def page_size_label(width, height):
+    """Return a paper name (A4, Letter, ...) or 'W x H mm' for a page size in points."""
+    short_side, long_side = sorted((width, height))
+    for name, (w, h) in PAPER_SIZES.items():
+        if abs(short_side - w) <= PAPER_SIZE_TOLERANCE and abs(long_side - h) <= PAPER_SIZE_TOLERANCE:
+            return name
+    return f"{round(width * 25.4 / 72)} x {round(height * 25.4 / 72)} mm"
+
+
+def render_overview_job(file_path):
+    """Worker job: page count, page sizes and first-page thumbnail (PNG bytes)."""
+    import fitz
+
+    with fitz.open(file_path) as doc:
+        page_sizes = {}
+        thumbnail = None
+
+        for index, page in enumerate(doc):
+            label = page_size_label(page.rect.width, page.rect.height)
+            page_sizes[label] = page_sizes.get(label, 0) + 1
+
+            if index == 0 and page.rect.width:
+                zoom = THUMBNAIL_WIDTH / page.rect.width
+                thumbnail = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False).tobytes("png")
+
+        return {'page_count': doc.page_count, 'page_sizes': page_sizes, 'thumbnail': thumbnail}
+
+
+def analyse_pdf(file_path):
+    """
+    Analyse a PDF on disk. All parsing/rendering runs in the PDF worker pool.
+
+    Args:
+        file_path: absolute path to the PDF
+
+    Returns:
+        dict with page_count, color_pages (range string), page_sizes and thumbnail (PNG bytes)
+    """
+    result = run_job(render_overview_job, file_path)
+
+    # Cached by file hash, so the upload-time detection is reused here
+    result['color_pages'] = detect_color_pages(file_path)['color_pages']
+    return result
+
+
+def run_preflight(order_id):
+    """
+    Run preflight for a single order and store the results.
+
+    Args:
+        order_id: Order primary key
+
+    Returns:
+        DocumentPreflight instance, or None if the order has no PDF
+    """
+    order = Order.objects.filter(pk=order_id).first()
+    if not order or not order.document:
+        return None
+
+    preflight, _ = DocumentPreflight.objects.get_or_create(order=order)
+    preflight.status = 'Processing'
+    preflight.save(update_fields=['status', 'updated_at'])
+
+    try:
+        result = analyse_pdf(order.document.path)
+        preflight.page_count = result['page_count']
+        preflight.color_pages = result['color_pages']
+        preflight.page_sizes = result['page_sizes']
+        preflight.error = ""
+        if result['thumbnail']:
+            if preflight.thumbnail:
+                preflight.thumbnail.delete(save=False)
+            preflight.thumbnail.save(f"{order.order_id}.png", ContentFile(result['thumbnail']), save=False)
+        preflight.status = 'Done'
+        logger.info(f"Preflight done for {order.order_id}: {result['page_count']} pages, colour: {result['color_pages'] or 'none'}")
+    except Exception as e:
+        preflight.status = 'Failed'
+        preflight.error = str(e)
+        logger.error(f"Preflight failed for {order.order_id}: {e}")
+
+    preflight.save()
+    return preflight
+
+
+def _preflight_worker(order_ids):
+    close_old_connections()
+    try:
+        for order_id in order_ids:
+            try:
+                run_preflight(order_id)
+            except Exception as e:
+                logger.error(f"Preflight worker error for order {order_id}: {e}")
+    finally:
+        close_old_connections()
+
+
+def schedule_preflight(order_ids):
+    """
+    Queue preflight for the given orders in a background thread.
+    Starts after the surrounding transaction commits so the worker sees the rows.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+
+    def _start():
+        threading.Thread(target=_preflight_worker, args=(order_ids,), daemon=True).start()
+
+    transaction.on_commit(_start)
@@ -0,0 +1,336 @@
+"""
+Print Job Bundles for FastCopy
+Merges a dealer's open orders (Pending/Confirmed) into print-ready PDFs,
+one per print setup, so a whole shift prints with one file per printer setting:
+
+    bw_single.pdf, bw_double.pdf, color_single.pdf, split_double.pdf, custom_1-4.pdf ...
+
+Each order starts with a separator sheet (order ID, copies, binding) and is
+repeated for its number of copies. Double-sided bundles pad every order to
+an even page count so no order shares a sheet with the next one. Custom
+Printing orders are bundled as their N-up sheets (see core/imposition.py).
+
+Bundles are built in a background thread (the merge itself runs in the PDF
+worker pool) and cached on disk under print_jobs/<dealer>/<signature>/. The
+signature hashes the order set, so any new, changed or completed order
+produces a new build; unchanged sets reuse the cached files. Builds are
+recorded in the storage ledger (print_files) and removed by
+cleanup_order_files once they are FileCleanupManager.RETENTION_PRINT_JOBS old.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+from .storage_ledger import record_change, record_removed
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRINT_JOBS_DIR = 'print_jobs'
+OPEN_STATUSES = ['Pending', 'Confirmed']
+BUNDLE_VERSION = 2          # Bump when the bundle layout changes
+BUNDLE_TIMEOUT = 600        # seconds per bundle merge in the worker pool
+SEPARATOR_SIZE = (595, 842) # A4 portrait, points
+
+_building = set()
+_building_lock = threading.Lock()
+
+
+def folder_usage(path):
+    """Total bytes and file count of a build folder (flat, no subfolders)."""
+    sizes = [entry.stat().st_size for entry in os.scandir(path) if entry.is_file()]
+    return sum(sizes), len(sizes)
+
+
+# --- GROUPING ---
+
+def bundle_group(order):
+    """
+    Printer-setup group for an order, e.g. "bw_single", "split_double", "custom_1-4".
+    """
+    mode = str(order.print_mode or 'bw').lower()
+    if order.service_name == "Custom Printing":
+        from .imposition import order_layout
+        return f"custom_{order_layout(order).replace('/', '-')}"
+    if 'split' in mode:
+        kind = 'split'
+    elif 'color' in mode or 'colour' in mode:
+        kind = 'color'
+    else:
+        kind = 'bw'
+    side = 'double' if order.side_type == 'double' else 'single'
+    return f"{kind}_{side}"
+
+
+def binding_label(order):
+    name = order.service_name or ''
+    if 'Spiral' in name:
+        return 'Spiral Binding'
+    if 'Soft' in name:
+        return 'Soft Binding'
+    return 'None'
+
+
+def order_set_signature(orders):
+    """Hash of everything that affects the bundle content."""
+    digest = hashlib.sha256(f"v{BUNDLE_VERSION}".encode())
+    for order in orders:
+        digest.update(
+            f"{order.pk}|{order.updated_at.isoformat()}|{order.document.name}|{order.image_upload.name}\n".encode()
+        )
+    return digest.hexdigest()[:20]
+
+
+# --- WORKER JOB (runs in the PDF worker pool, no Django) ---
+
+def _add_separator(out, item, duplex):
+    import fitz
+
+    page = out.new_page(width=SEPARATOR_SIZE[0], height=SEPARATOR_SIZE[1])
+    lines = [
+        f"ORDER  {item['order_id']}",
+        "",
+        f"Customer:   {item['customer']}",
+        f"Service:    {item['service']}",
+        f"Binding:    {item['binding']}",
+        f"Print:      {item['print_mode']}  ({item['side']})",
+        f"Pages:      {item['pages']}",
+        f"Copies:     {item['copies']}",
+        f"Location:   {item['location']}",
+    ]
+    page.insert_textbox(fitz.Rect(60, 80, 535, 500), "\n".join(lines), fontsize=16, fontname='cour')
+    page.insert_textbox(fitz.Rect(60, 760, 535, 800), "FastCopy separator sheet - remove before binding",
+                        fontsize=10, fontname='helv', color=(0.4, 0.4, 0.4))
+    if duplex:
+        out.new_page(width=SEPARATOR_SIZE[0], height=SEPARATOR_SIZE[1])
+
+
+def _open_source(path):
+    """Open a PDF, or convert an image to a one-page PDF."""
+    import fitz
+
+    src = fitz.open(path)
+    if not src.is_pdf:
+        pdf_bytes = src.convert_to_pdf()
+        src.close()
+        src = fitz.open("pdf", pdf_bytes)
+    return src
+
+
+def build_bundle_job(output_path, items, duplex):
+    """
+    Merge one bundle.
+
+    Args:
+        output_path: absolute path of the PDF to write
+        items: list of dicts (path, order_id, copies, ... see PrintJobBuilder._item)
+        duplex: pad each order to an even page count
+
+    Returns:
+        dict: {'pages': int, 'orders': [order_id, ...], 'skipped': [{order_id, error}]}
+    """
+    import fitz
+
+    out = fitz.open()
+    done, skipped = [], []
+    for item in items:
+        try:
+            src = _open_source(item['path'])
+        except Exception as e:
+            skipped.append({'order_id': item['order_id'], 'error': str(e)})
+            continue
+        with src:
+            _add_separator(out, item, duplex)
+            for _ in range(item['copies']):
+                out.insert_pdf(src)
+                if duplex and src.page_count % 2:
+                    last = out[-1].rect
+                    out.new_page(width=last.width, height=last.height)
+        done.append(item['order_id'])
+
+    page_count = out.page_count
+    if page_count:
+        # garbage=3 merges the duplicated objects of repeated copies
+        out.save(output_path, garbage=3, deflate=True)
+    out.close()
+    return {'pages': page_count, 'orders': done, 'skipped': skipped}
+
+
+# --- BUILDER ---
+
+class PrintJobBuilder:
+    """
+    Builds and caches print bundles for one dealer.
+
+    Usage:
+        builder = PrintJobBuilder(dealer_user, open_orders_queryset)
+        builder.status()        # {'state': 'ready' | 'building' | 'idle', ...}
+        builder.start()         # background build if nothing is cached
+    """
+
+    def __init__(self, dealer, orders):
+        self.dealer = dealer
+        self.orders = list(
+            orders.filter(status__in=OPEN_STATUSES).select_related('location').order_by('created_at').only(
+                'order_id', 'service_name', 'print_mode', 'side_type', 'copies', 'pages', 'location__name',
+                'customer_name', 'document', 'image_upload', 'updated_at', 'status',
+            )
+        )
+        self.signature = order_set_signature(self.orders)
+
+    # --- Paths ---
+
+    @property
+    def dealer_dir(self):
+        return os.path.join(settings.MEDIA_ROOT, PRINT_JOBS_DIR, str(self.dealer.pk))
+
+    @property
+    def output_dir(self):
+        return os.path.join(self.dealer_dir, self.signature)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.output_dir, 'manifest.json')
+
+    def bundle_path(self, name):
+        """Absolute path of a bundle in the current build, or None if it is not part of it."""
+        manifest = self.manifest()
+        if not manifest or name not in {b['name'] for b in manifest['bundles']}:
+            return None
+        return os.path.join(self.output_dir, f"{name}.pdf")
+
+    def manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # --- State ---
+
+    def status(self):
+        manifest = self.manifest()
+        if manifest:
+            return {'state': 'ready', **manifest}
+        with _building_lock:
+            building = self.output_dir in _building
+        return {'state': 'building' if building else 'idle', 'signature': self.signature, 'order_count': len(self.orders)}
+
+    def start(self):
+        """
+        Start a background build unless the current order set is cached or already building.
+
+        Returns:
+            bool: True if a new build was started
+        """
+        if not self.orders or self.manifest():
+            return False
+        with _building_lock:
+            if self.output_dir in _building:
+                return False
+            _building.add(self.output_dir)
+
+        items = self._grouped_items()
+        threading.Thread(target=self._build, args=(items,), daemon=True).start()
+        return True
+
+    # --- Build ---
+
+    def _item(self, order):
+        file_field = order.document if order.document else order.image_upload
+        return {
+            'path': file_field.path if file_field else '',
+            'order_id': order.order_id,
+            'customer': order.customer_name or '-',
+            'service': order.service_name,
+            'binding': binding_label(order),
+            'print_mode': order.print_mode,
+            'side': order.side_type,
+            'pages': order.pages,
+            'copies': max(1, order.copies),
+            'location': order.location.name if order.location else '-',
+        }
+
+    def _grouped_items(self):
+        groups = {}
+        for order in self.orders:
+            groups.setdefault(bundle_group(order), []).append(self._item(order))
+        return groups
+
+    def _impose(self, items, layout, skipped):
+        """Swap Custom Printing sources for their N-up sheets (cached per file + layout)."""
+        from .imposition import impose_file
+
+        imposed = []
+        for item in items:
+            try:
+                imposed.append(dict(item, path=impose_file(item['path'], layout)))
+            except Exception as e:
+                skipped.append({'order_id': item['order_id'], 'error': f"Imposition failed: {e}"})
+        return imposed
+
+    def _build(self, groups):
+        from .pdf_workers import run_job
+
+        close_old_connections()
+        started = time.time()
+        tmp_dir = self.output_dir + '.tmp'
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            bundles, skipped = [], []
+            for name, items in sorted(groups.items()):
+                missing = [i for i in items if not i['path'] or not os.path.exists(i['path'])]
+                skipped += [{'order_id': i['order_id'], 'error': 'File not found'} for i in missing]
+                items = [i for i in items if i not in missing]
+                if name.startswith('custom_'):
+                    items = self._impose(items, name[len('custom_'):].replace('-', '/'), skipped)
+                if not items:
+                    continue
+
+                result = run_job(build_bundle_job, os.path.join(tmp_dir, f"{name}.pdf"), items,
+                                 name.endswith('_double'), timeout=BUNDLE_TIMEOUT)
+                skipped += result['skipped']
+                if result['pages']:
+                    bundles.append({'name': name, 'pages': result['pages'], 'orders': result['orders']})
+
+            manifest = {
+                'signature': self.signature,
+                'created_at': time.time(),
+                'order_count': len(self.orders),
+                'bundles': bundles,
+                'skipped': skipped,
+            }
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f)
+
+            # Publish atomically, then drop builds for older order sets
+            build_size, build_files = folder_usage(tmp_dir)
+            os.replace(tmp_dir, self.output_dir)
+            record_change(os.path.relpath(self.output_dir, settings.MEDIA_ROOT), build_size, build_files)
+            for entry in os.listdir(self.dealer_dir):
+                old_dir = os.path.join(self.dealer_dir, entry)
+                if entry == self.signature or entry.endswith('.tmp'):
+                    continue
+                try:
+                    old_size, old_files = folder_usage(old_dir)
+                    shutil.rmtree(old_dir)
+                    record_removed(old_dir, old_size, old_files)
+                except OSError as e:
+                    logger.warning(f"Could not remove old print bundle build {old_dir}: {e}")
+
+            logger.info(f"Print bundles for dealer {self.dealer.pk}: {len(bundles)} bundle(s), "
+                        f"{len(self.orders)} orders in {time.time() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"Print bundle build failed for dealer {self.dealer.pk}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        finally:
+            with _building_lock:
+                _building.discard(self.output_dir)
+            close_old_connections()
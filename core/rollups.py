@@ -0,0 +1,201 @@
+"""
+Daily Order Rollups for FastCopy
+Maintains DailyOrderRollup: per local day, location, service, status and
+payment status - orders, pages, copies, revenue, discounts and dealer payout.
+
+Rollups are rebuilt a whole day at a time (one indexed range query over
+that day's orders), which keeps them exact without tracking deltas:
+
+- Order saves/deletes mark the order's day dirty (core/signals.py); checkout
+  batches, which are bulk-inserted, mark their day in OrderBatchBuilder.
+- Dirty days are queued on commit and rebuilt by a background thread after
+  a short delay, so a checkout touching 20 orders rebuilds its day once.
+- `python manage.py rebuild_rollups` rebuilds a range nightly and repairs
+  anything missed (e.g. queryset .update() calls, dealer price changes).
+- Orders placed before the rollups existed were backfilled by migration
+  0049_backfill_daily_rollups (which keeps its own frozen copy of this logic).
+
+Dealer totals are per location: a dealer's figures are the rollups of the
+locations assigned to them (UserProfile.dealer_locations).
+"""
+
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+REBUILD_DELAY = 2           # seconds to collect dirty days before rebuilding
+ROLLUP_FIELDS = (
+    'created_at', 'location', 'service_name', 'status', 'payment_status', 'pages', 'copies',
+    'print_mode', 'side_type', 'custom_color_pages', 'total_price', 'discount_amount',
+)
+MEASURES = ('orders', 'pages', 'copies', 'revenue', 'discounts', 'dealer_payout')
+
+_dirty_days = set()
+_dirty_lock = threading.Lock()
+_worker_running = False
+
+
+def rollups_enabled():
+    return getattr(settings, 'ORDER_ROLLUPS_ENABLED', True)
+
+
+def local_day(value):
+    """Local (TIME_ZONE) date of an aware datetime."""
+    return timezone.localtime(value).date()
+
+
+def day_bounds(day):
+    """Aware [start, end) datetimes of a local day."""
+    start = timezone.make_aware(datetime.combine(day, dt_time.min))
+    return start, start + timedelta(days=1)
+
+
+# --- REBUILD ---
+
+def rebuild_day(day):
+    """
+    Recompute all rollup rows for one local day.
+
+    Args:
+        day: datetime.date
+
+    Returns:
+        int: number of rollup rows written
+    """
+    from .models import DailyOrderRollup, Order
+    from .utils import pricing_for
+
+    start, end = day_bounds(day)
+    orders = Order.objects.filter(created_at__gte=start, created_at__lt=end).only(*ROLLUP_FIELDS).order_by()
+    groups = group_orders(orders.iterator(chunk_size=2000), pricing_for(True))
+    rows = [DailyOrderRollup(**key, **measures) for key, measures in groups]
+    with transaction.atomic():
+        DailyOrderRollup.objects.filter(day=day).delete()
+        DailyOrderRollup.objects.bulk_create(rows)
+    return len(rows)
+
+
+def group_orders(orders, dealer_pricing):
+    """
+    Sum orders into rollup rows.
+
+    Args:
+        orders: iterable of orders with ROLLUP_FIELDS loaded
+        dealer_pricing: dict from pricing_for(True)
+
+    Returns:
+        list: (key, measures) pairs; key holds day, location_id, service_name, status, payment_status
+    """
+    from .utils import calculate_dealer_price
+
+    groups = {}
+    for order in orders:
+        key = (local_day(order.created_at), order.location_id, order.service_name, order.status, order.payment_status)
+        row = groups.get(key)
+        if row is None:
+            row = groups[key] = dict.fromkeys(MEASURES, 0)
+        row['orders'] += 1
+        row['pages'] += order.pages
+        row['copies'] += order.copies
+        row['revenue'] += order.total_price or 0
+        row['discounts'] += order.discount_amount or 0
+        row['dealer_payout'] += Decimal(str(round(calculate_dealer_price(order, dealer_pricing), 2)))
+
+    keys = ('day', 'location_id', 'service_name', 'status', 'payment_status')
+    return [(dict(zip(keys, key)), measures) for key, measures in groups.items()]
+
+
+def rebuild_range(first_day, last_day):
+    """
+    Rebuild every day from first_day to last_day (inclusive).
+
+    Returns:
+        tuple: (days rebuilt, rollup rows written)
+    """
+    days = rows = 0
+    day = first_day
+    while day <= last_day:
+        rows += rebuild_day(day)
+        days += 1
+        day += timedelta(days=1)
+    return days, rows
+
+
+# --- INCREMENTAL UPDATES ---
+
+def mark_dirty(created_at):
+    """
+    Queue the day of an order for a rebuild once the current transaction commits.
+
+    Args:
+        created_at: the order's created_at (None means today)
+    """
+    if not rollups_enabled():
+        return
+    day = local_day(created_at or timezone.now())
+    transaction.on_commit(lambda: _queue(day))
+
+
+def _queue(day):
+    global _worker_running
+    if not rollups_enabled():
+        return
+    with _dirty_lock:
+        _dirty_days.add(day)
+        if _worker_running:
+            return
+        _worker_running = True
+    threading.Thread(target=_rebuild_worker, daemon=True).start()
+
+
+def _rebuild_worker():
+    global _worker_running
+    close_old_connections()
+    try:
+        while True:
+            time.sleep(REBUILD_DELAY)
+            with _dirty_lock:
+                days = sorted(_dirty_days)
+                _dirty_days.clear()
+                if not days:
+                    _worker_running = False
+                    return
+            for day in days:
+                try:
+                    rebuild_day(day)
+                except Exception as e:
+                    logger.error(f"Rollup rebuild failed for {day}: {e}")
+    except Exception:
+        with _dirty_lock:
+            _worker_running = False
+        raise
+    finally:
+        close_old_connections()
+
+
+# --- READS ---
+
+def rollup_totals(queryset=None, **filters):
+    """
+    Summed measures over rollup rows.
+
+    Args:
+        queryset: optional pre-filtered DailyOrderRollup queryset
+        **filters: extra DailyOrderRollup filters (day__gte=..., location__in=..., ...)
+
+    Returns:
+        dict: orders, pages, copies, revenue, discounts, dealer_payout
+    """
+    from .models import DailyOrderRollup
+
+    queryset = (queryset if queryset is not None else DailyOrderRollup.objects.all()).filter(**filters)
+    totals = queryset.aggregate(**{name: Sum(name) for name in MEASURES})
+    return {name: totals[name] or 0 for name in MEASURES}
@@ -1,7 +1,18 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.db import transaction
 from django.dispatch import receiver
+import logging
 from allauth.account.signals import user_signed_up
+from .models import Order, UserProfile, Location
+from .dealer_ledger import record_delivery
+from .rollups import mark_dirty
+from .order_events import record_event
+from .location_map import assignments_cache_enabled, invalidate_dealer_location_map, invalidate_user_assignments, load_user_assignments
 from .utils import send_welcome_email
 
+logger = logging.getLogger(__name__)
+
 @receiver(user_signed_up)
 def social_login_welcome_email(request, user, **kwargs):
     """
@@ -9,3 +20,85 @@ def social_login_welcome_email(request, user, **kwargs):
     """
     print(f"Signal: User signed up via Social Account: {user.email}")
     send_welcome_email(user)
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_rollup_changed(sender, instance, **kwargs):
+    """
+    Queue a rebuild of the order's day in the daily rollups (see core/rollups.py).
+    """
+    mark_dirty(instance.created_at)
+
+@receiver(post_save, sender=Order)
+def order_delivered_ledger(sender, instance, **kwargs):
+    """
+    Credit the location's dealer when a paid order becomes Delivered (see core/dealer_ledger.py).
+    Re-saves of an order that was already Delivered when loaded cost nothing. The credit runs
+    after commit, so it never blocks or outlives the status change; a failed credit is
+    retried by `settle_dealers` before the dealer's next payout.
+    """
+    state = (instance.status, instance.payment_status)
+    if state != ('Delivered', 'Success') or getattr(instance, '_loaded_status', None) == state:
+        return
+    transaction.on_commit(lambda: _credit_delivery(instance))
+
+def _credit_delivery(order):
+    try:
+        record_delivery(order)
+    except Exception:
+        logger.exception(f"Dealer ledger entry failed for order {order.order_id}; settle_dealers will retry it")
+
+@receiver(post_save, sender=Order)
+def order_event(sender, instance, created, **kwargs):
+    """
+    Push paid-order changes to the live dashboards (see core/order_events.py).
+    Only new orders and actual status or payment changes are pushed, not plain re-saves.
+    """
+    if instance.payment_status != 'Success':
+        return
+    if created or getattr(instance, '_loaded_status', None) != (instance.status, instance.payment_status):
+        record_event(instance)
+
+@receiver(post_save, sender=Order)
+def order_status_saved(sender, instance, **kwargs):
+    """
+    Registered after the receivers above, which compare against the status as loaded:
+    the saved status becomes the baseline for the next save of the same instance.
+    """
+    instance._loaded_status = (instance.status, instance.payment_status)
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def dealer_profile_changed(sender, instance, **kwargs):
+    """
+    Drop the cached location -> dealers map and the user's assignments (see core/location_map.py).
+    """
+    invalidate_dealer_location_map()
+    invalidate_user_assignments(instance.user_id)
+
+@receiver(m2m_changed, sender=UserProfile.dealer_locations.through)
+def dealer_locations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Same for location assignment changes, from either side of the relation.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    invalidate_dealer_location_map()
+    if not reverse:
+        invalidate_user_assignments(instance.user_id)
+    else:
+        profiles = UserProfile.objects.filter(dealer_locations=instance) if pk_set is None else UserProfile.objects.filter(pk__in=pk_set)
+        invalidate_user_assignments(*profiles.values_list('user_id', flat=True))
+
+@receiver(pre_delete, sender=Location)
+def location_deleted(sender, instance, **kwargs):
+    invalidate_dealer_location_map()
+    invalidate_user_assignments(*UserProfile.objects.filter(dealer_locations=instance).values_list('user_id', flat=True))
+
+@receiver(user_logged_in)
+def fill_user_assignments(sender, request, user, **kwargs):
+    """
+    Warm the assignments cache at login so the first dashboard request is query-free.
+    """
+    if assignments_cache_enabled():
+        load_user_assignments(user.pk)
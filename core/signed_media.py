@@ -0,0 +1,233 @@
+"""
+Signed Media URLs for FastCopy
+Order documents/images are linked through short-lived HMAC-signed URLs:
+
+    /signed-media/orders/pdfs/thesis.pdf?e=1767225600&s=<signature>
+
+SignedMediaMiddleware wraps the WSGI application (see fastCopyConfig/wsgi.py)
+and validates these URLs before Django is involved - no request object,
+session or database hit - then serves the file like a static file (Range,
+ETag, 304), or hands the transfer to nginx with X-Accel-Redirect.
+Under ASGI (fastCopyConfig/asgi.py) the same URLs reach signed_media_view(),
+which checks the signature the same way and serves through core/file_serving.py.
+
+Expiry is rounded up to the next TTL window, so a page rendered twice in the
+same window produces the same URL and the browser cache keeps working.
+
+Order files should not be reachable through plain /media/ in production;
+deny /media/orders/ at the proxy and link with signed_url() instead.
+"""
+
+import base64
+import hashlib
+import hmac
+import mimetypes
+import os
+import time
+from urllib.parse import parse_qs, quote
+import logging
+
+logger = logging.getLogger(__name__)
+
+SIGNED_MEDIA_PREFIX = '/signed-media/'
+DEFAULT_TTL = 15 * 60  # seconds
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def derive_key(secret_key):
+    """Use a purpose-specific key so signatures can't be replayed elsewhere."""
+    return hmac.new(secret_key.encode(), b'fastcopy.signed-media', hashlib.sha256).digest()
+
+
+def make_signature(key, name, expires):
+    mac = hmac.new(key, f"{name}:{expires}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac[:18]).decode()
+
+
+def verify_signature(key, name, expires, signature, now=None):
+    """
+    Check a signed media request. Pure stdlib, safe to call outside Django.
+
+    Returns:
+        bool: True if the signature matches and has not expired
+    """
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < (now or time.time()):
+        return False
+    return hmac.compare_digest(make_signature(key, name, expires), signature or '')
+
+
+def signed_url(file_field, ttl=None):
+    """
+    Signed, expiring URL for a FileField/ImageField value.
+
+    Args:
+        file_field: FieldFile (e.g. order.document); empty fields return ""
+        ttl: lifetime in seconds (default: settings.SIGNED_MEDIA_TTL)
+
+    Returns:
+        str: /signed-media/<name>?e=<expires>&s=<signature>
+    """
+    from django.conf import settings
+
+    if not file_field or not file_field.name:
+        return ""
+    ttl = ttl or getattr(settings, 'SIGNED_MEDIA_TTL', DEFAULT_TTL)
+    # Valid for at least one full window, at most two
+    expires = (int(time.time()) // ttl + 2) * ttl
+    key = derive_key(settings.SECRET_KEY)
+    name = file_field.name.replace('\\', '/')
+    return f"{SIGNED_MEDIA_PREFIX}{quote(name)}?e={expires}&s={make_signature(key, name, expires)}"
+
+
+def signed_media_view(request, name):
+    """
+    Django view for /signed-media/<name>, used when the middleware is not in
+    front of the application (ASGI). Same signature and path checks.
+    """
+    from django.conf import settings
+    from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotAllowed
+    from .file_serving import serve_file
+
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    expires = request.GET.get('e', '')
+    if not verify_signature(derive_key(settings.SECRET_KEY), name, expires, request.GET.get('s', '')):
+        return HttpResponseForbidden('403 Forbidden')
+
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    file_path = os.path.realpath(os.path.join(media_root, name))
+    if not file_path.startswith(media_root + os.sep) or not os.path.isfile(file_path):
+        return HttpResponse('404 Not Found', status=404, content_type='text/plain')
+
+    response = serve_file(request, file_path)
+    # Browser may cache until the link expires
+    response['Cache-Control'] = f'private, max-age={max(0, int(expires) - int(time.time()))}'
+    return response
+
+
+class SignedMediaMiddleware:
+    """
+    WSGI middleware serving /signed-media/ requests without entering Django.
+
+    Args:
+        app: the Django WSGI application
+        media_root: MEDIA_ROOT
+        secret_key: SECRET_KEY (the signing key is derived from it)
+        backend: 'python' to serve the bytes here, 'nginx' for X-Accel-Redirect
+        accel_prefix: internal nginx location mapped to MEDIA_ROOT
+    """
+
+    def __init__(self, app, media_root, secret_key, backend='python', accel_prefix='/protected-media/'):
+        self.app = app
+        self.media_root = os.path.realpath(media_root)
+        self.key = derive_key(secret_key)
+        self.backend = backend
+        self.accel_prefix = accel_prefix.rstrip('/') + '/'
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(SIGNED_MEDIA_PREFIX):
+            return self.app(environ, start_response)
+        if environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return self._error(start_response, '405 Method Not Allowed')
+
+        # PATH_INFO is already percent-decoded by the server (as latin-1 per PEP 3333)
+        try:
+            name = path[len(SIGNED_MEDIA_PREFIX):].encode('latin-1').decode('utf-8')
+        except UnicodeError:
+            return self._error(start_response, '404 Not Found')
+        query = parse_qs(environ.get('QUERY_STRING', ''))
+        expires = query.get('e', [''])[0]
+        signature = query.get('s', [''])[0]
+
+        if not verify_signature(self.key, name, expires, signature):
+            return self._error(start_response, '403 Forbidden')
+
+        file_path = os.path.realpath(os.path.join(self.media_root, name))
+        if not file_path.startswith(self.media_root + os.sep) or not os.path.isfile(file_path):
+            return self._error(start_response, '404 Not Found')
+
+        # Browser may cache until the link expires
+        max_age = max(0, int(expires) - int(time.time()))
+        headers = [('Cache-Control', f'private, max-age={max_age}')]
+
+        if self.backend == 'nginx':
+            relative = os.path.relpath(file_path, self.media_root).replace(os.sep, '/')
+            headers.append(('X-Accel-Redirect', self.accel_prefix + quote(relative)))
+            start_response('200 OK', headers + [('Content-Length', '0')])
+            return [b'']
+
+        return self._serve(environ, start_response, file_path, headers)
+
+    def _serve(self, environ, start_response, file_path, headers):
+        from django.utils.http import http_date
+        from .file_serving import file_etag, parse_range
+
+        stat_result = os.stat(file_path)
+        size = stat_result.st_size
+        etag = file_etag(stat_result)
+        headers += [
+            ('Content-Type', mimetypes.guess_type(file_path)[0] or 'application/octet-stream'),
+            ('ETag', etag),
+            ('Last-Modified', http_date(stat_result.st_mtime)),
+            ('Accept-Ranges', 'bytes'),
+        ]
+
+        if etag in [tag.strip() for tag in environ.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            start_response('304 Not Modified', headers)
+            return [b'']
+
+        byte_range = None
+        if environ.get('HTTP_IF_RANGE', etag) == etag:
+            byte_range = parse_range(environ.get('HTTP_RANGE'), size)
+        if byte_range is False:
+            start_response('416 Range Not Satisfiable', headers + [('Content-Range', f'bytes */{size}')])
+            return [b'']
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        if byte_range:
+            status = '206 Partial Content'
+            headers.append(('Content-Range', f'bytes {start}-{end}/{size}'))
+        else:
+            status = '200 OK'
+        headers.append(('Content-Length', str(length)))
+        start_response(status, headers)
+
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return [b'']
+
+        f = open(file_path, 'rb')
+        if not byte_range and 'wsgi.file_wrapper' in environ:
+            return environ['wsgi.file_wrapper'](f, STREAM_BLOCK_SIZE)
+        f.seek(start)
+        return _FileRange(f, length)
+
+    @staticmethod
+    def _error(start_response, status):
+        body = status.encode()
+        start_response(status, [('Content-Type', 'text/plain'), ('Content-Length', str(len(body)))])
+        return [body]
+
+
+class _FileRange:
+    """WSGI iterable yielding `length` bytes from an open file, closed by the server."""
+
+    def __init__(self, f, length):
+        self.f = f
+        self.remaining = length
+
+    def __iter__(self):
+        while self.remaining > 0:
+            block = self.f.read(min(STREAM_BLOCK_SIZE, self.remaining))
+            if not block:
+                break
+            self.remaining -= len(block)
+            yield block
+
+    def close(self):
+        self.f.close()
@@ -0,0 +1,179 @@
+"""
+Storage Ledger for FastCopy
+Keeps running size totals per media category in StorageUsage, so storage
+stats are a single query instead of an os.walk over every uploaded file.
+
+    orders_pdfs     orders/pdfs/, orders/originals/
+    orders_images   orders/images/
+    temp_files      temp/, temp_img/
+    offers          offers/
+    print_files     print_jobs/, orders/imposed/
+
+LedgerFileSystemStorage (the default storage, see STORAGES in settings)
+records every save and delete. Files removed outside the storage API
+(cleanup jobs) report themselves through record_removed(). Anything else
+that writes into these folders directly - and any update lost to a crash -
+is picked up by reconcile(), run periodically:
+
+    python manage.py reconcile_storage
+"""
+
+import os
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# category -> folders relative to MEDIA_ROOT
+CATEGORIES = {
+    'orders_pdfs': ['orders/pdfs', 'orders/originals'],
+    'orders_images': ['orders/images'],
+    'temp_files': ['temp', 'temp_img'],
+    'offers': ['offers'],
+    'print_files': ['print_jobs', 'orders/imposed'],
+}
+
+
+def category_for(name):
+    """Ledger category of a storage name (path relative to MEDIA_ROOT), or None if untracked."""
+    name = name.replace('\\', '/').lstrip('/')
+    for category, folders in CATEGORIES.items():
+        if any(name.startswith(folder + '/') for folder in folders):
+            return category
+    return None
+
+
+def record_change(name, size_delta, count_delta):
+    """
+    Add a size/file-count delta to the category of `name`.
+
+    Never raises: a failed update only means drift, which reconcile() fixes.
+    Before the first reconcile there are no ledger rows and this is a no-op.
+    """
+    from .models import StorageUsage
+
+    category = category_for(name)
+    if not category or not (size_delta or count_delta):
+        return
+    try:
+        # Savepoint, so a ledger error can't break the caller's transaction
+        with transaction.atomic():
+            StorageUsage.objects.filter(category=category).update(
+                total_bytes=F('total_bytes') + size_delta,
+                file_count=F('file_count') + count_delta,
+            )
+    except Exception as e:
+        logger.warning(f"Storage ledger update failed for {name}: {e}")
+
+
+def record_removed(file_path, size, count=1):
+    """Record a file (or a folder of `count` files) deleted outside the storage API."""
+    relative = os.path.relpath(file_path, settings.MEDIA_ROOT)
+    if relative.startswith('..'):
+        return
+    record_change(relative, -size, -count)
+
+
+class LedgerFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage that keeps StorageUsage in step with every save and delete."""
+
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        try:
+            size = os.path.getsize(self.path(name))
+        except OSError:
+            return name
+        record_change(name, size, 1)
+        return name
+
+    def delete(self, name):
+        try:
+            size = os.path.getsize(self.path(name))
+        except (OSError, ValueError):
+            size = None
+        super().delete(name)
+        if size is not None:
+            record_change(name, -size, -1)
+
+
+def _scan(path):
+    """Total bytes and file count under a folder (os.scandir, no symlinks followed)."""
+    total_bytes = file_count = 0
+    pending = [path]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total_bytes += entry.stat(follow_symlinks=False).st_size
+                        file_count += 1
+                except FileNotFoundError:
+                    # Deleted while scanning
+                    continue
+    return total_bytes, file_count
+
+
+def reconcile(dry_run=False):
+    """
+    Recount every category from disk and correct the ledger.
+
+    Args:
+        dry_run: report the drift without writing it
+
+    Returns:
+        dict: category -> {'bytes', 'files', 'drift_bytes', 'drift_files'}
+    """
+    from .models import StorageUsage
+
+    ledger = {row.category: row for row in StorageUsage.objects.all()}
+    report = {}
+    for category, folders in CATEGORIES.items():
+        total_bytes = file_count = 0
+        for folder in folders:
+            folder_bytes, folder_files = _scan(os.path.join(settings.MEDIA_ROOT, *folder.split('/')))
+            total_bytes += folder_bytes
+            file_count += folder_files
+
+        row = ledger.get(category)
+        report[category] = {
+            'bytes': total_bytes,
+            'files': file_count,
+            'drift_bytes': total_bytes - (row.total_bytes if row else 0),
+            'drift_files': file_count - (row.file_count if row else 0),
+        }
+        if not dry_run:
+            StorageUsage.objects.update_or_create(
+                category=category,
+                defaults={'total_bytes': total_bytes, 'file_count': file_count, 'reconciled_at': timezone.now()},
+            )
+
+    if not dry_run:
+        drift = sum(abs(r['drift_bytes']) for r in report.values())
+        logger.info(f"Storage ledger reconciled ({drift} bytes of drift corrected)")
+    return report
+
+
+def usage():
+    """
+    Current bytes per category, from the ledger (one query).
+    The first call on an empty ledger seeds it with a full reconcile.
+
+    Returns:
+        dict: category -> bytes
+    """
+    from .models import StorageUsage
+
+    totals = dict(StorageUsage.objects.values_list('category', 'total_bytes'))
+    if not set(CATEGORIES) <= set(totals):
+        totals = {category: r['bytes'] for category, r in reconcile().items()}
+    return totals
@@ -0,0 +1,12 @@
+from django import template
+from core.signed_media import signed_url as make_signed_url
+
+register = template.Library()
+
+@register.filter(name='signed_url')
+def signed_url(file_field):
+    """
+    Signed, expiring URL for an order file.
+    Usage: {{ order.document|signed_url }}
+    """
+    return make_signed_url(file_field)
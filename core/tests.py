@@ -1,3 +1,762 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .chunked_upload import CHUNK_SIZE, MAX_OPEN_SESSIONS, ChunkedUpload, ChunkedUploadError
+from .cleanup import FileCleanupManager
+from .cold_storage import archive_path
+from .dealer_ledger import dealer_summary, settle_dealer
+from .file_serving import serve_file
+from .imposition import impose_file
+from .location_map import ASSIGNMENTS_KEY, assignments_cache_enabled
+from .models import DailyOrderRollup, DealerLedgerEntry, DealerSettlement, Location, Order, OrderEvent, UserProfile
+from .order_builder import OrderBatchBuilder, OrderBatchError
+from .order_events import events_after, poll_response_body
+from .order_transitions import bulk_transition
+from .pdf_optimizer import optimize_order_document
+from .pdf_workers import PdfJobTimeout, PdfWorkerPool
+from .rollups import local_day, rebuild_day, rollup_totals
+from .signed_media import SignedMediaMiddleware, signed_url
+from .storage_ledger import reconcile, usage
+from .views import COLOR_DETECT_RATE, _dealer_orders
+
+
+class UserProfileAdminQueryTests(TestCase):
+    """The profile changelist must not run per-row queries (user, dealer locations)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.locations = [Location.objects.create(name=f"Campus {i}") for i in range(3)]
+
+    def add_profiles(self, count, offset=0):
+        for i in range(offset, offset + count):
+            user = User.objects.create_user(f"90000{i:05d}", f"student{i}@example.com", first_name=f"Student {i}")
+            profile = UserProfile.objects.create(user=user, mobile=user.username, is_dealer=(i % 2 == 0))
+            if profile.is_dealer:
+                profile.dealer_locations.set(self.locations)
+
+    def changelist_queries(self):
+        self.client.force_login(self.admin_user)
+        cache.clear()  # changelist counts are cached
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('fastcopy_admin:core_userprofile_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_profiles(5)
+        baseline = self.changelist_queries()
+
+        self.add_profiles(20, offset=5)
+        cache.clear()
+        with self.assertNumQueries(baseline):
+            self.client.get(reverse('fastcopy_admin:core_userprofile_changelist'))
+
+
+class OrderBatchBuilderTests(TestCase):
+    """Checkout batches keep each item's own details and reject bad items."""
+
+    def test_contact_details_stay_per_item(self):
+        user = User.objects.create_user('9000000001', 'buyer@example.com')
+        Location.objects.create(name="Main Campus")
+        items = [
+            {'service_name': 'Printing', 'total_price': 10, 'pages': 2, 'copies': 1, 'location': 'Main Campus',
+             'mobile': '9111111111', 'customer_name': 'First'},
+            {'service_name': 'Printing', 'total_price': 20, 'pages': 4, 'copies': 1, 'location': 'Main Campus'},
+        ]
+        orders = OrderBatchBuilder(user, 'TXN_BATCH_1').build(items)
+
+        self.assertEqual([(o.mobile, o.customer_name) for o in orders], [('9111111111', 'First'), ('', '')])
+        self.assertEqual(Order.objects.filter(transaction_id='TXN_BATCH_1').count(), 2)
+
+    def test_unknown_location_is_rejected(self):
+        user = User.objects.create_user('9000000007')
+        Location.objects.create(name="Main Campus")
+        items = [
+            {'service_name': 'Printing', 'total_price': 10, 'location': 'Main Campus'},
+            {'service_name': 'Printing', 'total_price': 10, 'location': 'Old Campus'},
+        ]
+
+        with self.assertRaisesMessage(OrderBatchError, 'unknown pickup location: Old Campus'):
+            OrderBatchBuilder(user, 'TXN_BATCH_2').build(items)
+        with self.assertRaisesMessage(OrderBatchError, 'no pickup location'):
+            OrderBatchBuilder(user, 'TXN_BATCH_3').build([{'service_name': 'Printing', 'total_price': 10}])
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_with_unknown_location_returns_to_cart(self):
+        user = User.objects.create_user('9000000008')
+        self.client.force_login(user)
+        session = self.client.session
+        session['pending_batch_id'] = 'TXN_BATCH_4'
+        session['cart'] = [{'service_name': 'Printing', 'total_price': 10, 'location': 'Old Campus'}]
+        session.save()
+
+        response = self.client.post(reverse('initiate_payment'), follow=True)
+
+        self.assertRedirects(response, reverse('cart'))
+        self.assertContains(response, 'unknown pickup location: Old Campus')
+        self.assertFalse(Order.objects.exists())
+
+
+class ColorDetectionViewTests(TestCase):
+    """Colour detection only runs on the session's own uploads, and is throttled."""
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('detect_color_pages')
+
+    def test_rejects_files_not_uploaded_in_session(self):
+        response = self.client.post(self.url, {'temp_path': 'temp/pre_someone_else.pdf'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_throttles_per_uploader(self):
+        session = self.client.session
+        session['uploaded_temp_paths'] = ['temp/pre_missing.pdf']
+        session.save()
+        limit = COLOR_DETECT_RATE[0]
+        for _ in range(limit):
+            response = self.client.post(self.url, {'temp_path': 'temp/pre_missing.pdf'})
+            self.assertEqual(response.json()['error'], 'File not found')
+        response = self.client.post(self.url, {'temp_path': 'temp/pre_missing.pdf'})
+        self.assertEqual(response.status_code, 429)
+
+
+class PdfWorkerPoolTests(SimpleTestCase):
+    """A timed-out job must not fail other callers' jobs; timeouts apply per job."""
+
+    def setUp(self):
+        self.pool = PdfWorkerPool(workers=2, timeout=20, memory_mb=0)
+        self.pool.run(time.sleep, 0)  # start the workers
+        self.addCleanup(self.pool.shutdown)
+
+    def test_other_jobs_survive_a_timeout(self):
+        results = {}
+        other = threading.Thread(target=lambda: results.update(r=self.pool.run_many(time.sleep, [(0.5,)] * 6)))
+        other.start()
+        time.sleep(0.2)
+        with self.assertRaises(PdfJobTimeout):
+            self.pool.run(time.sleep, 10, timeout=1)
+        other.join()
+        self.assertEqual(results['r'], [None] * 6)
+
+    def test_timeout_is_per_job_not_per_batch(self):
+        # 8 jobs on 2 workers take longer than one job's timeout in total
+        self.assertEqual(self.pool.run_many(time.sleep, [(0.4,)] * 8, timeout=1), [None] * 8)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='fastcopy_test_media_'))
+class ChunkedUploadTests(TestCase):
+    """Chunked uploads keep the storage ledger exact and bound open sessions."""
+
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+        reconcile()  # seed the ledger rows
+
+    def test_ledger_matches_disk_after_upload_and_finalize(self):
+        data = os.urandom(CHUNK_SIZE + 1000)
+        upload = ChunkedUpload.create('user:1', 'big.pdf', len(data))
+        upload.write_chunk(0, io.BytesIO(data[:CHUNK_SIZE]))
+        upload.write_chunk(1, io.BytesIO(data[CHUNK_SIZE:]))
+        upload.write_chunk(1, io.BytesIO(data[CHUNK_SIZE:]))  # retried chunk
+        self.assertEqual(reconcile(dry_run=True)['temp_files']['drift_bytes'], 0)
+
+        temp_path = upload.finalize(default_storage)
+
+        with default_storage.open(temp_path) as f:
+            self.assertEqual(f.read(), data)
+        self.assertFalse(os.path.exists(upload.session_dir))
+        drift = reconcile(dry_run=True)['temp_files']
+        self.assertEqual((drift['drift_bytes'], drift['drift_files']), (0, 0))
+        self.assertEqual(usage()['temp_files'], len(data))
+
+    def test_open_sessions_are_limited_per_owner(self):
+        uploads = [ChunkedUpload.create('session:abc', f'{i}.pdf', 10) for i in range(MAX_OPEN_SESSIONS + 1)]
+        ChunkedUpload.create('user:2', 'other.pdf', 10)
+
+        with self.assertRaises(ChunkedUploadError):
+            ChunkedUpload.load(uploads[0].upload_id, 'session:abc')
+        for upload in uploads[1:]:
+            ChunkedUpload.load(upload.upload_id, 'session:abc')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='fastcopy_test_media_'))
+class SignedMediaTests(TestCase):
+    """Signed links work through the Django view (ASGI) and the WSGI middleware."""
+
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+        self.name = default_storage.save('orders/pdfs/thesis.pdf', io.BytesIO(b'%PDF-1.4 test'))
+        self.url = signed_url(SimpleNamespace(name=self.name))
+
+    def test_view_serves_signed_url(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 test')
+        self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_view_rejects_tampered_and_expired_links(self):
+        self.assertEqual(self.client.get(self.url.replace('thesis', 'other')).status_code, 403)
+        path = self.url.split('?')[0]
+        self.assertEqual(self.client.get(f'{path}?e=1&s=x').status_code, 403)
+
+    def test_middleware_serves_signed_url(self):
+        path, query = self.url.split('?')
+        app = SignedMediaMiddleware(lambda environ, start_response: [b'django'],
+                                    media_root=settings.MEDIA_ROOT, secret_key=settings.SECRET_KEY)
+        statuses = []
+        body = app({'PATH_INFO': path, 'QUERY_STRING': query, 'REQUEST_METHOD': 'GET'},
+                   lambda status, headers: statuses.append(status))
+        self.assertEqual(statuses, ['200 OK'])
+        self.assertEqual(b''.join(body), b'%PDF-1.4 test')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='fastcopy_test_media_'))
+class PrintOutputCleanupTests(TestCase):
+    """Old print bundle builds are removed and the ledger follows."""
+
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+
+    def _make_file(self, *parts, age_days=0):
+        path = os.path.join(settings.MEDIA_ROOT, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * 100)
+        if age_days:
+            stamp = time.time() - age_days * 86400
+            os.utime(path, (stamp, stamp))
+            os.utime(os.path.dirname(path), (stamp, stamp))
+        return path
+
+    def test_old_print_job_builds_are_deleted(self):
+        old = self._make_file('print_jobs', '1', 'old', 'bw_single.pdf',
+                              age_days=FileCleanupManager.RETENTION_PRINT_JOBS + 1)
+        current = self._make_file('print_jobs', '1', 'current', 'bw_single.pdf')
+        reconcile()
+
+        FileCleanupManager().cleanup_print_jobs()
+
+        self.assertFalse(os.path.exists(os.path.dirname(old)))
+        self.assertTrue(os.path.exists(current))
+        drift = reconcile(dry_run=True)['print_files']
+        self.assertEqual((drift['bytes'], drift['drift_bytes'], drift['drift_files']), (100, 0, 0))
+
+    def test_unused_imposed_files_are_deleted(self):
+        stale_days = FileCleanupManager.RETENTION_IMPOSED + 1
+        unused = self._make_file('orders', 'imposed', 'aaa_1-4_v1.pdf', age_days=stale_days)
+        reused = self._make_file('orders', 'imposed', 'bbb_1-4_v1.pdf', age_days=stale_days)
+        reconcile()
+
+        self.assertEqual(impose_file('/unused/source.pdf', '1/4', file_hash='bbb'), reused)
+        FileCleanupManager().cleanup_imposed_files()
+
+        self.assertFalse(os.path.exists(unused))
+        self.assertTrue(os.path.exists(reused))
+        drift = reconcile(dry_run=True)['print_files']
+        self.assertEqual((drift['bytes'], drift['drift_bytes'], drift['drift_files']), (100, 0, 0))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='fastcopy_test_media_'),
+                   COLD_STORAGE_DIR=tempfile.mkdtemp(prefix='fastcopy_test_cold_'),
+                   CLEANUP_REPORT_DIR=tempfile.mkdtemp(prefix='fastcopy_test_reports_'),
+                   COLD_STORAGE_ENABLED=True)
+class OrderFileCleanupTests(TestCase):
+    """Hot -> cold -> deleted lifecycle of delivered order files."""
+
+    def setUp(self):
+        for folder in (settings.MEDIA_ROOT, settings.COLD_STORAGE_DIR, settings.CLEANUP_REPORT_DIR):
+            self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        user = User.objects.create_user('9000000002')
+        self.order = Order.objects.create(
+            user=user, service_name='Printing', print_mode='bw', total_price=10, status='Delivered',
+            document=default_storage.save('orders/pdfs/thesis.pdf', io.BytesIO(b'%PDF-1.4 delivered')),
+        )
+
+    def _age(self, days):
+        Order.objects.filter(pk=self.order.pk).update(updated_at=timezone.now() - timedelta(days=days))
+
+    def test_custom_days_archive_without_deleting_the_archive(self):
+        self._age(40)
+
+        stats = FileCleanupManager().run_cleanup(days=30, include_temp=False)
+
+        self.order.refresh_from_db()
+        self.assertEqual((stats['orders_archived'], stats['total_files_deleted']), (1, 0))
+        self.assertEqual(self.order.storage_tier, 'cold')
+        self.assertEqual(self.order.document.name, 'orders/pdfs/thesis.pdf')
+        self.assertFalse(os.path.exists(self.order.document.path))
+        self.assertIsNotNone(archive_path(self.order.document.name))
+
+    def test_archives_are_deleted_after_cold_retention(self):
+        self._age(40)
+        FileCleanupManager().run_cleanup(include_temp=False)
+        self._age(FileCleanupManager.RETENTION_COLD + 1)
+
+        FileCleanupManager().run_cleanup(days=30, include_temp=False)
+
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.document)
+        self.assertIsNone(archive_path('orders/pdfs/thesis.pdf'))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='fastcopy_test_media_'))
+class PdfOptimizationTests(TestCase):
+    """Paid orders' PDFs are optimised with the upload kept alongside."""
+
+    def setUp(self):
+        import fitz
+
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+        doc = fitz.open()
+        for _ in range(5):
+            doc.new_page().insert_text((72, 72), 'FastCopy ' * 2000)
+        pdf = doc.tobytes()  # no compression, so the rewrite is much smaller
+        self.order = Order.objects.create(
+            user=User.objects.create_user('9000000003'), service_name='Printing', print_mode='bw',
+            total_price=10, document=default_storage.save('orders/pdfs/notes.pdf', io.BytesIO(pdf)),
+        )
+        self.size = len(pdf)
+
+    def test_unpaid_orders_are_not_optimised(self):
+        self.assertIsNone(optimize_order_document(self.order.pk))
+        self.order.refresh_from_db()
+        self.assertIsNone(self.order.optimized_at)
+
+    def test_paid_order_keeps_original_next_to_optimised_document(self):
+        Order.objects.filter(pk=self.order.pk).update(payment_status='Success')
+
+        saved = optimize_order_document(self.order.pk)
+
+        self.order.refresh_from_db()
+        self.assertGreater(saved, 0)
+        self.assertEqual(self.order.original_document.size, self.size)
+        self.assertEqual(self.order.document.size, self.size - saved)
+
+    def test_delivery_marking_delivered_discards_the_original(self):
+        Order.objects.filter(pk=self.order.pk).update(payment_status='Success')
+        optimize_order_document(self.order.pk)
+        original_path = Order.objects.get(pk=self.order.pk).original_document.path
+        cache.clear()
+        delivery_user = User.objects.create_user('9000000012')
+        UserProfile.objects.create(user=delivery_user, mobile='9000000012', is_delivery_boy=True)
+        self.client.force_login(delivery_user)
+
+        self.client.post(reverse('update_delivery_status', args=[self.order.pk]), {'status': 'Delivered'})
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'Delivered')
+        self.assertFalse(self.order.original_document)
+        self.assertFalse(os.path.exists(original_path))
+
+
+class DailyRollupTests(TestCase):
+    """Rollups match the live orders, including orders placed before they existed."""
+
+    def setUp(self):
+        user = User.objects.create_user('9000000004')
+        location = Location.objects.create(name='North Block')
+        for price, status in ((10, 'Pending'), (25, 'Delivered'), (40, 'Delivered')):
+            Order.objects.create(user=user, service_name='Printing', print_mode='bw', pages=2,
+                                 total_price=price, status=status, location=location)
+        DailyOrderRollup.objects.all().delete()  # as before the rollups were deployed
+
+    def test_backfill_migration_covers_existing_orders(self):
+        backfill = import_module('core.migrations.0049_backfill_daily_rollups').backfill_rollups
+        backfill(django_apps, None)
+
+        totals = rollup_totals()
+        self.assertEqual((totals['orders'], totals['pages'], totals['revenue']), (3, 6, 75))
+        self.assertEqual(rollup_totals(status='Delivered')['revenue'], 65)
+
+    def test_backfill_matches_rebuild_day(self):
+        user = User.objects.get(username='9000000004')
+        for service, mode, side, colour in (('Spiral Binding', 'color', 'double', ''), ('Custom Printing', '1/8', 'single', ''),
+                                            ('Soft Binding', 'custom_split', 'single', '1-3,7'), ('Printing', 'bw', 'double', '')):
+            Order.objects.create(user=user, service_name=service, print_mode=mode, side_type=side, pages=45, copies=2,
+                                 custom_color_pages=colour, total_price=99)
+        import_module('core.migrations.0049_backfill_daily_rollups').backfill_rollups(django_apps, None)
+        backfilled = rollup_totals()
+
+        rebuild_day(local_day(timezone.now()))
+
+        self.assertEqual(backfilled, rollup_totals())
+        self.assertGreater(backfilled['dealer_payout'], 0)
+
+    def test_rebuild_day_sums_the_day(self):
+        rebuild_day(local_day(timezone.now()))
+        self.assertEqual(rollup_totals()['revenue'], 75)
+
+    def _summary(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get(reverse('fastcopy_admin:core_order_changelist'), {'status__exact': 'Delivered'})
+        return response.context['summary_total'], response.context['summary_count']
+
+    @override_settings(ORDER_ROLLUPS_ENABLED=True)
+    def test_admin_summary_reads_rollups(self):
+        rebuild_day(local_day(timezone.now()))
+        Order.objects.filter(total_price=40).update(total_price=50)  # .update(): rollups not rebuilt
+
+        self.assertEqual(self._summary(), (65.0, 2))
+
+    def test_admin_summary_is_live_when_rollups_are_off(self):
+        Order.objects.filter(total_price=40).update(total_price=50)
+
+        self.assertEqual(self._summary(), (75.0, 2))
+
+    def test_no_background_rebuild_when_rollups_are_off(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.filter(status='Pending').first().save()
+
+        self.assertFalse(DailyOrderRollup.objects.exists())
+        self.assertFalse([thread for thread in threading.enumerate() if thread.name.endswith('(_rebuild_worker)')])
+
+
+@override_settings(DEALER_STATEMENT_DIR=tempfile.mkdtemp(prefix='fastcopy_test_statements_'))
+class DealerLedgerTests(TestCase):
+    """Delivered orders credit the location's dealer once; settlements pay the balance out."""
+
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.DEALER_STATEMENT_DIR, ignore_errors=True)
+        location = Location.objects.create(name='South Block')
+        self.dealer = User.objects.create_user('9000000005')
+        UserProfile.objects.create(user=self.dealer, mobile='9000000005', is_dealer=True).dealer_locations.add(location)
+        self.order = Order.objects.create(
+            user=User.objects.create_user('9000000006'), service_name='Printing', print_mode='bw', pages=10,
+            total_price=30, location=location, payment_status='Success', transaction_id='TXN_LEDGER_1',
+        )
+
+    def _deliver(self, order):
+        order.status = 'Delivered'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+    def test_delivered_order_is_credited_once(self):
+        self._deliver(self.order)
+        self._deliver(self.order)
+        self._deliver(Order.objects.get(pk=self.order.pk))
+
+        entries = DealerLedgerEntry.objects.filter(dealer=self.dealer)
+        self.assertEqual(sorted(entries.values_list('entry_type', flat=True)), ['delivery', 'earning'])
+        self.assertEqual(dealer_summary(self.dealer)['balance'], sum(entry.amount for entry in entries))
+
+    def test_resaving_a_delivered_order_skips_the_ledger(self):
+        self._deliver(self.order)
+        order = Order.objects.get(pk=self.order.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            self._deliver(order)
+
+        self.assertFalse([q for q in queries.captured_queries if 'dealerledgerentry' in q['sql'].lower()])
+
+    def test_settlement_totals_and_payout_entry(self):
+        self._deliver(self.order)
+        earned = dealer_summary(self.dealer)['balance']
+
+        settlement = settle_dealer(self.dealer, timezone.now() + timedelta(seconds=1))
+
+        self.assertEqual(settlement.amount, earned)
+        self.assertEqual(settlement.entry_count, 2)
+        self.assertEqual(settlement.earnings + settlement.delivery_fees, earned)
+        payout = DealerLedgerEntry.objects.get(dealer=self.dealer, entry_type='payout')
+        self.assertEqual((payout.amount, payout.balance_after), (-earned, 0))
+        self.assertEqual(dealer_summary(self.dealer)['total_paid'], earned)
+        self.assertIsNone(settle_dealer(self.dealer, timezone.now() + timedelta(seconds=1)))
+
+    def test_backfilled_credits_are_paid_in_the_same_run(self):
+        self._deliver(self.order)  # credited today, after the run's period end
+        missed = Order.objects.create(
+            user=self.order.user, service_name='Printing', print_mode='bw', pages=4, total_price=12,
+            location=self.order.location, payment_status='Success', status='Delivered', transaction_id='TXN_LEDGER_2',
+        )  # its on_commit credit never runs
+        Order.objects.filter(pk=missed.pk).update(created_at=timezone.now() - timedelta(days=1))
+
+        call_command('settle_dealers', stdout=io.StringIO())
+
+        backfilled = DealerLedgerEntry.objects.filter(order=missed)
+        settlement = DealerSettlement.objects.get(dealer=self.dealer)
+        self.assertEqual(settlement.entry_count, 2)
+        self.assertEqual(settlement.amount, sum(entry.amount for entry in backfilled))
+        self.assertTrue(all(entry.created_at < settlement.period_end for entry in backfilled))
+
+        # Today's live credits have lower ids than the backfill but still go into the next payout
+        later = settle_dealer(self.dealer, timezone.now() + timedelta(seconds=1))
+        self.assertEqual(later.entry_count, 2)
+        self.assertEqual(dealer_summary(self.dealer)['balance'], 0)
+        self.assertIsNone(settle_dealer(self.dealer, timezone.now() + timedelta(seconds=1)))
+
+
+class BulkStatusTests(TestCase):
+    """Bulk status changes apply the role's transition table and report what was skipped."""
+
+    def setUp(self):
+        cache.clear()
+        location = Location.objects.create(name='East Block')
+        self.dealer = User.objects.create_user('9000000009')
+        UserProfile.objects.create(user=self.dealer, mobile='9000000009', is_dealer=True).dealer_locations.add(location)
+        self.client.force_login(self.dealer)
+        customer = User.objects.create_user('9000000010')
+        self.orders = {
+            status: Order.objects.create(user=customer, service_name='Printing', print_mode='bw', total_price=10,
+                                         location=location, payment_status='Success', status=status)
+            for status in ('Pending', 'Confirmed', 'Delivered')
+        }
+        self.url = reverse('dealer_bulk_status')
+
+    def _post(self, payload):
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def test_allowed_moves_are_applied_and_others_skipped(self):
+        other = Order.objects.create(user=self.orders['Pending'].user, service_name='Printing', print_mode='bw',
+                                     total_price=10, payment_status='Success')  # no location: not the dealer's
+        ids = [order.pk for order in self.orders.values()] + [other.pk]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._post({'order_ids': ids, 'status': 'Ready'})
+
+        result = response.json()
+        self.assertEqual(sorted(row['id'] for row in result['updated']),
+                         sorted([self.orders['Pending'].pk, self.orders['Confirmed'].pk]))
+        self.assertEqual({row['id']: row['reason'] for row in result['skipped']}, {
+            self.orders['Delivered'].pk: 'Cannot move from Delivered to Ready',
+            other.pk: 'Order not found',
+        })
+        self.assertEqual(Order.objects.filter(status='Ready').count(), 2)
+        self.assertEqual(OrderEvent.objects.filter(status='Ready').count(), 2)
+
+    def test_unpaid_orders_get_no_events(self):
+        unpaid = Order.objects.create(user=self.orders['Pending'].user, service_name='Printing', print_mode='bw',
+                                      total_price=10, payment_status='Pending')
+        with self.captureOnCommitCallbacks(execute=True):
+            result = bulk_transition(Order.objects.all(), [unpaid.pk], 'Ready', 'dealer')
+
+        self.assertEqual(len(result['updated']), 1)
+        self.assertFalse(OrderEvent.objects.filter(order=unpaid).exists())
+
+    def test_malformed_payloads_are_rejected(self):
+        pending = self.orders['Pending'].pk
+        for payload in ([pending], {'order_ids': str(pending), 'status': 'Ready'},
+                        {'order_ids': [pending], 'status': ['Ready']}, {'order_ids': [pending], 'status': 'Lost'}):
+            with self.subTest(payload=payload):
+                self.assertEqual(self._post(payload).status_code, 400)
+        self.assertEqual(Order.objects.get(pk=pending).status, 'Pending')
+
+    def test_back_transitions_are_refused(self):
+        delivered = self.orders['Delivered']
+        result = self._post({'order_ids': [delivered.pk], 'status': 'Pending'}).json()
+        self.assertEqual(result['skipped'][0]['reason'], 'Cannot move from Delivered to Pending')
+
+        out = Order.objects.create(user=delivered.user, service_name='Printing', print_mode='bw', total_price=10,
+                                   location=delivered.location, payment_status='Success', status='Out for Delivery')
+        with CaptureQueriesContext(connection) as queries:
+            result = bulk_transition(Order.objects.all(), [delivered.pk], 'Ready', 'delivery')
+            result['skipped'] += bulk_transition(Order.objects.all(), [out.pk], 'Pending', 'delivery')['skipped']
+
+        self.assertEqual([row['reason'] for row in result['skipped']],
+                         ['Cannot move from Delivered to Ready', 'Cannot move from Out for Delivery to Pending'])
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')])
+        self.assertEqual(Order.objects.get(pk=delivered.pk).status, 'Delivered')
+        self.assertEqual(Order.objects.get(pk=out.pk).status, 'Out for Delivery')
+
+    def test_orders_outside_the_locations_are_skipped_with_one_update(self):
+        elsewhere = Order.objects.create(user=self.orders['Pending'].user, service_name='Printing', print_mode='bw',
+                                         total_price=10, location=Location.objects.create(name='West Block'),
+                                         payment_status='Success')
+        scope = _dealer_orders(self.dealer)
+        ids = [self.orders['Pending'].pk, self.orders['Confirmed'].pk, elsewhere.pk]
+
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(4):
+            result = bulk_transition(scope, ids, 'Ready', 'dealer')
+
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(len(result['updated']), 2)
+        self.assertEqual(result['skipped'], [{'id': elsewhere.pk, 'order_id': None, 'reason': 'Order not found'}])
+        self.assertEqual(Order.objects.get(pk=elsewhere.pk).status, 'Pending')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='fastcopy_test_media_'))
+class StorageLedgerTests(TestCase):
+    """The default storage keeps the ledger in step with saves and deletes."""
+
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+        reconcile()
+
+    def test_save_and_delete_update_the_ledger(self):
+        name = default_storage.save('orders/images/photo.jpg', io.BytesIO(b'x' * 300))
+        self.assertEqual(usage()['orders_images'], 300)
+
+        default_storage.delete(name)
+        self.assertEqual(usage()['orders_images'], 0)
+        self.assertEqual(reconcile(dry_run=True)['orders_images']['drift_files'], 0)
+
+    def test_untracked_folders_are_ignored(self):
+        default_storage.save('misc/notes.txt', io.BytesIO(b'x' * 50))
+        self.assertEqual(sum(usage().values()), 0)
+
+
+class FileServingTests(SimpleTestCase):
+    """Order files support Range and conditional requests."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.pdf')
+        os.write(handle, bytes(range(256)) * 4)
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.factory = RequestFactory()
+
+    def test_range_request_returns_partial_content(self):
+        response = serve_file(self.factory.get('/', HTTP_RANGE='bytes=10-19'), self.path)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+    def test_unsatisfiable_range_and_matching_etag(self):
+        self.assertEqual(serve_file(self.factory.get('/', HTTP_RANGE='bytes=2000-'), self.path).status_code, 416)
+        etag = serve_file(self.factory.get('/'), self.path)['ETag']
+        self.assertEqual(serve_file(self.factory.get('/', HTTP_IF_NONE_MATCH=etag), self.path).status_code, 304)
+
+
+class OrderEventTests(TestCase):
+    """Live dashboard events are scoped to the user's locations."""
+
+    def test_events_are_filtered_by_location(self):
+        user = User.objects.create_user('9000000011')
+        north, south = Location.objects.create(name='North'), Location.objects.create(name='South')
+        with self.captureOnCommitCallbacks(execute=True):
+            for location in (north, south):
+                Order.objects.create(user=user, service_name='Printing', print_mode='bw', total_price=10,
+                                     location=location, payment_status='Success')
+            Order.objects.create(user=user, service_name='Printing', print_mode='bw', total_price=10,
+                                 location=north)  # unpaid: no event
+
+        self.assertEqual(len(events_after(0)), 2)
+        self.assertEqual([event['status'] for event in events_after(0, [north.pk])], ['Pending'])
+        self.assertEqual(events_after(0, []), [])
+        self.assertTrue(poll_response_body(0, [south.pk]).startswith('retry: '))
+
+    def test_only_status_changes_are_pushed(self):
+        order = Order.objects.create(user=User.objects.create_user('9000000012'), service_name='Printing',
+                                     print_mode='bw', total_price=10, payment_status='Success')
+        order = Order.objects.get(pk=order.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.copies = 2
+            order.save()  # plain re-save
+            order.status = 'Ready'
+            order.save()
+            order.save()
+
+        self.assertEqual([event.status for event in OrderEvent.objects.filter(order=order)], ['Ready'])
+
+
+class OrderExportTests(TestCase):
+    """Exports stream every order exactly once, in pk order, across keyset pages."""
+
+    def setUp(self):
+        user = User.objects.create_user('9000000013', first_name='Asha')
+        self.orders = [
+            Order.objects.create(user=user, service_name='Printing', print_mode='bw', total_price=10 + i,
+                                 customer_name='Ravi\x01 <&> \x0bKumar' if i == 2 else '')
+            for i in range(5)
+        ]
+        self.expected_ids = [Order.objects.get(pk=order.pk).order_id for order in self.orders]
+        self.output = tempfile.mkdtemp(prefix='fastcopy_test_export_')
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+
+    def _export(self, name):
+        path = os.path.join(self.output, name)
+        with mock.patch('core.order_export.EXPORT_CHUNK_SIZE', 2):
+            call_command('export_orders', output=path, stdout=io.StringIO())
+        return path
+
+    def test_csv_has_every_order_once_in_pk_order(self):
+        with open(self._export('orders.csv'), newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))
+
+        self.assertEqual(rows[0][0], 'Order ID')
+        self.assertEqual([row[0] for row in rows[1:]], self.expected_ids)
+
+    def test_xlsx_is_a_valid_workbook(self):
+        with zipfile.ZipFile(self._export('orders.xlsx')) as archive:
+            self.assertIsNone(archive.testzip())
+            sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+
+        ns = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        rows = [[cell.findtext('s:is/s:t', '', ns) or cell.findtext('s:v', '', ns) for cell in row.findall('s:c', ns)]
+                for row in sheet.iterfind('s:sheetData/s:row', ns)]
+        self.assertEqual([row[0] for row in rows[1:]], self.expected_ids)
+        self.assertEqual(rows[3][2], 'Ravi <&> Kumar')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                       'LOCATION': tempfile.mkdtemp(prefix='fastcopy_test_cache_')}})
+class DealerAccessTests(TestCase):
+    """Role and location changes take effect on the dealer's next request, even with a warm cache."""
+
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.CACHES['default']['LOCATION'], ignore_errors=True)
+        cache.clear()
+        self.location = Location.objects.create(name='North Block')
+        self.dealer = User.objects.create_user('9000000014')
+        self.profile = UserProfile.objects.create(user=self.dealer, mobile='9000000014', is_dealer=True)
+        self.profile.dealer_locations.add(self.location)
+        self.order = Order.objects.create(user=User.objects.create_user('9000000015'), service_name='Printing',
+                                          print_mode='bw', total_price=10, location=self.location,
+                                          payment_status='Success')
+        self.client.force_login(self.dealer)
+        self.assertEqual(self.client.get(reverse('dealer_dashboard')).status_code, 200)  # warms the cache
+
+    def test_revoked_dealer_is_refused(self):
+        self.profile.is_dealer = False
+        self.profile.save()
+
+        self.assertEqual(self.client.get(reverse('dealer_dashboard')).status_code, 403)
+
+    def test_removed_location_is_refused(self):
+        self.profile.dealer_locations.remove(self.location)
+
+        response = self.client.post(reverse('update_order_status', args=[self.order.pk]), {'status': 'Ready'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'Pending')
+
+    def test_warm_cache_dashboard_reads_no_profile(self):
+        cache.delete(ASSIGNMENTS_KEY.format(self.dealer.pk))
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(reverse('dealer_dashboard'))
+
+        # The cold request's profile and location reads are all the cache saves
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(len(cold) - 2):
+            self.assertEqual(self.client.get(reverse('dealer_dashboard')).status_code, 200)
+
+        self.assertFalse([q for q in queries.captured_queries if 'core_userprofile' in q['sql']])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_is_not_trusted(self):
+        self.assertFalse(assignments_cache_enabled())
+        self.assertEqual(self.client.get(reverse('dealer_dashboard')).status_code, 200)
+        self.assertIsNone(cache.get(ASSIGNMENTS_KEY.format(self.dealer.pk)))
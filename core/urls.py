@@ -28,6 +28,11 @@ urlpatterns = [
     path('cart/add/', views.add_to_cart, name='add_to_cart'),
     path('cart/remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('calculate-pages/', views.calculate_pages, name='calculate_pages'),
+    path('detect-color-pages/', views.detect_color_pages_view, name='detect_color_pages'),
+    path('upload/init/', views.upload_init, name='upload_init'),
+    path('upload/<str:upload_id>/', views.upload_status, name='upload_status'),
+    path('upload/<str:upload_id>/chunk/<int:index>/', views.upload_chunk, name='upload_chunk'),
+    path('upload/<str:upload_id>/finalize/', views.upload_finalize, name='upload_finalize'),
 
     # --- 🚀 Checkout & Orders ---
     # order_now: Path for Service Page "Order Now" (Direct)
@@ -56,13 +61,19 @@ urlpatterns = [
     path('dealer/dashboard/', views.dealer_dashboard_view, name='dealer_dashboard'),
     path('dealer/logout/', views.dealer_logout_view, name='dealer_logout'),
     path('dealer/update-order/<int:order_id>/', views.update_order_status, name='update_order_status'),
+    path('dealer/update-orders/', views.dealer_bulk_status, name='dealer_bulk_status'),
     path('dealer/download/<int:order_id>/', views.dealer_download_file, name='dealer_download_file'),
+    path('dealer/download-all/', views.dealer_download_all, name='dealer_download_all'),
+    path('dealer/print-jobs/', views.dealer_print_jobs, name='dealer_print_jobs'),
+    path('dealer/print-jobs/<str:signature>/<str:name>/', views.dealer_print_job_download, name='dealer_print_job_download'),
+    path('orders/events/', views.order_events_view, name='order_events'),
 
     # --- 🚚 Delivery Boy Dashboard ---
     path('delivery/login/', views.delivery_login_view, name='delivery_login'),
     path('delivery/dashboard/', views.delivery_dashboard_view, name='delivery_dashboard'),
     path('delivery/logout/', views.delivery_logout_view, name='delivery_logout'),
     path('delivery/update-status/<int:order_id>/', views.update_delivery_status, name='update_delivery_status'),
+    path('delivery/update-statuses/', views.delivery_bulk_status, name='delivery_bulk_status'),
 
     # --- 🛠️ 10. MAINTENANCE ---
     path('maintenance/', views.maintenance_view, name='maintenance'),
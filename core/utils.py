@@ -1,7 +1,7 @@
 import datetime
 from datetime import timedelta
 from django.utils import timezone
-from .models import PublicHoliday
+from .models import PublicHoliday, PricingConfig
 
 def calculate_delivery_date(order_time=None):
     """
@@ -90,8 +90,19 @@ def count_color_pages(page_range_string, total_pages):
         count_color_pages("1-10,15", 20) → 11 pages
         count_color_pages("", 10) → 0 pages
     """
+    return len(parse_page_ranges(page_range_string, total_pages))
+
+
+def parse_page_ranges(page_range_string, total_pages):
+    """
+    Parse a page range string into a set of page numbers.
+    Invalid parts and pages outside 1..total_pages are skipped.
+
+    Examples:
+        parse_page_ranges("1,3,5-7", 10) → {1, 3, 5, 6, 7}
+    """
     if not page_range_string:
-        return 0
+        return set()
     
     color_pages_set = set()
     parts = page_range_string.replace(' ', '').split(',')
@@ -120,7 +131,127 @@ def count_color_pages(page_range_string, total_pages):
                 # Skip invalid page numbers
                 continue
     
-    return len(color_pages_set)
+    return color_pages_set
+
+
+def format_page_ranges(pages):
+    """
+    Compact a list of page numbers into a range string.
+
+    Args:
+        pages: Iterable of 1-based page numbers
+
+    Returns:
+        String like "1,3,5-7" (the format count_color_pages parses)
+
+    Examples:
+        format_page_ranges([1, 3, 5, 6, 7]) → "1,3,5-7"
+        format_page_ranges([]) → ""
+    """
+    parts = []
+    run_start = run_end = None
+    for page in sorted(set(pages)):
+        if run_end is not None and page == run_end + 1:
+            run_end = page
+            continue
+        if run_start is not None:
+            parts.append(str(run_start) if run_start == run_end else f"{run_start}-{run_end}")
+        run_start = run_end = page
+    if run_start is not None:
+        parts.append(str(run_start) if run_start == run_end else f"{run_start}-{run_end}")
+    return ",".join(parts)
+
+
+# --- 💰 PRICING ---
+
+def pricing_for(is_dealer):
+    """
+    Price list from PricingConfig, dealer or admin (customer) rates.
+    Returns dict with all prices (see get_user_pricing in views).
+    """
+    config = PricingConfig.get_config()
+    
+    base_dict = {
+        # Single-sided pricing
+        'price_per_page': float(config.dealer_price_per_page) if is_dealer else float(config.admin_price_per_page),
+        # Double-sided pricing
+        'price_per_page_double': float(config.dealer_price_per_page_double) if is_dealer else float(config.admin_price_per_page_double),
+        
+        'soft_binding': float(config.soft_binding_price_dealer) if is_dealer else float(config.soft_binding_price_admin),
+        
+        # Single-sided color addition
+        'color_addition': float(config.color_price_addition_dealer) if is_dealer else float(config.color_price_addition_admin),
+        # Double-sided color addition
+        'color_addition_double': float(config.color_price_addition_dealer_double) if is_dealer else float(config.color_price_addition_admin_double),
+        
+        'is_dealer': is_dealer,
+        
+        # Spiral Tiers
+        'spiral_tier1_limit': config.spiral_tier1_limit,
+        'spiral_tier2_limit': config.spiral_tier2_limit,
+        'spiral_tier3_limit': config.spiral_tier3_limit,
+        
+        'spiral_tier1_price': float(config.spiral_tier1_price_dealer) if is_dealer else float(config.spiral_tier1_price_admin),
+        'spiral_tier2_price': float(config.spiral_tier2_price_dealer) if is_dealer else float(config.spiral_tier2_price_admin),
+        'spiral_tier3_price': float(config.spiral_tier3_price_dealer) if is_dealer else float(config.spiral_tier3_price_admin),
+        'spiral_extra_price': float(config.spiral_extra_price_dealer) if is_dealer else float(config.spiral_extra_price_admin),
+        
+        # Custom Layouts
+        'custom_1_4_price': float(config.custom_1_4_price_dealer) if is_dealer else float(config.custom_1_4_price_admin),
+        'custom_1_8_price': float(config.custom_1_8_price_dealer) if is_dealer else float(config.custom_1_8_price_admin),
+        'custom_1_9_price': float(config.custom_1_9_price_dealer) if is_dealer else float(config.custom_1_9_price_admin),
+        'custom_1_8_price_double': float(config.custom_1_8_price_double_dealer) if is_dealer else float(config.custom_1_8_price_double_admin),
+        'custom_1_9_price_double': float(config.custom_1_9_price_double_dealer) if is_dealer else float(config.custom_1_9_price_double_admin),
+        'delivery_charge': float(config.delivery_price_dealer) if is_dealer else float(config.delivery_price_admin),
+    }
+    return base_dict
+
+
+def calculate_dealer_price(order, pricing):
+    """
+    Print + binding cost of an order at the given rates (no delivery charge).
+
+    Args:
+        order: Order instance
+        pricing: dict from pricing_for() / get_user_pricing()
+
+    Returns:
+        float: cost for all copies
+    """
+    cost = 0.0
+    pages, copies = order.pages, order.copies
+    if order.service_name == "Custom Printing":
+        layout = order.print_mode or ""
+        divisor, rate = 4, pricing['custom_1_4_price']
+        if "1/8" in layout: divisor, rate = 8, pricing['custom_1_8_price']
+        elif "1/9" in layout: divisor, rate = 9, pricing['custom_1_9_price']
+        sheets = -(-pages // divisor)
+        cost = sheets * rate * copies
+    else:
+        is_double_sided = hasattr(order, 'side_type') and order.side_type == 'double'
+        if 'custom' in str(order.print_mode).lower() and 'split' in str(order.print_mode).lower():
+            color_page_count = count_color_pages(order.custom_color_pages, pages)
+            bw_page_count = pages - color_page_count
+            color_rate = pricing['color_addition_double'] if is_double_sided else pricing['color_addition']
+            bw_rate = pricing['price_per_page_double'] if is_double_sided else pricing['price_per_page']
+            cost = ((color_page_count * color_rate) + (bw_page_count * bw_rate)) * copies
+        elif order.print_mode == 'color':
+            print_rate = pricing['color_addition_double'] if is_double_sided else pricing['color_addition']
+            cost = pages * copies * print_rate
+        else:
+            print_rate = pricing['price_per_page_double'] if is_double_sided else pricing['price_per_page']
+            cost = pages * copies * print_rate
+
+    if "Spiral" in order.service_name:
+        t1, t2, t3 = pricing['spiral_tier1_limit'], pricing['spiral_tier2_limit'], pricing['spiral_tier3_limit']
+        if pages <= t1: binding = pricing['spiral_tier1_price']
+        elif pages <= t2: binding = pricing['spiral_tier2_price']
+        elif pages <= t3: binding = pricing['spiral_tier3_price']
+        else: binding = pricing['spiral_tier3_price'] + ((-(-(pages-t3)//20)) * pricing['spiral_extra_price'])
+        cost += (binding * copies)
+    elif "Soft" in order.service_name:
+        cost += (pricing['soft_binding'] * copies)
+    return cost
 
 
 from django.core.mail import send_mail
@@ -183,11 +314,12 @@ def send_order_notification_emails(order):
 
         # 2. SEND TO DEALER (If assigned to a location with a dealer)
         # Find dealer for this location
-        from .models import Location, UserProfile
+        from .models import UserProfile
+        from .location_map import dealer_user_ids
         try:
-            location_obj = Location.objects.filter(name=order.location).first()
-            if location_obj:
-                dealers = UserProfile.objects.filter(is_dealer=True, dealer_locations=location_obj)
+            dealer_ids = dealer_user_ids(order.location_id)
+            if dealer_ids:
+                dealers = UserProfile.objects.filter(user_id__in=dealer_ids).select_related('user')
                 for dealer in dealers:
                     if dealer.user.email:
                         dealer_subject = f"New Job Assigned: {order.order_id}"
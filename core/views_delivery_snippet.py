@@ -44,9 +44,9 @@ def delivery_dashboard_view(request):
     
     # Filter by dealer's assigned locations
     # (Delivery boys likely serve specific locations too, reusing dealer_locations field logic for now or showing all if generic)
-    if hasattr(request.user, 'profile') and request.user.profile.dealer_locations.exists():
-        loc_names = list(request.user.profile.dealer_locations.values_list('name', flat=True))
-        orders = orders.filter(location__in=loc_names)
+    loc_ids = user_assignments(request.user)['location_ids']
+    if loc_ids:
+        orders = orders.filter(location_id__in=loc_ids)
     
     # --- 3. APPLY STATUS FILTER ---
     if status_filter != 'all': 
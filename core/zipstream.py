@@ -0,0 +1,90 @@
+"""
+Streaming ZIP Builder for FastCopy
+Builds a ZIP archive on the fly as a generator of byte chunks, so a response
+can start immediately and memory stays constant regardless of archive size.
+
+Entries are written one at a time through zipfile's unseekable-stream mode
+(sizes/CRC go into data descriptors), stored without recompression by
+default since PDFs and images are already compressed.
+"""
+
+import os
+import time
+import zipfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_SIZE = 256 * 1024
+
+
+class _StreamBuffer:
+    """Write-only file object that collects bytes until they are drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _file_blocks(file_path):
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+            yield block
+
+
+def stream_zip(entries, compress=False):
+    """
+    Generate a ZIP archive.
+
+    Args:
+        entries: iterable of (arcname, source) or (arcname, source, mtime) where
+                 source is a file path (str) or an iterable of bytes
+        compress: deflate entries (use for text like XML/CSV; leave off for PDFs)
+
+    Yields:
+        bytes: archive chunks, in order
+    """
+    buffer = _StreamBuffer()
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+
+    with zipfile.ZipFile(buffer, mode='w', compression=compression, allowZip64=True) as archive:
+        for entry in entries:
+            arcname, source = entry[0], entry[1]
+            mtime = entry[2] if len(entry) > 2 else None
+
+            if isinstance(source, str):
+                size = os.path.getsize(source)
+                mtime = mtime or os.path.getmtime(source)
+                blocks = _file_blocks(source)
+            else:
+                size = None
+                blocks = source
+
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime(mtime or time.time())[:6])
+            info.compress_type = compression
+            info.external_attr = 0o644 << 16
+
+            # ZIP64 headers are only needed past 4 GB; unknown sizes are assumed small
+            with archive.open(info, mode='w', force_zip64=bool(size and size >= zipfile.ZIP64_LIMIT)) as dest:
+                for block in blocks:
+                    dest.write(block)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+
+    # Central directory, written when the archive closes
+    yield buffer.drain()
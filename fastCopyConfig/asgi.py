@@ -14,3 +14,6 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fastCopyConfig.settings')
 
 application = get_asgi_application()
+
+# Signed /signed-media/ URLs are served by core.signed_media.signed_media_view here
+# (the WSGI middleware in wsgi.py only wraps the WSGI application)
@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -188,6 +189,13 @@ if 'default' in DATABASES:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media saves/deletes keep the storage ledger current (core/storage_ledger.py).
+# Django 5.1+ only reads STORAGES; "staticfiles" keeps the backend that was already in effect.
+STORAGES = {
+    "default": {"BACKEND": "core.storage_ledger.LedgerFileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
 # 10. DEFAULT AUTO FIELD
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -208,4 +216,52 @@ ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'fastcopyteam@gmail.com')
 SUPPORT_EMAIL = os.getenv('SUPPORT_EMAIL', 'fastcopyteam@gmail.com')
 SUPPORT_PHONE = os.getenv('SUPPORT_PHONE', '+91 8500290959')
 COMPANY_NAME = 'FastCopy'
-COMPANY_WEBSITE = os.getenv('COMPANY_WEBSITE', 'https://fastcopies.in')
\ No newline at end of file
+COMPANY_WEBSITE = os.getenv('COMPANY_WEBSITE', 'https://fastcopies.in')
+
+# 13. PDF WORKER POOL (core/pdf_workers.py)
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', '0'))  # 0 = min(4, CPU count)
+PDF_JOB_TIMEOUT = int(os.getenv('PDF_JOB_TIMEOUT', '30'))  # seconds per job
+PDF_WORKER_MEMORY_MB = int(os.getenv('PDF_WORKER_MEMORY_MB', '1024'))  # 0 = no limit
+PDF_WORKER_MAX_TASKS = int(os.getenv('PDF_WORKER_MAX_TASKS', '50'))  # recycle workers after N jobs
+PDF_OPTIMIZE_ENABLED = os.getenv('PDF_OPTIMIZE_ENABLED', 'True') == 'True'  # shrink order PDFs after preflight (core/pdf_optimizer.py)
+
+# 14. PROTECTED FILE SERVING (core/file_serving.py)
+# 'python' streams from Django; 'nginx' uses X-Accel-Redirect; 'sendfile' uses X-Sendfile
+FILE_SERVING_BACKEND = os.getenv('FILE_SERVING_BACKEND', 'python')
+FILE_SERVING_ACCEL_PREFIX = os.getenv('FILE_SERVING_ACCEL_PREFIX', '/protected-media/')
+
+# 15. SIGNED MEDIA URLS (core/signed_media.py)
+SIGNED_MEDIA_TTL = int(os.getenv('SIGNED_MEDIA_TTL', '900'))  # seconds a document link stays valid
+
+# 16. FILE CLEANUP REPORTS (core/cleanup.py)
+# One CSV per cleanup run listing every deleted file
+CLEANUP_REPORT_DIR = os.getenv('CLEANUP_REPORT_DIR', os.path.join(BASE_DIR, 'cleanup_reports'))
+
+# 17. COLD STORAGE TIER (core/cold_storage.py)
+# Delivered orders are compressed here after FileCleanupManager.RETENTION_DELIVERED days instead of being deleted
+COLD_STORAGE_ENABLED = os.getenv('COLD_STORAGE_ENABLED', 'True') == 'True'
+COLD_STORAGE_DIR = os.getenv('COLD_STORAGE_DIR', os.path.join(BASE_DIR, 'cold_storage'))
+
+# 18. DAILY ORDER ROLLUPS (core/rollups.py)
+# Rebuild an order's day in DailyOrderRollup when it changes; run `rebuild_rollups` nightly as well.
+# Off by default under `manage.py test`, where the background rebuild thread would race the test database.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+ORDER_ROLLUPS_ENABLED = os.getenv('ORDER_ROLLUPS_ENABLED', str(not TESTING)) == 'True'
+
+# 19. DEALER LEDGER (core/dealer_ledger.py)
+# Payout statements written by `settle_dealers`
+DEALER_STATEMENT_DIR = os.getenv('DEALER_STATEMENT_DIR', os.path.join(BASE_DIR, 'dealer_statements'))
+
+# 20. SHARED CACHE (core/color_detection.py, core/location_map.py, request throttling)
+# Without CACHE_DIR each worker process has its own in-memory cache, so cached colour
+# detection results, throttles and assignment maps are not shared between workers, and
+# users' roles and locations are read from the database on every dealer/delivery request.
+# Set CACHE_DIR to use one file-based cache for every worker on the host.
+CACHE_DIR = os.getenv('CACHE_DIR', '')
+if CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+        }
+    }
\ No newline at end of file
@@ -5,6 +5,7 @@ from django.conf.urls.static import static
 from django.contrib.sitemaps.views import sitemap
 from core.sitemaps import StaticViewSitemap
 from core.views import robots_txt
+from core.signed_media import signed_media_view
 from core.admin import admin_site  # Import your custom admin instance
 
 # Sitemap dictionary for Django's sitemap framework
@@ -27,6 +28,9 @@ urlpatterns = [
     # 🤖 SEO Files - Dynamic Generation
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
     path('robots.txt', robots_txt, name='robots'),
+
+    # 🔏 Signed order files (WSGI serves these in SignedMediaMiddleware before Django; ASGI lands here)
+    path('signed-media/<path:name>', signed_media_view, name='signed_media'),
     
     # 🏠 Core App URLs
     path('accounts/', include('allauth.urls')),
@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fastCopyConfig.settings')
 
 application = get_wsgi_application()
+
+# Signed /signed-media/ URLs are validated and served here, before Django
+from django.conf import settings
+from core.signed_media import SignedMediaMiddleware
+
+application = SignedMediaMiddleware(
+    application,
+    media_root=settings.MEDIA_ROOT,
+    secret_key=settings.SECRET_KEY,
+    backend=settings.FILE_SERVING_BACKEND,
+    accel_prefix=settings.FILE_SERVING_ACCEL_PREFIX,
+)